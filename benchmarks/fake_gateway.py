@@ -0,0 +1,265 @@
+"""Simulated OpenWebNet gateway used by the benchmarks.
+
+The gateway accepts command (`*99*0##`) and event (`*99*1##`) sessions on a
+local port. Sessions are authenticated like a real gateway would: without a
+password, with the OPEN nonce algorithm, or with the SHA-1/SHA-256 HMAC
+challenge. Event sessions receive the frames given to `FakeGateway.stream`,
+command sessions get an ACK for every command.
+
+The OWNd package must be importable when a FakeGateway is created, the
+benchmarks put the checkout they measure on sys.path first.
+"""
+
+import asyncio
+import hashlib
+import os
+import random
+import string
+import time
+from typing import Dict, List, Optional, Tuple
+
+ACK = b"*#*1##"
+NACK = b"*#*0##"
+SEPARATOR = b"##"
+
+AUTH_METHODS = ("none", "nonce", "sha1", "sha256")
+
+# Representative frames of each family, `{where}` is filled in by synthesize_frames
+FRAME_TEMPLATES = (
+    "*1*1*{where}##",
+    "*1*0*{where}##",
+    "*#1*{where}*1*150*0##",
+    "*2*1*{where}##",
+    "*#2*{where}*10*10*45*1*0##",
+    "*#4*{where}*0*0215##",
+    "*#4*{where}*19*0*1##",
+    "*#18*5{where}*113*1500##",
+    "*15*1*{where}##",
+    "*25*31#1*3{where}##",
+)
+
+
+def synthesize_frames(count: int, seed: int = 0) -> List[bytes]:
+    """Build a stream of `count` frames mixing every family and many WHEREs"""
+    _random = random.Random(seed)
+    _frames = []
+    for _ in range(count):
+        _where = f"{_random.randint(1, 9)}{_random.randint(1, 9)}"
+        _frames.append(_random.choice(FRAME_TEMPLATES).format(where=_where).encode())
+    return _frames
+
+
+def load_frames(path: str) -> List[bytes]:
+    """Read frames recorded from a real bus, one per line or back to back"""
+    with open(path, "rb") as _file:
+        _data = _file.read()
+    return [
+        _frame.strip() + SEPARATOR
+        for _frame in _data.split(SEPARATOR)
+        if _frame.strip()
+    ]
+
+
+def status_reply(frame: bytes) -> Optional[bytes]:
+    """Status frame answering a `*#WHO*WHERE##` request, None for anything else"""
+    _fields = frame[1:-2].split(b"*")
+    if len(_fields) != 2 or not _fields[0].startswith(b"#") or not _fields[1]:
+        return None
+    return b"*" + _fields[0][1:] + b"*0*" + _fields[1] + SEPARATOR
+
+
+class FakeGateway:
+    """Local asyncio server behaving like an OpenWebNet gateway.
+
+    `latency` is how long the reply to a command takes to come back, replies
+    are written in the order the commands were received.
+    """
+
+    # Frames written at once when streaming as fast as possible
+    BURST = 64
+
+    def __init__(
+        self,
+        auth: str = "none",
+        password: Optional[str] = None,
+        latency: float = 0.0,
+        host: str = "127.0.0.1",
+    ):
+        from OWNd.connection import OWNSession  # pylint: disable=import-outside-toplevel
+
+        if auth not in AUTH_METHODS:
+            raise ValueError(f"Unknown authentication method `{auth}`")
+        self.auth = auth
+        self.password = password
+        self.latency = latency
+        self.host = host
+        self.port: Optional[int] = None
+        self.negotiations = 0
+        self.failed_negotiations = 0
+        # (time it was read, frame) of every command received
+        self.received: List[Tuple[float, bytes]] = []
+        # Time each streamed event frame was written, by position in the stream
+        self.sent_at: List[float] = []
+        # The password algorithms are those of the client, the gateway only checks the results
+        self._crypto = OWNSession(connection_type="fake gateway")
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._event_writers: List[asyncio.StreamWriter] = []
+        self._event_session_opened = asyncio.Event()
+        self._command_received = asyncio.Event()
+
+    @property
+    def gateway_info(self) -> Dict[str, str]:
+        """Discovery info to build an OWNGateway pointing at this gateway"""
+        return {
+            "address": self.host,
+            "port": self.port,
+            "password": self.password,
+            "modelName": "Fake",
+            "serialNumber": "00:03:50:00:00:01",
+        }
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle_connection, self.host, 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        for _writer in self._event_writers:
+            _writer.close()
+        self._event_writers.clear()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def wait_for_event_session(self) -> None:
+        await self._event_session_opened.wait()
+
+    async def wait_for_commands(self, count: int) -> None:
+        """Wait until `count` commands were received in total"""
+        while len(self.received) < count:
+            self._command_received.clear()
+            await self._command_received.wait()
+
+    async def stream(self, frames: List[bytes], rate: float = 0) -> None:
+        """Write `frames` to the open event sessions,
+        `rate` frames per second or as fast as possible if 0"""
+        _total = len(frames)
+        _sent = 0
+        _started = time.perf_counter()
+        while _sent < _total:
+            if rate > 0:
+                _delay = _started + _sent / rate - time.perf_counter()
+                if _delay > 0:
+                    await asyncio.sleep(_delay)
+                _due = int((time.perf_counter() - _started) * rate) + 1
+                _due = min(_total, max(_sent + 1, _due))
+            else:
+                _due = min(_total, _sent + self.BURST)
+            _now = time.perf_counter()
+            _chunk = b"".join(frames[_sent:_due])
+            for _writer in self._event_writers:
+                _writer.write(_chunk)
+            self.sent_at.extend([_now] * (_due - _sent))
+            _sent = _due
+            for _writer in self._event_writers:
+                await _writer.drain()
+
+    async def _handle_connection(self, reader, writer) -> None:
+        try:
+            writer.write(ACK)
+            await writer.drain()
+            _request = await reader.readuntil(SEPARATOR)
+            if _request not in (b"*99*0##", b"*99*1##"):
+                writer.write(NACK)
+                await writer.drain()
+                return
+            if not await self._authenticate(reader, writer):
+                self.failed_negotiations += 1
+                return
+            self.negotiations += 1
+            if _request == b"*99*1##":
+                await self._serve_events(reader, writer)
+            else:
+                await self._serve_commands(reader, writer)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _authenticate(self, reader, writer) -> bool:
+        if self.auth == "none":
+            writer.write(ACK)
+            await writer.drain()
+            return True
+
+        if self.auth == "nonce":
+            _nonce = "".join(random.choices(string.digits[1:], k=9))
+            writer.write(f"*#{_nonce}##".encode())
+            await writer.drain()
+            _reply = await reader.readuntil(SEPARATOR)
+            _expected = f"*#{self._crypto._get_own_password(self.password, _nonce)}##"
+            _accepted = _reply.decode() == _expected
+            writer.write(ACK if _accepted else NACK)
+            await writer.drain()
+            return _accepted
+
+        writer.write(b"*98*1##" if self.auth == "sha1" else b"*98*2##")
+        await writer.drain()
+        if await reader.readuntil(SEPARATOR) != ACK:
+            return False
+        _ra = self._crypto._hex_string_to_int_string(
+            hashlib.new(self.auth, os.urandom(32)).hexdigest()
+        )
+        writer.write(f"*#{_ra}##".encode())
+        await writer.drain()
+        # *#Rb*HMAC(Ra, Rb, A, B, Kab)##
+        _rb, _, _client_hmac = (await reader.readuntil(SEPARATOR)).decode()[2:-2].partition("*")
+        _expected = self._crypto._encode_hmac_password(
+            method=self.auth, password=self.password, nonce_a=_ra, nonce_b=_rb
+        )
+        if _client_hmac != _expected:
+            writer.write(NACK)
+            await writer.drain()
+            return False
+        _response = self._crypto._decode_hmac_response(
+            method=self.auth, password=self.password, nonce_a=_ra, nonce_b=_rb
+        )
+        writer.write(f"*#{_response}##".encode())
+        await writer.drain()
+        return await reader.readuntil(SEPARATOR) == ACK
+
+    async def _serve_events(self, reader, writer) -> None:
+        self._event_writers.append(writer)
+        self._event_session_opened.set()
+        try:
+            # Nothing is expected from the client, wait for it to leave
+            while await reader.read(1024):
+                pass
+        finally:
+            if writer in self._event_writers:
+                self._event_writers.remove(writer)
+
+    async def _serve_commands(self, reader, writer) -> None:
+        # Replies are written in order by _reply, so that the next commands
+        # can be read while earlier ones are still being answered
+        _pending: asyncio.Queue = asyncio.Queue()
+        _replying = asyncio.create_task(self._reply(writer, _pending))
+        try:
+            while True:
+                _frame = await reader.readuntil(SEPARATOR)
+                _now = time.perf_counter()
+                self.received.append((_now, _frame))
+                self._command_received.set()
+                _pending.put_nowait((_now + self.latency, _frame))
+        finally:
+            _replying.cancel()
+
+    @staticmethod
+    async def _reply(writer, pending: asyncio.Queue) -> None:
+        while True:
+            _due, _frame = await pending.get()
+            _delay = _due - time.perf_counter()
+            if _delay > 0:
+                await asyncio.sleep(_delay)
+            _status = status_reply(_frame)
+            writer.write(_status + ACK if _status is not None else ACK)
+            await writer.drain()
@@ -0,0 +1,94 @@
+"""Measure the memory footprint of parsed OWNd messages.
+
+Parses a representative frame of each message family many times, keeps the
+resulting objects alive and reports the memory retained per message, both for
+eager and lazy parsing.
+
+    python benchmarks/message_memory.py
+    python benchmarks/message_memory.py --source /path/to/other/checkout
+
+`--source` points at another checkout of the repository (for instance the
+revision before a change) so both footprints can be compared side by side.
+"""
+
+import argparse
+import gc
+import inspect
+import os
+import sys
+import tracemalloc
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FRAMES = {
+    "lighting": "*1*1*12##",
+    "lighting dimension": "*#1*12*1*150*0##",
+    "automation": "*#2*21*10*10*45*1*0##",
+    "heating": "*#4*1*0*0215##",
+    "heating valves": "*#4*1*19*0*1##",
+    "gateway time": "*#13**0*12*30*15*001##",
+    "CEN": "*15*1*12##",
+    "energy": "*#18*51*113*1500##",
+    "dry contact": "*25*31#1*3101##",
+    "command": "*#1*12##",
+    "signaling": "*#*1##",
+}
+
+
+def _load_message_module(source: str):
+    sys.path.insert(0, os.path.join(source, "custom_components", "bticino_myhome"))
+    from OWNd import message  # pylint: disable=import-outside-toplevel
+
+    return message
+
+
+def _retained_bytes(parse, frame: str, count: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    # Decode every frame from bytes, as the event session does, so that each
+    # message holds its own copy of the raw frame
+    _data = frame.encode()
+    _messages = [parse(_data.decode()) for _ in range(count)]
+    _retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    _messages.clear()
+    # The list holding the messages is not part of their footprint
+    return (_retained - sys.getsizeof([None] * count)) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--source", default=REPO_ROOT, help="repository checkout to measure")
+    parser.add_argument("--count", type=int, default=5000, help="messages kept alive per frame")
+    args = parser.parse_args()
+
+    message = _load_message_module(os.path.abspath(args.source))
+    _parse = message.OWNMessage.parse
+    _has_lazy = "lazy" in inspect.signature(_parse).parameters
+
+    print(f"Source: {os.path.abspath(args.source)}")
+    print(f"{'frame':<20} {'class':<22} {'__dict__':>8} {'eager B/msg':>12} {'lazy B/msg':>11}")
+    _totals = [0.0, 0.0]
+    for _name, _frame in FRAMES.items():
+        _sample = _parse(_frame)
+        _eager = _retained_bytes(_parse, _frame, args.count)
+        _lazy = (
+            _retained_bytes(lambda data: _parse(data, lazy=True), _frame, args.count)
+            if _has_lazy
+            else _eager
+        )
+        _totals[0] += _eager
+        _totals[1] += _lazy
+        print(
+            f"{_name:<20} {type(_sample).__name__:<22} "
+            f"{'yes' if hasattr(_sample, '__dict__') else 'no':>8} "
+            f"{_eager:>12.0f} {_lazy:>11.0f}"
+        )
+    print(
+        f"{'mean':<20} {'':<22} {'':>8} "
+        f"{_totals[0] / len(FRAMES):>12.0f} {_totals[1] / len(FRAMES):>11.0f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
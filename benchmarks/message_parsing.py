@@ -0,0 +1,300 @@
+"""Measure OWNMessage.parse speed and check it against a golden snapshot.
+
+Parses every frame of the corpus (corpus/frames.txt, one or more frames of
+each WHO family) and reports, per message class:
+  - ns/frame for eager and lazy parsing;
+  - blocks/frame, the memory blocks a parsed message holds on to;
+  - peak B/frame, the memory used while parsing a single frame.
+
+The fields of every parsed message (public properties, `is_*` checks and
+public attributes) are compared to corpus/snapshot.json, so that a parser
+change showing up faster is also known to parse the same. Messages parsed
+lazily must decode to the same fields as eagerly parsed ones.
+
+    python benchmarks/message_parsing.py
+    python benchmarks/message_parsing.py --update-snapshot
+    python benchmarks/message_parsing.py --source /path/to/other/checkout --output before.json
+
+`--update-snapshot` rewrites the snapshot after an intended change of the
+parsed fields, review its diff before committing it.
+"""
+
+import argparse
+import contextlib
+import datetime
+import gc
+import inspect
+import json
+import os
+import sys
+import time
+import tracemalloc
+import types
+from collections import defaultdict
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+
+# Energy messages date their consumption relative to today
+FROZEN_TODAY = datetime.date(2024, 6, 15)
+
+
+def _load_message_module(source: str):
+    sys.path.insert(0, os.path.join(source, "custom_components", "bticino_myhome"))
+    from OWNd import message  # pylint: disable=import-outside-toplevel
+
+    return message
+
+
+def load_corpus(path: str):
+    """(family, frame) of every frame of the corpus, in order"""
+    _corpus = []
+    _family = None
+    with open(path, encoding="utf-8") as _file:
+        for _line in _file:
+            _line = _line.strip()
+            if not _line:
+                continue
+            if _line.startswith("#"):
+                _family = _line[1:].strip()
+                continue
+            _corpus.append((_family, _line))
+    return _corpus
+
+
+@contextlib.contextmanager
+def frozen_today(message):
+    """Make datetime.date.today() return FROZEN_TODAY inside `message`"""
+
+    class _FrozenDate(datetime.date):
+        @classmethod
+        def today(cls):
+            return cls(FROZEN_TODAY.year, FROZEN_TODAY.month, FROZEN_TODAY.day)
+
+    _frozen = types.ModuleType("datetime")
+    _frozen.__dict__.update(datetime.__dict__)
+    _frozen.date = _FrozenDate
+    _original = message.datetime
+    message.datetime = _frozen
+    try:
+        yield
+    finally:
+        message.datetime = _original
+
+
+def _jsonable(value):
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, datetime.timedelta):
+        return value.total_seconds()
+    if isinstance(value, dict):
+        return {str(_key): _jsonable(_value) for _key, _value in value.items()}
+    if isinstance(value, (set, frozenset)):
+        return sorted(_jsonable(_value) for _value in value)
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(_value) for _value in value]
+    return str(value)
+
+
+def _field_names(cls):
+    _names = set()
+    for _klass in cls.__mro__:
+        for _name, _attribute in vars(_klass).items():
+            if _name.startswith("_"):
+                continue
+            if isinstance(_attribute, property):
+                _names.add(_name)
+            elif _name.startswith("is_") and inspect.isfunction(_attribute):
+                if len(inspect.signature(_attribute).parameters) == 1:
+                    _names.add(_name)
+        for _name in getattr(_klass, "__slots__", ()):
+            if not _name.startswith("_"):
+                _names.add(_name)
+    return sorted(_names)
+
+
+def message_fields(message) -> dict:
+    """Class and field values of a parsed message, as stored in the snapshot"""
+    if message is None:
+        return {"class": None}
+    _fields = {}
+    _names = set(_field_names(type(message)))
+    _names.update(_name for _name in getattr(message, "__dict__", {}) if not _name.startswith("_"))
+    for _name in sorted(_names):
+        try:
+            _value = getattr(message, _name)
+            if callable(_value):
+                _value = _value()
+            _fields[_name] = _jsonable(_value)
+        except Exception as err:  # pylint: disable=broad-except
+            _fields[_name] = f"!{type(err).__name__}"
+    _fields["str"] = str(message)
+    return {"class": type(message).__name__, "fields": _fields}
+
+
+def parse_fields(parse, frame: str, lazy: bool = False) -> dict:
+    try:
+        return message_fields(parse(frame, lazy=lazy) if lazy else parse(frame))
+    except Exception as err:  # pylint: disable=broad-except
+        return {"class": None, "error": type(err).__name__}
+
+
+def _ns_per_frame(parse, frame: str, iterations: int) -> float:
+    _best = None
+    for _ in range(3):
+        _started = time.perf_counter_ns()
+        for _ in range(iterations):
+            parse(frame)
+        _elapsed = (time.perf_counter_ns() - _started) / iterations
+        _best = _elapsed if _best is None else min(_best, _elapsed)
+    return _best
+
+
+def _blocks_per_frame(parse, frame: str, count: int) -> float:
+    # Decode every frame from bytes, as the event session does, so that each
+    # message holds its own copy of the raw frame
+    _data = frame.encode()
+    _messages = [None] * count
+    gc.collect()
+    _before = sys.getallocatedblocks()
+    for _index in range(count):
+        _messages[_index] = parse(_data.decode())
+    _blocks = sys.getallocatedblocks() - _before
+    del _messages
+    return _blocks / count
+
+
+def _peak_bytes(parse, frame: str) -> int:
+    _data = frame.encode()
+    gc.collect()
+    tracemalloc.start()
+    parse(_data.decode())
+    _, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return _peak
+
+
+def measure(parse, frame: str, iterations: int, has_lazy: bool) -> dict:
+    """Parsing costs of one frame, None when it cannot be parsed"""
+    try:
+        _message = parse(frame)
+    except Exception:  # pylint: disable=broad-except
+        return None
+    _lazy_parse = (lambda data: parse(data, lazy=True)) if has_lazy else parse
+    return {
+        "class": type(_message).__name__ if _message is not None else "None",
+        "eager_ns": _ns_per_frame(parse, frame, iterations),
+        "lazy_ns": _ns_per_frame(_lazy_parse, frame, iterations),
+        "blocks": _blocks_per_frame(parse, frame, iterations),
+        "peak_bytes": _peak_bytes(parse, frame),
+    }
+
+
+def check_snapshot(parse, corpus, snapshot: dict, has_lazy: bool) -> list:
+    """Frames whose parsed fields differ from the snapshot, or between eager and lazy parsing"""
+    _differences = []
+    for _family, _frame in corpus:
+        _fields = parse_fields(parse, _frame)
+        if _frame not in snapshot:
+            _differences.append(f"{_frame} ({_family}): not in the snapshot")
+        elif _fields != snapshot[_frame]:
+            _expected = snapshot[_frame]
+            _changed = sorted(
+                _name
+                for _name in set(_fields.get("fields", {})) | set(_expected.get("fields", {}))
+                if _fields.get("fields", {}).get(_name) != _expected.get("fields", {}).get(_name)
+            )
+            if _fields.get("class") != _expected.get("class"):
+                _changed.insert(0, f"class {_expected.get('class')} -> {_fields.get('class')}")
+            if _fields.get("error") != _expected.get("error"):
+                _changed.insert(0, f"error {_expected.get('error')} -> {_fields.get('error')}")
+            _differences.append(f"{_frame} ({_family}): {', '.join(_changed)}")
+        if has_lazy and _fields.get("class") is not None:
+            _lazy_fields = parse_fields(parse, _frame, lazy=True)
+            if _lazy_fields != _fields:
+                _differences.append(f"{_frame} ({_family}): lazy parsing decodes different fields")
+    return _differences
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--source", default=REPO_ROOT, help="repository checkout to measure")
+    parser.add_argument("--corpus", default=os.path.join(CORPUS_DIR, "frames.txt"), help="frames to parse")
+    parser.add_argument("--snapshot", default=os.path.join(CORPUS_DIR, "snapshot.json"), help="expected parsed fields")
+    parser.add_argument("--update-snapshot", action="store_true", help="rewrite the snapshot from this checkout")
+    parser.add_argument("--iterations", type=int, default=2000, help="parses timed per frame")
+    parser.add_argument("--output", help="JSON file the measurements are written to")
+    args = parser.parse_args()
+
+    message = _load_message_module(os.path.abspath(args.source))
+    _parse = message.OWNMessage.parse
+    _has_lazy = "lazy" in inspect.signature(_parse).parameters
+    _corpus = load_corpus(args.corpus)
+
+    with frozen_today(message):
+        if args.update_snapshot:
+            _snapshot = {_frame: parse_fields(_parse, _frame) for _, _frame in _corpus}
+            with open(args.snapshot, "w", encoding="utf-8") as _file:
+                json.dump(_snapshot, _file, indent=1, ensure_ascii=False)
+                _file.write("\n")
+            print(f"Snapshot of {len(_snapshot)} frames written to {args.snapshot}")
+            return
+
+        with open(args.snapshot, encoding="utf-8") as _file:
+            _snapshot = json.load(_file)
+        _differences = check_snapshot(_parse, _corpus, _snapshot, _has_lazy)
+
+        _frames = {}
+        _by_class = defaultdict(list)
+        for _family, _frame in _corpus:
+            _measurement = measure(_parse, _frame, args.iterations, _has_lazy)
+            _frames[_frame] = dict(family=_family, **_measurement) if _measurement else None
+            if _measurement is not None:
+                _by_class[_measurement["class"]].append(_measurement)
+
+    print(f"Source: {os.path.abspath(args.source)}")
+    print(f"{'class':<22} {'frames':>6} {'eager ns':>9} {'lazy ns':>8} {'blocks':>7} {'peak B':>7}")
+    _classes = {}
+    for _class, _measurements in sorted(_by_class.items()):
+        _count = len(_measurements)
+        _classes[_class] = {
+            _key: round(sum(_item[_key] for _item in _measurements) / _count, 1)
+            for _key in ("eager_ns", "lazy_ns", "blocks", "peak_bytes")
+        }
+        _classes[_class]["frames"] = _count
+        _row = _classes[_class]
+        print(
+            f"{_class:<22} {_count:>6} {_row['eager_ns']:>9.0f} {_row['lazy_ns']:>8.0f} "
+            f"{_row['blocks']:>7.1f} {_row['peak_bytes']:>7.0f}"
+        )
+    _unparsed = [_frame for _frame, _measurement in _frames.items() if _measurement is None]
+    if _unparsed:
+        print(f"Frames raising on parse: {', '.join(_unparsed)}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as _file:
+            json.dump(
+                {
+                    "benchmark": "message_parsing",
+                    "source": os.path.abspath(args.source),
+                    "iterations": args.iterations,
+                    "classes": _classes,
+                    "frames": _frames,
+                    "snapshot_differences": _differences,
+                },
+                _file,
+                indent=2,
+            )
+
+    if _differences:
+        print(f"\n{len(_differences)} frames differ from the snapshot:")
+        for _difference in _differences:
+            print(f"  {_difference}")
+        sys.exit(1)
+    print(f"\nAll {len(_corpus)} frames match the snapshot.")
+
+
+if __name__ == "__main__":
+    main()
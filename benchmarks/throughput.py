@@ -0,0 +1,434 @@
+"""Measure OWNd and gateway handler throughput against a simulated gateway.
+
+Runs a local FakeGateway (see fake_gateway.py) and measures:
+  - session negotiation time, for each authentication method;
+  - OWNEventSession parse throughput and end-to-end latency of event frames,
+    reading from the stream and through the asyncio protocol;
+  - OWNCommandSession round trip time, one command at a time and pipelined;
+  - MyHOMEGatewayHandler dispatch and send throughput, when Home Assistant
+    can be imported.
+
+Results are printed and written as JSON so that runs can be compared.
+
+    python benchmarks/throughput.py
+    python benchmarks/throughput.py --rate 500 --replay bus_capture.txt
+    python benchmarks/throughput.py --source /path/to/other/checkout --output before.json
+
+`--source` points at another checkout of the repository (for instance the
+revision before a change). Benchmarks the checkout does not support yet are
+reported as skipped.
+"""
+
+import argparse
+import asyncio
+import inspect
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import types
+from datetime import datetime, timezone
+
+from fake_gateway import AUTH_METHODS, FakeGateway, load_frames, synthesize_frames
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LOGGER = logging.getLogger("benchmark")
+
+PASSWORDS = {
+    "none": None,
+    "nonce": "12345",
+    "sha1": "benchmark1",
+    "sha256": "benchmark1",
+}
+
+# Seconds to wait for a frame or a reply before declaring a benchmark stuck
+TIMEOUT = 30
+
+
+def _load_connection_module(source: str):
+    sys.path.insert(0, os.path.join(source, "custom_components", "bticino_myhome"))
+    from OWNd import connection  # pylint: disable=import-outside-toplevel
+
+    return connection
+
+
+def _git_revision(source: str):
+    try:
+        return subprocess.run(
+            ["git", "-C", source, "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _latency_summary(samples) -> dict:
+    """Summary of durations given in seconds, in milliseconds"""
+    if not samples:
+        return {"count": 0}
+    _sorted = sorted(samples)
+    _count = len(_sorted)
+
+    def _quantile(quantile):
+        return round(_sorted[min(_count - 1, int(quantile * _count))] * 1000, 3)
+
+    return {
+        "count": _count,
+        "mean_ms": round(sum(_sorted) / _count * 1000, 3),
+        "p50_ms": _quantile(0.5),
+        "p95_ms": _quantile(0.95),
+        "p99_ms": _quantile(0.99),
+        "max_ms": round(_sorted[-1] * 1000, 3),
+    }
+
+
+def _supported(function, **kwargs) -> dict:
+    """Keep the keyword arguments `function` accepts"""
+    _parameters = inspect.signature(function).parameters
+    return {_key: _value for _key, _value in kwargs.items() if _key in _parameters}
+
+
+def command_frames(count: int):
+    """`count` lighting commands, each to a different light"""
+    return [f"*1*{_index % 2}*{_index // 15 + 1:02d}{_index % 15 + 1:02d}##" for _index in range(count)]
+
+
+async def bench_negotiation(connection, auth: str, connections: int) -> dict:
+    _fake = FakeGateway(auth=auth, password=PASSWORDS[auth])
+    await _fake.start()
+    _gateway = connection.OWNGateway(_fake.gateway_info)
+    _results = {}
+    try:
+        for _session_class in (connection.OWNCommandSession, connection.OWNEventSession):
+            _durations = []
+            for _ in range(connections):
+                _session = _session_class(gateway=_gateway, logger=LOGGER)
+                _started = time.perf_counter()
+                _result = await asyncio.wait_for(_session.connect(), TIMEOUT)
+                _durations.append(time.perf_counter() - _started)
+                await _session.close()
+                if not _result or not _result["Success"]:
+                    raise RuntimeError(f"{auth} negotiation failed: {_result}")
+            _results[_session_class.__name__] = _latency_summary(_durations)
+    finally:
+        await _fake.close()
+    return _results
+
+
+async def bench_event_session(connection, frames, rate: float, use_protocol: bool) -> dict:
+    _options = dict(lazy=True, use_protocol=use_protocol)
+    if hasattr(connection, "OWNMessageCache"):
+        _options["message_cache"] = connection.OWNMessageCache()
+    _options = _supported(connection.OWNEventSession.__init__, **_options)
+    if use_protocol and "use_protocol" not in _options:
+        return {"skipped": "OWNEventSession has no protocol mode"}
+
+    _fake = FakeGateway()
+    await _fake.start()
+    _session = connection.OWNEventSession(
+        gateway=connection.OWNGateway(_fake.gateway_info), logger=LOGGER, **_options
+    )
+    try:
+        await _session.connect()
+        await _fake.wait_for_event_session()
+
+        if hasattr(_session, "get_batch"):
+            _read = _session.get_batch
+        else:
+
+            async def _read():
+                return [await _session.get_next()]
+
+        _latencies = []
+        _received = 0
+        _streaming = asyncio.create_task(_fake.stream(frames, rate))
+        _started = time.perf_counter()
+        while _received < len(frames):
+            _batch = await asyncio.wait_for(_read(), TIMEOUT)
+            _now = time.perf_counter()
+            for _ in _batch:
+                _latencies.append(_now - _fake.sent_at[_received])
+                _received += 1
+        _elapsed = time.perf_counter() - _started
+        await _streaming
+    finally:
+        await _session.close()
+        await _fake.close()
+
+    return {
+        "frames": _received,
+        "seconds": round(_elapsed, 4),
+        "frames_per_second": round(_received / _elapsed, 1),
+        "latency": _latency_summary(_latencies),
+    }
+
+
+async def bench_command_session(connection, count: int, latency: float, depth: int) -> dict:
+    _fake = FakeGateway(latency=latency)
+    await _fake.start()
+    _session = connection.OWNCommandSession(
+        gateway=connection.OWNGateway(_fake.gateway_info), logger=LOGGER
+    )
+    _commands = command_frames(count)
+    _results = {}
+    try:
+        await _session.connect()
+
+        _round_trips = []
+        _started = time.perf_counter()
+        for _command in _commands:
+            _sent = time.perf_counter()
+            await asyncio.wait_for(_session.send(_command), TIMEOUT)
+            _round_trips.append(time.perf_counter() - _sent)
+        _elapsed = time.perf_counter() - _started
+        _results["sequential"] = {
+            "commands": count,
+            "seconds": round(_elapsed, 4),
+            "commands_per_second": round(count / _elapsed, 1),
+            "round_trip": _latency_summary(_round_trips),
+        }
+
+        if not hasattr(_session, "send_pipelined"):
+            _results["pipelined"] = {"skipped": "OWNCommandSession cannot pipeline"}
+            return _results
+
+        # Batches of `depth` commands, as the sending workers of the handler do
+        _round_trips = []
+        _started = time.perf_counter()
+        for _index in range(0, count, depth):
+            _batch = [(_command, False) for _command in _commands[_index:_index + depth]]
+            _sent = time.perf_counter()
+            await asyncio.wait_for(_session.send_pipelined(_batch, depth=depth), TIMEOUT)
+            _round_trips.append(time.perf_counter() - _sent)
+        _elapsed = time.perf_counter() - _started
+        _results["pipelined"] = {
+            "commands": count,
+            "depth": depth,
+            "seconds": round(_elapsed, 4),
+            "commands_per_second": round(count / _elapsed, 1),
+            "batch_round_trip": _latency_summary(_round_trips),
+        }
+    finally:
+        await _session.close()
+        await _fake.close()
+    return _results
+
+
+def _load_handler_modules(source: str):
+    sys.path.insert(0, source)
+    # pylint: disable=import-outside-toplevel
+    from homeassistant.core import HomeAssistant
+    from custom_components.bticino_myhome import const, gateway
+
+    return HomeAssistant, const, gateway
+
+
+async def bench_handler(source: str, frames, rate: float, count: int, latency: float) -> dict:
+    try:
+        HomeAssistant, const, gateway = _load_handler_modules(source)
+    except ImportError as err:
+        return {"skipped": f"the integration cannot be imported: {err}"}
+    if "collect_metrics" not in inspect.signature(gateway.MyHOMEGatewayHandler).parameters:
+        return {"skipped": "MyHOMEGatewayHandler does not collect metrics"}
+
+    _fake = FakeGateway(latency=latency)
+    await _fake.start()
+    _config_dir = tempfile.TemporaryDirectory()
+    hass = HomeAssistant(_config_dir.name)
+    _info = _fake.gateway_info
+    _config_entry = types.SimpleNamespace(
+        entry_id="benchmark",
+        options={},
+        data={
+            const.CONF_HOST: _info["address"],
+            const.CONF_PORT: _info["port"],
+            const.CONF_PASSWORD: _info["password"],
+            const.CONF_SSDP_LOCATION: None,
+            const.CONF_SSDP_ST: None,
+            const.CONF_DEVICE_TYPE: None,
+            const.CONF_FRIENDLY_NAME: None,
+            const.CONF_MANUFACTURER: "BTicino S.p.A.",
+            const.CONF_MANUFACTURER_URL: None,
+            const.CONF_NAME: _info["modelName"],
+            const.CONF_FIRMWARE: None,
+            const.CONF_MAC: _info["serialNumber"],
+            const.CONF_UDN: None,
+        },
+    )
+    _handler = gateway.MyHOMEGatewayHandler(hass=hass, config_entry=_config_entry)
+    hass.data[const.DOMAIN] = {_handler.mac: {const.CONF_PLATFORMS: {}}}
+
+    _results = {}
+    try:
+        _handler.listening_worker = asyncio.create_task(_handler.listening_loop())
+        _handler.dispatching_worker = asyncio.create_task(_handler.dispatching_loop())
+        _handler.command_pool.start()
+        _handler.sending_workers.append(asyncio.create_task(_handler.sending_loop(0)))
+        await asyncio.wait_for(_fake.wait_for_event_session(), TIMEOUT)
+
+        # Events, from the fake gateway to the end of dispatching
+        _started = time.perf_counter()
+        await _fake.stream(frames, rate)
+        while _handler.metrics.frames < len(frames):
+            if time.perf_counter() - _started > TIMEOUT:
+                raise TimeoutError("Events were not all dispatched")
+            await asyncio.sleep(0.001)
+        _elapsed = time.perf_counter() - _started
+        _metrics = _handler.metrics.stats
+        _results["events"] = {
+            "frames": len(frames),
+            "seconds": round(_elapsed, 4),
+            "frames_per_second": round(len(frames) / _elapsed, 1),
+            "parse_time": _metrics["parse_time"],
+            "dispatch_time": _metrics["dispatch_time"],
+        }
+
+        # Commands, from MyHOMEGatewayHandler.send to the fake gateway
+        _commands = command_frames(count)
+        _queued_at = {}
+        _already_received = len(_fake.received)
+        _started = time.perf_counter()
+        for _command in _commands:
+            _queued_at[_command.encode()] = time.perf_counter()
+            await _handler.send(gateway.OWNCommand.parse(_command))
+        await asyncio.wait_for(_fake.wait_for_commands(_already_received + count), TIMEOUT)
+        _elapsed = time.perf_counter() - _started
+        _latencies = [
+            _received_at - _queued_at[_frame]
+            for _received_at, _frame in _fake.received[_already_received:]
+            if _frame in _queued_at
+        ]
+        _results["commands"] = {
+            "commands": count,
+            "seconds": round(_elapsed, 4),
+            "commands_per_second": round(count / _elapsed, 1),
+            "queue_to_gateway": _latency_summary(_latencies),
+            "command_rtt": _handler.metrics.stats["command_rtt"],
+        }
+    finally:
+        await _handler.close_listener()
+        for _worker in _handler.sending_workers:
+            _worker.cancel()
+        await _fake.close()
+        await hass.async_stop(force=True)
+        _config_dir.cleanup()
+    return _results
+
+
+async def run(args) -> dict:
+    _source = os.path.abspath(args.source)
+    connection = _load_connection_module(_source)
+    if args.replay:
+        _frames = load_frames(args.replay)
+    else:
+        _frames = synthesize_frames(args.frames, seed=args.seed)
+
+    _results = {"negotiation": {}, "event_session": {}}
+    for _auth in args.auth:
+        print(f"Negotiation ({_auth})...")
+        _results["negotiation"][_auth] = await bench_negotiation(connection, _auth, args.connections)
+    for _mode, _use_protocol in (("stream", False), ("protocol", True)):
+        print(f"Event session ({_mode})...")
+        _results["event_session"][_mode] = await bench_event_session(
+            connection, _frames, args.rate, _use_protocol
+        )
+    print("Command session...")
+    _results["command_session"] = await bench_command_session(
+        connection, args.commands, args.latency / 1000, args.depth
+    )
+    if args.skip_handler:
+        _results["handler"] = {"skipped": "--skip-handler"}
+    else:
+        print("Gateway handler...")
+        _results["handler"] = await bench_handler(
+            _source, _frames, args.rate, args.commands, args.latency / 1000
+        )
+
+    return {
+        "benchmark": "throughput",
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "source": _source,
+        "revision": _git_revision(_source),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {
+            "frames": len(_frames),
+            "replay": args.replay,
+            "seed": args.seed,
+            "rate": args.rate,
+            "commands": args.commands,
+            "latency_ms": args.latency,
+            "depth": args.depth,
+            "connections": args.connections,
+        },
+        "results": _results,
+    }
+
+
+def _print_results(report: dict) -> None:
+    _results = report["results"]
+    print(f"\nSource: {report['source']} ({report['revision']})")
+    for _auth, _sessions in _results["negotiation"].items():
+        for _session, _summary in _sessions.items():
+            print(f"  negotiation {_auth:<7} {_session:<18} p50 {_summary['p50_ms']:>8} ms")
+    for _mode, _summary in _results["event_session"].items():
+        if "skipped" in _summary:
+            print(f"  events {_mode:<9} skipped: {_summary['skipped']}")
+            continue
+        print(
+            f"  events {_mode:<9} {_summary['frames_per_second']:>10} frames/s"
+            f"   latency p50 {_summary['latency']['p50_ms']} ms"
+            f" p95 {_summary['latency']['p95_ms']} ms"
+        )
+    for _mode, _summary in _results["command_session"].items():
+        if "skipped" in _summary:
+            print(f"  commands {_mode:<10} skipped: {_summary['skipped']}")
+            continue
+        print(f"  commands {_mode:<10} {_summary['commands_per_second']:>10} commands/s")
+    _handler = _results["handler"]
+    if "skipped" in _handler:
+        print(f"  handler skipped: {_handler['skipped']}")
+    else:
+        print(f"  handler events   {_handler['events']['frames_per_second']:>10} frames/s")
+        print(f"  handler commands {_handler['commands']['commands_per_second']:>10} commands/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--source", default=REPO_ROOT, help="repository checkout to measure")
+    parser.add_argument("--output", default="throughput.json", help="JSON file the results are written to")
+    parser.add_argument("--frames", type=int, default=20000, help="event frames synthesized")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthesized frames")
+    parser.add_argument("--replay", help="file of recorded frames to stream instead of synthesized ones")
+    parser.add_argument("--rate", type=float, default=0, help="event frames per second, 0 for as fast as possible")
+    parser.add_argument("--commands", type=int, default=400, help="commands sent per benchmark")
+    parser.add_argument("--latency", type=float, default=2, help="milliseconds the gateway takes per command")
+    parser.add_argument("--depth", type=int, default=8, help="commands in flight when pipelining")
+    parser.add_argument("--connections", type=int, default=20, help="sessions negotiated per method")
+    parser.add_argument(
+        "--auth",
+        nargs="+",
+        default=list(AUTH_METHODS),
+        choices=AUTH_METHODS,
+        help="authentication methods to negotiate",
+    )
+    parser.add_argument("--skip-handler", action="store_true", help="do not benchmark MyHOMEGatewayHandler")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    _report = asyncio.run(run(args))
+    _print_results(_report)
+    with open(args.output, "w", encoding="utf-8") as _file:
+        json.dump(_report, _file, indent=2)
+    print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
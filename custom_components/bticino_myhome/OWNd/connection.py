@@ -6,7 +6,9 @@ import hashlib
 import string
 import random
 import logging
-from typing import Union
+import time
+from collections import OrderedDict, deque
+from typing import Callable, List, Optional, Union
 from urllib.parse import urlparse
 
 from .discovery import find_gateways, get_gateway, get_port
@@ -160,6 +162,23 @@ class OWNGateway:
         return cls(discovery_info)
 
 
+class OWNSessionObserver:
+    """Receives measurements from sessions that were given it as `observer`.
+    Methods are called inline on the session hot paths, so they must be cheap."""
+
+    def frames_parsed(self, count: int, seconds: float) -> None:
+        """An event session parsed `count` frames in `seconds`"""
+
+    def command_replied(self, seconds: float, acknowledged: bool) -> None:
+        """A command was answered by an ACK or a NACK `seconds` after it was written"""
+
+    def command_retried(self) -> None:
+        """A command refused by the gateway was sent again"""
+
+    def reconnected(self, connection_type: str) -> None:
+        """A session was lost and is being replaced"""
+
+
 class OWNSession:
     """Connection to OpenWebNet gateway"""
 
@@ -644,46 +663,288 @@ class OWNSession:
         return int_string
 
 
+class OWNMessageCache:
+    """Bounded LRU cache of parsed event frames, keyed by their raw bytes.
+    Repeated frames get the very same message object back, so messages
+    handed out by the cache are shared and must be treated as read-only,
+    the dictionaries some of their properties return included.
+    Messages that depend on the date they are decoded on are not cached."""
+
+    def __init__(self, size: int = 256):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, data: bytes) -> Union[OWNMessage, str, None]:
+        _message = self._entries.get(data)
+        if _message is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._entries.move_to_end(data)
+        return _message
+
+    def put(self, data: bytes, message: Union[OWNMessage, str]) -> None:
+        if isinstance(message, OWNMessage) and message.depends_on_date:
+            return
+        self._entries[data] = message
+        if len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class _OWNEventProtocol(asyncio.Protocol):
+    """Event bus transport for a negotiated OWNEventSession.
+    Frames are cut and parsed as soon as they arrive, without going through
+    a StreamReader."""
+
+    # Stop reading from the socket while this many messages wait for the listener
+    MAX_QUEUED_MESSAGES = 4096
+
+    def __init__(self, session: "OWNEventSession"):
+        self._session = session
+        self._transport = None
+        self._messages = []
+        self._waiter = None
+        self._paused = False
+        self._lost = False
+        self._closed = asyncio.get_running_loop().create_future()
+
+    def connection_made(self, transport) -> None:
+        self._transport = transport
+
+    def data_received(self, data: bytes) -> None:
+        self._session._buffer += data
+        self._messages.extend(
+            self._session._parse_frames(self._session._split_frames())
+        )
+        if len(self._messages) > self.MAX_QUEUED_MESSAGES and not self._paused:
+            self._transport.pause_reading()
+            self._paused = True
+        if self._messages:
+            self._wake_up()
+
+    def eof_received(self) -> bool:
+        self._lost = True
+        self._wake_up()
+        return False
+
+    def connection_lost(self, exc) -> None:
+        self._lost = True
+        self._wake_up()
+        if not self._closed.done():
+            self._closed.set_result(None)
+
+    def _wake_up(self) -> None:
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    async def get_batch(self) -> List[Union[OWNMessage, str]]:
+        while not self._messages:
+            if self._lost:
+                raise asyncio.IncompleteReadError(bytes(self._session._buffer), None)
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+        _messages, self._messages = self._messages, []
+        if self._paused:
+            self._paused = False
+            self._transport.resume_reading()
+        return _messages
+
+    async def close(self) -> None:
+        self._transport.close()
+        await self._closed
+
+
 class OWNEventSession(OWNSession):
-    def __init__(self, gateway: OWNGateway = None, logger: logging.Logger = None):
+    READ_SIZE = 4096
+    # Same bound StreamReader.readuntil() puts on a single frame
+    MAX_BUFFER_SIZE = 2**16
+
+    def __init__(
+        self,
+        gateway: OWNGateway = None,
+        logger: logging.Logger = None,
+        lazy: bool = False,
+        message_cache: Optional[OWNMessageCache] = None,
+        use_protocol: bool = False,
+        observer: Optional[OWNSessionObserver] = None,
+    ):
+        """With `lazy`, messages are only decoded past their addressing
+        fields when they are first read, see OWNMessage.parse.
+        With a `message_cache`, repeated frames are not parsed again.
+        With `use_protocol`, the session hands its socket over to an
+        asyncio.Protocol once negotiated, see _OWNEventProtocol.
+        An `observer` is told how long parsing takes and about reconnections."""
         super().__init__(gateway=gateway, connection_type="event", logger=logger)
+        self._observer = observer
+        self._lazy = lazy
+        self._message_cache = message_cache
+        self._use_protocol = use_protocol
+        self._protocol: Optional[_OWNEventProtocol] = None
+        self._buffer = bytearray()
+        self._pending = deque()
 
     @classmethod
     async def connect_to_gateway(cls, gateway: OWNGateway):
         connection = cls(gateway)
         await connection.connect()
 
+    async def connect(self):
+        if self._protocol is not None:
+            await self.close()
+        self._buffer.clear()
+        self._pending.clear()
+        result = await super().connect()
+        if self._use_protocol and result is not None and result["Success"]:
+            self._switch_to_protocol()
+        return result
+
+    def _switch_to_protocol(self) -> None:
+        """Negotiation goes through the stream reader/writer; after that the
+        transport is handed over to an _OWNEventProtocol"""
+        _transport = self._stream_writer.transport
+        self._protocol = _OWNEventProtocol(self)
+        self._protocol.connection_made(_transport)
+        _transport.set_protocol(self._protocol)
+        # Events sent right after the negotiation may already sit in the
+        # stream reader buffer
+        _leftover = bytes(getattr(self._stream_reader, "_buffer", b""))
+        if _leftover:
+            self._protocol.data_received(_leftover)
+
+    async def close(self) -> None:
+        if self._protocol is None:
+            await super().close()
+            return
+        # The stream writer no longer sees the transport events, so it
+        # cannot be waited on
+        _protocol, self._protocol = self._protocol, None
+        await _protocol.close()
+        self._stream_reader = None
+        self._stream_writer = None
+        self._logger.debug(
+            "%s %s session closed.", self._gateway.log_id, self._type.capitalize()
+        )
+
     async def get_next(self) -> Union[OWNMessage, str, None]:
         """Acts as an entry point to read messages on the event bus.
         It will read one frame and return it as an OWNMessage object"""
+        if not self._pending:
+            self._pending.extend(await self.get_batch())
+        return self._pending.popleft() if self._pending else None
+
+    async def get_batch(self) -> List[Union[OWNMessage, str]]:
+        """Read whatever the gateway has sent so far and return all the
+        complete frames in it, as OWNMessage objects when they parse.
+        Returns an empty list if the session failed."""
         try:
-            data = await self._stream_reader.readuntil(OWNSession.SEPARATOR)
-            _decoded_data = data.decode()
-            _message = OWNMessage.parse(_decoded_data)
-            return _message if _message else _decoded_data
+            if self._protocol is not None:
+                return await self._protocol.get_batch()
+            _frames = self._split_frames()
+            while not _frames:
+                _data = await self._stream_reader.read(self.READ_SIZE)
+                if not _data:
+                    raise asyncio.IncompleteReadError(bytes(self._buffer), None)
+                self._buffer += _data
+                _frames = self._split_frames()
         except asyncio.IncompleteReadError:
             self._logger.warning(
                 "%s Connection interrupted, reconnecting...", self._gateway.log_id
             )
+            if self._observer is not None:
+                self._observer.reconnected(self._type)
             await self.connect()
-            return None
-        except AttributeError:
-            self._logger.exception(
-                "%s Received data could not be parsed into a message:",
-                self._gateway.log_id,
-            )
-            return None
+            return []
         except ConnectionError:
             self._logger.exception("%s Connection error:", self._gateway.log_id)
-            return None
+            return []
         except Exception:  # pylint: disable=broad-except
             self._logger.exception("%s Event session crashed.", self._gateway.log_id)
-            return None
+            return []
+
+        return self._parse_frames(_frames)
+
+    def _parse_frames(self, frames: List[bytes]) -> List[Union[OWNMessage, str]]:
+        if self._observer is not None:
+            _started = time.perf_counter()
+        _messages = []
+        for _frame in frames:
+            try:
+                _messages.append(self._parse_frame(_frame))
+            except Exception:  # pylint: disable=broad-except
+                self._logger.exception(
+                    "%s Received data could not be parsed into a message:",
+                    self._gateway.log_id,
+                )
+        if self._observer is not None:
+            self._observer.frames_parsed(len(frames), time.perf_counter() - _started)
+        return _messages
+
+    def _split_frames(self) -> List[bytes]:
+        """Cut every complete frame out of the receive buffer in one pass"""
+        _frames = []
+        _start = 0
+        with memoryview(self._buffer) as _view:
+            while True:
+                _end = self._buffer.find(OWNSession.SEPARATOR, _start)
+                if _end < 0:
+                    break
+                _end += len(OWNSession.SEPARATOR)
+                _frames.append(_view[_start:_end].tobytes())
+                _start = _end
+        if _start:
+            del self._buffer[:_start]
+        if len(self._buffer) > self.MAX_BUFFER_SIZE:
+            self._logger.warning(
+                "%s Discarding %s bytes received without a frame separator.",
+                self._gateway.log_id,
+                len(self._buffer),
+            )
+            self._buffer.clear()
+        return _frames
+
+    def _parse_frame(self, data: bytes) -> Union[OWNMessage, str]:
+        if self._message_cache is not None:
+            _message = self._message_cache.get(data)
+            if _message is not None:
+                return _message
+        _decoded_data = data.decode()
+        _message = OWNMessage.parse(_decoded_data, lazy=self._lazy)
+        _message = _message if _message else _decoded_data
+        if self._message_cache is not None:
+            self._message_cache.put(data, _message)
+        return _message
 
 
 class OWNCommandSession(OWNSession):
-    def __init__(self, gateway: OWNGateway = None, logger: logging.Logger = None):
+    def __init__(
+        self,
+        gateway: OWNGateway = None,
+        logger: logging.Logger = None,
+        observer: Optional[OWNSessionObserver] = None,
+    ):
+        """An `observer` is told the round trip time of every command,
+        about retries and about reconnections."""
         super().__init__(gateway=gateway, connection_type="command", logger=logger)
+        self._observer = observer
+        # Set when sending failed unexpectedly, the session must not be used again
+        self.broken = False
 
     @classmethod
     async def send_to_gateway(cls, message: str, gateway: OWNGateway):
@@ -699,48 +960,287 @@ class OWNCommandSession(OWNSession):
     async def send(self, message, is_status_request: bool = False, attempt: int = 1):
         """Send the attached message on an existing 'command' connection,
         actively reconnecting it if it had been reset."""
+        await self.send_pipelined(((message, is_status_request),), attempt=attempt)
 
-        try:
+    async def send_pipelined(
+        self,
+        commands,
+        depth: int = 1,
+        attempt: int = 1,
+        retries: int = 2,
+        on_message: Optional[Callable[[OWNMessage], None]] = None,
+    ) -> List[Optional[bool]]:
+        """Send (message, is_status_request) pairs keeping up to `depth` of them
+        in flight at once. The gateway answers commands in order, so each
+        ACK/NACK belongs to the oldest command still in flight.
+        A refused command is sent again up to `retries` times. Commands are
+        written in order, and not while one for the same WHO and WHERE is in
+        flight, so a retry cannot go out after a later command to its target.
+        `on_message` is given the other messages read in reply, such as the
+        status frames answering a status request.
+        Returns, for each command, True if it was acknowledged, False if it
+        was still refused after retrying and None if the session failed."""
+
+        _results = [None] * len(commands)
+        _queued = deque(
+            (_index, _message, _is_status_request, attempt)
+            for _index, (_message, _is_status_request) in enumerate(commands)
+        )
+        # (command, time it was written)
+        _in_flight = deque()
 
-            self._stream_writer.write(str(message).encode())
-            await self._stream_writer.drain()
-            raw_response = await self._stream_reader.readuntil(OWNSession.SEPARATOR)
-            resulting_message = OWNMessage.parse(raw_response.decode())
+        while _queued or _in_flight:
+            try:
+                while (
+                    _queued
+                    and len(_in_flight) < depth
+                    and self._target(_queued[0][1]) not in {self._target(_sent[0][1]) for _sent in _in_flight}
+                ):
+                    _command = _queued.popleft()
+                    self._stream_writer.write(str(_command[1]).encode())
+                    _in_flight.append((_command, time.perf_counter()))
+                await self._stream_writer.drain()
 
-            while not isinstance(resulting_message, OWNSignaling):
-                self._logger.debug(
-                    "%s Message `%s` received response `%s`.",
-                    self._gateway.log_id,
-                    message,
-                    resulting_message,
-                )
                 raw_response = await self._stream_reader.readuntil(OWNSession.SEPARATOR)
                 resulting_message = OWNMessage.parse(raw_response.decode())
+                (_index, message, is_status_request, _attempt), _written = _in_flight[0]
 
-            if resulting_message.is_nack():
-                if attempt <= 2:
-                    self._logger.error(
-                        "%s Could not send message `%s`. Retrying (%d)...", self._gateway.log_id, message,
-                        attempt
+                if not isinstance(resulting_message, OWNSignaling):
+                    self._logger.debug(
+                        "%s Message `%s` received response `%s`.",
+                        self._gateway.log_id,
+                        message,
+                        resulting_message,
                     )
-                    return await self.send(message, is_status_request, attempt + 1)
-                else:
-                    self._logger.error(
-                        "%s Could not send message `%s`. No more retries.", self._gateway.log_id, message
+                    if on_message is not None and resulting_message is not None:
+                        on_message(resulting_message)
+                    continue
+
+                _in_flight.popleft()
+                if self._observer is not None and (
+                    resulting_message.is_nack() or resulting_message.is_ack()
+                ):
+                    self._observer.command_replied(
+                        time.perf_counter() - _written, resulting_message.is_ack()
                     )
-            elif resulting_message.is_ack():
-                log_message = "%s Message `%s` was successfully sent."
-                if not is_status_request:
-                    self._logger.info(log_message, self._gateway.log_id, message)
-                else:
-                    self._logger.debug(log_message, self._gateway.log_id, message)
-                    
-        except (ConnectionResetError, asyncio.IncompleteReadError):
-            self._logger.debug(
-                "%s Command session connection reset, retrying...", self._gateway.log_id
+                if resulting_message.is_nack():
+                    if _attempt <= retries:
+                        self._logger.error(
+                            "%s Could not send message `%s`. Retrying (%d)...", self._gateway.log_id, message,
+                            _attempt
+                        )
+                        # Only the refused command goes out again
+                        _queued.appendleft((_index, message, is_status_request, _attempt + 1))
+                        if self._observer is not None:
+                            self._observer.command_retried()
+                    else:
+                        self._logger.error(
+                            "%s Could not send message `%s`. No more retries.", self._gateway.log_id, message
+                        )
+                        _results[_index] = False
+                elif resulting_message.is_ack():
+                    log_message = "%s Message `%s` was successfully sent."
+                    if not is_status_request:
+                        self._logger.info(log_message, self._gateway.log_id, message)
+                    else:
+                        self._logger.debug(log_message, self._gateway.log_id, message)
+                    _results[_index] = True
+
+            except (ConnectionResetError, asyncio.IncompleteReadError):
+                self._logger.debug(
+                    "%s Command session connection reset, retrying...", self._gateway.log_id
+                )
+                if self._observer is not None:
+                    self._observer.reconnected(self._type)
+                await self.connect()
+                # Commands that were not answered go out again on the new connection
+                while _in_flight:
+                    _queued.appendleft(_in_flight.pop()[0])
+            except Exception:  # pylint: disable=broad-except
+                # Commands not answered yet are left to the caller, as None
+                self._logger.exception("%s Command session crashed.", self._gateway.log_id)
+                self.broken = True
+                break
+
+        return _results
+
+    @staticmethod
+    def _target(message) -> tuple:
+        if isinstance(message, str):
+            _parsed = OWNMessage.parse(message)
+            if _parsed is None:
+                return (None, message)
+            message = _parsed
+        return (message.who, message.where)
+
+
+class OWNCommandSessionPool:
+    """Command sessions negotiated ahead of time, so that sending a command
+    never waits for the gateway handshake. Idle sessions are probed in the
+    background and lost ones are replaced asynchronously."""
+
+    # Gateway model request, answered by the gateway itself without using the bus
+    PROBE = "*#13**15##"
+    MAX_RETRY_DELAY = 60
+
+    def __init__(
+        self,
+        gateway: OWNGateway,
+        logger: logging.Logger = None,
+        size: int = 2,
+        health_interval: float = 30,
+        observer: Optional[OWNSessionObserver] = None,
+    ):
+        self._gateway = gateway
+        self._logger = logger
+        self._observer = observer
+        self.size = size
+        self.health_interval = health_interval
+        self._idle = asyncio.Queue()
+        self._sessions = set()
+        self._refill_task = None
+        self._health_task = None
+        self._closed = False
+        self.negotiations = 0
+        self.failed_negotiations = 0
+        self.failed_probes = 0
+
+    def start(self) -> None:
+        """Start negotiating sessions and probing them, in the background"""
+        self._closed = False
+        # Drop the wake up close() left for the waiters
+        _sessions = []
+        while not self._idle.empty():
+            _session = self._idle.get_nowait()
+            if _session is not None:
+                _sessions.append(_session)
+        for _session in _sessions:
+            self._idle.put_nowait(_session)
+        self._schedule_refill()
+        if self._health_task is None or self._health_task.done():
+            self._health_task = asyncio.get_running_loop().create_task(
+                self._health_loop()
             )
-            await self.connect()
-            await self.send(message=message, is_status_request=is_status_request)
+
+    async def acquire(self) -> OWNCommandSession:
+        """Wait for an idle, negotiated session.
+        Raises ConnectionError once the pool is closed."""
+        while True:
+            _session = await self._idle.get()
+            if _session is None:
+                # Leave the wake up for the other waiters
+                self._idle.put_nowait(None)
+                raise ConnectionError("Command session pool is closed.")
+            if self._is_alive(_session):
+                return _session
+            await self._discard(_session)
+
+    async def release(self, session: OWNCommandSession, healthy: bool = True) -> None:
+        """Give back a session obtained from acquire(). Unhealthy sessions are
+        closed and replaced in the background."""
+        if healthy and not self._closed and self._is_alive(session):
+            self._idle.put_nowait(session)
+        else:
+            await self._discard(session)
+
+    async def close(self) -> None:
+        """Close idle sessions now; sessions in use are closed when released"""
+        self._closed = True
+        for _task in (self._refill_task, self._health_task):
+            if _task is not None and not _task.done():
+                _task.cancel()
+        while not self._idle.empty():
+            _session = self._idle.get_nowait()
+            if _session is not None:
+                await self._discard(_session)
+        self._idle.put_nowait(None)
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "sessions": len(self._sessions),
+            "idle": 0 if self._closed else self._idle.qsize(),
+            "negotiations": self.negotiations,
+            "failed_negotiations": self.failed_negotiations,
+            "failed_probes": self.failed_probes,
+        }
+
+    @staticmethod
+    def _is_alive(session: OWNCommandSession) -> bool:
+        # Gateways drop idle command sessions on their side
+        return not (
+            session.broken
+            or session._stream_writer is None  # pylint: disable=protected-access
+            or session._stream_writer.is_closing()  # pylint: disable=protected-access
+            or session._stream_reader.at_eof()  # pylint: disable=protected-access
+        )
+
+    async def _discard(self, session: OWNCommandSession) -> None:
+        if self._observer is not None and not self._closed:
+            self._observer.reconnected(session.connection_type)
+        self._sessions.discard(session)
+        try:
+            await session.close()
         except Exception:  # pylint: disable=broad-except
-            self._logger.exception("%s Command session crashed.", self._gateway.log_id)
-            return None
+            self._logger.debug(
+                "%s Could not close pooled command session.", self._gateway.log_id
+            )
+        self._schedule_refill()
+
+    def _schedule_refill(self) -> None:
+        if self._closed or len(self._sessions) >= self.size:
+            return
+        if self._refill_task is None or self._refill_task.done():
+            self._refill_task = asyncio.get_running_loop().create_task(self._refill())
+
+    async def _refill(self) -> None:
+        retry_count = 0
+        while not self._closed and len(self._sessions) < self.size:
+            if retry_count > 0:
+                await asyncio.sleep(min(2**retry_count, self.MAX_RETRY_DELAY))
+            _session = OWNCommandSession(
+                gateway=self._gateway, logger=self._logger, observer=self._observer
+            )
+            try:
+                _result = await _session.connect()
+            except (OSError, asyncio.IncompleteReadError) as err:
+                _result = None
+                self._logger.warning(
+                    "%s Could not open pooled command session: %s",
+                    self._gateway.log_id,
+                    err,
+                )
+            self.negotiations += 1
+            if _result is None or not _result["Success"]:
+                self.failed_negotiations += 1
+                retry_count += 1
+                await _session.close()
+                continue
+            retry_count = 0
+            self._sessions.add(_session)
+            self._idle.put_nowait(_session)
+
+    async def _health_loop(self) -> None:
+        while not self._closed:
+            await asyncio.sleep(self.health_interval)
+            # Only sessions idle right now are probed; the others are in use
+            for _ in range(self._idle.qsize()):
+                try:
+                    _session = self._idle.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if _session is None:
+                    self._idle.put_nowait(None)
+                    return
+                _healthy = self._is_alive(_session) and (
+                    await _session.send_pipelined(((self.PROBE, True),))
+                )[0]
+                if not _healthy:
+                    self.failed_probes += 1
+                    self._logger.debug(
+                        "%s Pooled command session failed its health probe.",
+                        self._gateway.log_id,
+                    )
+                await self.release(_session, healthy=bool(_healthy))
+            self._schedule_refill()
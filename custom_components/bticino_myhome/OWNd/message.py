@@ -4,7 +4,7 @@ from __future__ import annotations
 
 import datetime
 import re
-from typing import Optional
+from typing import NamedTuple, Optional
 
 from dateutil.relativedelta import relativedelta
 import pytz
@@ -38,143 +38,294 @@ CLIMATE_MODE_AUTO = "auto"
 PIR_SENSITIVITY_MAPPING = ["low", "medium", "high", "very high"]
 
 
+_EVENT_FAMILY = "EVENT"
+_COMMAND_FAMILY = "COMMAND"
+_REQUEST_FAMILY = "REQUEST"
+
+_FRAME_FAMILIES = {
+    "STATUS": _EVENT_FAMILY,
+    "STATUS_REQUEST": _REQUEST_FAMILY,
+    "DIMENSION_REQUEST": _REQUEST_FAMILY,
+    "DIMENSION_REQUEST_REPLY": _EVENT_FAMILY,
+    "DIMENSION_WRITING": _COMMAND_FAMILY,
+}
+_LOOSE_WHO = re.compile(r"^\*#?(?P<who>\d+)\*.+##$")
+_SIGNALING_FRAMES = {
+    "*#*1##": "ACK",
+    "*#*0##": "NACK",
+    "*99*0##": "COMMAND_SESSION",
+    "*99*1##": "EVENT_SESSION",
+}
+
+
+def _split_address(token: str, allow_hash: bool = True):
+    """Split a `[#]ID#P1#Pn` token into its ID and its parameters.
+    Returns None if the token is not a well formed address."""
+    if token.isdecimal():  # Most addresses have no parameter
+        return token, ()
+    if allow_hash and token[:1] == "#":
+        parts = token[1:].split("#")
+        head = f"#{parts[0]}"
+    else:
+        parts = token.split("#")
+        head = parts[0]
+    for part in parts:
+        if not part.isdecimal():
+            return None
+    return head, tuple(parts[1:])
+
+
+def _split_params(token: str):
+    """Split a `#P1#Pn` token into its parameters.
+    Returns None if the token is not a well formed parameter list."""
+    parts = token.split("#")
+    if parts[0]:
+        return None
+    for part in parts[1:]:
+        if not part.isdecimal():
+            return None
+    return tuple(parts[1:])
+
+
+# Builds an OWNFrame from all its fields in order, without the keyword handling of its constructor
+_new_frame = tuple.__new__
+
+
+class OWNFrame(NamedTuple):
+    """Structured representation of a single OpenWebNet frame.
+    For signaling frames only `kind` is set, along with `values`
+    holding the nonce or SHA argument when there is one."""
+
+    kind: str
+    who: Optional[int] = None
+    what: Optional[int] = None
+    what_param: Optional[tuple] = None
+    where: Optional[str] = None
+    where_param: Optional[tuple] = None
+    dimension: Optional[int] = None
+    dimension_param: Optional[tuple] = None
+    values: Optional[tuple] = None
+
+    @classmethod
+    def parse(cls, data: str) -> Optional[OWNFrame]:
+        """Tokenize a raw frame in a single pass, returns None if it is not valid OpenWebNet"""
+        # `$` used to match right before a trailing newline, keep accepting it
+        body = data[:-1] if data[-1:] == "\n" else data
+        if body in _SIGNALING_FRAMES:
+            return cls(_SIGNALING_FRAMES[body])
+        if body[:1] != "*" or body[-2:] != "##":
+            return None
+
+        fields = body[1:-2].split("*")
+        count = len(fields)
+        first = fields[0]
+
+        if first[:1] != "#":  #  *WHO*WHAT*WHERE##
+            if not first.isdecimal():
+                return None
+            if count == 2:
+                if first == "98" and len(fields[1]) == 1 and fields[1].isdecimal():
+                    return cls("SHA", values=(fields[1],))
+                return None
+            if count == 3 and fields[1].isdecimal() and fields[2].isdecimal():
+                # *WHO*WHAT*WHERE## without parameters, most of the bus traffic
+                return _new_frame(cls, ("STATUS", int(first), int(fields[1]), (), fields[2], (), None, None, None))
+            if count == 3:
+                _where = _split_address(fields[2])
+            elif count == 4 and not fields[2]:  #  *WHO*WHAT**##
+                _where_param = _split_params(fields[3])
+                _where = ("*", _where_param) if _where_param is not None else None
+            else:
+                return None
+            _what = _split_address(fields[1], allow_hash=False)
+            if _what is None or _where is None:
+                return None
+            return _new_frame(cls, ("STATUS", int(first), int(_what[0]), _what[1], _where[0], _where[1], None, None, None))
+
+        _who = first[1:]
+        if not _who.isdecimal():
+            return None
+        if count == 1:  #  *#NONCE##
+            return cls("NONCE", values=(_who,))
+
+        if fields[1]:
+            _where = _split_address(fields[1])
+            if _where is None:
+                return None
+        elif count > 2:
+            _where = (None, ())
+        else:
+            return None
+
+        if count == 2:  #  *#WHO*WHERE##
+            return _new_frame(cls, ("STATUS_REQUEST", int(_who), None, None, _where[0], _where[1], None, None, None))
+
+        if count == 3:  #  *#WHO*WHERE*DIMENSION##
+            if not fields[2].isdecimal():
+                return None
+            return _new_frame(
+                cls, ("DIMENSION_REQUEST", int(_who), None, None, _where[0], _where[1], int(fields[2]), None, None)
+            )
+
+        #  *#WHO*WHERE*DIMENSION*VAL1*VALn## or *#WHO*WHERE*#DIMENSION*VAL1*VALn##
+        if fields[2][:1] == "#":
+            kind = "DIMENSION_WRITING"
+            _dimension = _split_address(fields[2][1:], allow_hash=False)
+        else:
+            kind = "DIMENSION_REQUEST_REPLY"
+            _dimension = _split_address(fields[2], allow_hash=False)
+        if _dimension is None:
+            return None
+        _values = tuple(fields[3:])
+        for _value in _values:
+            if _value and not _value.isdecimal():
+                return None
+        return _new_frame(
+            cls, (kind, int(_who), None, None, _where[0], _where[1], int(_dimension[0]), _dimension[1], _values)
+        )
+
+
+class OWNDecodeError(ValueError):
+    """Raised when a lazily parsed message cannot be decoded"""
+
+
+def _loose_who(data: str) -> Optional[int]:
+    """Extract the WHO of a frame the tokenizer rejected"""
+    _match = _LOOSE_WHO.match(data)
+    return int(_match.group("who")) if _match else None
+
+
+class _WhoRegistry:
+    """Maps a WHO, and for some families the first digit of the WHERE,
+    to the constructor building the matching message"""
+
+    def __init__(self):
+        self._by_who = {}
+        self._by_where_prefix = {}
+
+    def register(self, who: int, handler, where_prefix: Optional[str] = None):
+        if where_prefix is None:
+            self._by_who[who] = handler
+        elif len(where_prefix) != 1:
+            raise ValueError(f"WHERE prefix must be a single digit, got '{where_prefix}'")
+        else:
+            self._by_where_prefix.setdefault(who, {})[where_prefix] = handler
+
+    def lookup(self, who: int, where: Optional[str]):
+        handler = self._by_who.get(who)
+        if handler is None and where:
+            _prefixes = self._by_where_prefix.get(who)
+            if _prefixes is not None:
+                handler = _prefixes.get(where[0])
+        return handler
+
+
 class OWNMessage:
-    _ACK = re.compile(r"^\*#\*1##$")  #  *#*1##
-    _NACK = re.compile(r"^\*#\*0##$")  #  *#*0##
-    _COMMAND_SESSION = re.compile(r"^\*99\*0##$")  #  *99*0##
-    _EVENT_SESSION = re.compile(r"^\*99\*1##$")  #  *99*1##
-    _NONCE = re.compile(r"^\*#(\d+)##$")  #  *#123456789##
-    _SHA = re.compile(r"^\*98\*(\d)##$")  #  *98*SHA##
-
-    _STATUS = re.compile(
-        r"^\*(?P<who>\d+)\*(?P<what>\d+)(?P<what_param>(?:#\d+)*)\*(?P<where>\*|#?\d+)(?P<where_param>(?:#\d+)*)##$"  # pylint: disable=line-too-long
-    )  #  *WHO*WHAT*WHERE##
-    _STATUS_REQUEST = re.compile(
-        r"^\*#(?P<who>\d+)\*(?P<where>#?\d+)(?P<where_param>(?:#\d+)*)##$"
-    )  #  *#WHO*WHERE
-    _DIMENSION_WRITING = re.compile(
-        r"^\*#(?P<who>\d+)\*(?P<where>#?\d+)?(?P<where_param>(?:#\d+)*)?\*#(?P<dimension>\d+)(?P<dimension_param>(?:#\d+)*)?(?P<dimension_value>(?:\*\d*)+)##$"  # pylint: disable=line-too-long
-    )  #  *#WHO*WHERE*#DIMENSION*VAL1*VALn##
-    _DIMENSION_REQUEST = re.compile(
-        r"^\*#(?P<who>\d+)\*(?P<where>#?\d+)?(?P<where_param>(?:#\d+)*)?\*(?P<dimension>\d+)##$"
-    )  #  *#WHO*WHERE*DIMENSION##
-    _DIMENSION_REQUEST_REPLY = re.compile(
-        r"^\*#(?P<who>\d+)\*(?P<where>#?\d+)?(?P<where_param>(?:#\d+)*)?\*(?P<dimension>\d+)(?P<dimension_param>(?:#\d+)*)?(?P<dimension_value>(?:\*\d*)+)##$"  # pylint: disable=line-too-long
-    )  #  *#WHO*WHERE*DIMENSION*VAL1*VALn##
-
-    """ Base class for all OWN messages """
-
-    def __init__(self, data):
+    """Base class for all OWN messages"""
+
+    __slots__ = (
+        "_raw",
+        "_family",
+        "_who",
+        "_where",
+        "_is_valid_message",
+        "_decode_pending",
+        "_decode_error",
+        "_human_readable_log",
+        "_message_type",
+        "_what",
+        "_what_param",
+        "_where_param",
+        "_dimension",
+        "_dimension_param",
+        "_dimension_value",
+    )
+
+    def __init__(self, data, frame: Optional[OWNFrame] = None, lazy: bool = False):
         self._raw = data
-        self._human_readable_log = self._raw
         self._family = ""
         self._who = ""
         self._where = ""
         self._is_valid_message = False
 
-        if self._STATUS.match(self._raw):
+        if frame is None:
+            frame = OWNFrame.parse(data)
+        if frame is not None and frame.kind in _FRAME_FAMILIES:
             self._is_valid_message = True
-            self._match = self._STATUS.match(self._raw)
-            self._family = "EVENT"
-            self._message_type = "STATUS"
-            self._who = int(self._match.group("who"))
-            self._what = int(self._match.group("what"))
+            self._family = _FRAME_FAMILIES[frame.kind]
+            self._message_type = frame.kind
+            self._who = frame.who
+            self._what = frame.what
             if self._what == 1000:
                 self._family = "COMMAND_TRANSLATION"
-            self._what_param = self._match.group("what_param").split("#")
-            del self._what_param[0]
-            self._where = self._match.group("where")
-            self._where_param = self._match.group("where_param").split("#")
-            del self._where_param[0]
-            self._dimension = None
-            self._dimension_param = None
-            self._dimension_value = None
-
-        elif self._STATUS_REQUEST.match(self._raw):
-            self._is_valid_message = True
-            self._match = self._STATUS_REQUEST.match(self._raw)
-            self._family = "REQUEST"
-            self._message_type = "STATUS_REQUEST"
-            self._who = int(self._match.group("who"))
-            self._what = None
-            self._what_param = None
-            self._where = self._match.group("where")
-            self._where_param = self._match.group("where_param").split("#")
-            del self._where_param[0]
-            self._dimension = None
-            self._dimension_param = None
-            self._dimension_value = None
-
-        elif self._DIMENSION_REQUEST.match(self._raw):
-            self._is_valid_message = True
-            self._match = self._DIMENSION_REQUEST.match(self._raw)
-            self._family = "REQUEST"
-            self._message_type = "DIMENSION_REQUEST"
-            self._who = int(self._match.group("who"))
-            self._what = None
-            self._what_param = None
-            self._where = self._match.group("where")
-            self._where_param = self._match.group("where_param").split("#")
-            del self._where_param[0]
-            self._dimension = int(self._match.group("dimension"))
-            self._dimension_param = None
-            self._dimension_value = None
-
-        elif self._DIMENSION_REQUEST_REPLY.match(self._raw):
-            self._is_valid_message = True
-            self._match = self._DIMENSION_REQUEST_REPLY.match(self._raw)
-            self._family = "EVENT"
-            self._message_type = "DIMENSION_REQUEST_REPLY"
-            self._who = int(self._match.group("who"))
-            self._what = None
-            self._what_param = None
-            self._where = self._match.group("where")
-            self._where_param = self._match.group("where_param").split("#")
-            del self._where_param[0]
-            self._dimension = int(self._match.group("dimension"))
-            self._dimension_param = self._match.group("dimension_param").split("#")
-            del self._dimension_param[0]
-            self._dimension_value = self._match.group("dimension_value").split("*")
-            del self._dimension_value[0]
-
-        elif self._DIMENSION_WRITING.match(self._raw):
-            self._is_valid_message = True
-            self._match = self._DIMENSION_WRITING.match(self._raw)
-            self._family = "COMMAND"
-            self._message_type = "DIMENSION_WRITING"
-            self._who = int(self._match.group("who"))
-            self._what = None
-            self._what_param = None
-            self._where = self._match.group("where")
-            self._where_param = self._match.group("where_param").split("#")
-            del self._where_param[0]
-            self._dimension = int(self._match.group("dimension"))
-            self._dimension_param = self._match.group("dimension_param").split("#")
-            del self._dimension_param[0]
-            self._dimension_value = self._match.group("dimension_value").split("*")
-            del self._dimension_value[0]
+            self._what_param = frame.what_param
+            self._where = frame.where
+            self._where_param = frame.where_param
+            self._dimension = frame.dimension
+            self._dimension_param = frame.dimension_param
+            self._dimension_value = frame.values
+
+        self._decode_pending = lazy
+        if not lazy:
+            self._decode()
+
+    def _decode(self):
+        """Decode the typed fields and the log text of the message.
+        Runs on construction, or on first access for lazily parsed messages."""
+        self._human_readable_log = self._raw
+
+    def __getattr__(self, name: str):
+        # Only reached for attributes that are not set, which on a lazily
+        # parsed message are the fields that have not been decoded yet.
+        if name not in ("_decode_pending", "_decode_error"):
+            if getattr(self, "_decode_pending", False):
+                self._decode_pending = False
+                try:
+                    self._decode()
+                except Exception as err:
+                    self._decode_error = err
+                    self._discard_decoded_fields()
+                    raise OWNDecodeError(f"Could not decode message `{self._raw}`") from err
+                return getattr(self, name)
+            # Keep failing the same way for every later read of a message
+            # that could not be decoded, it may be shared through a cache.
+            _error = getattr(self, "_decode_error", None)
+            if _error is not None:
+                raise OWNDecodeError(f"Could not decode message `{self._raw}`") from _error
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    def _discard_decoded_fields(self):
+        """Unset whatever a failed decoding left behind"""
+        _fields = ["_human_readable_log"]
+        for _cls in type(self).__mro__:
+            if _cls is OWNMessage:
+                break
+            _fields.extend(getattr(_cls, "__slots__", ()))
+        for _field in _fields:
+            try:
+                delattr(self, _field)
+            except AttributeError:
+                pass
+
+    def decode(self) -> None:
+        """Decode a lazily parsed message now, instead of on first access.
+        Raises OWNDecodeError if it cannot be decoded."""
+        getattr(self, "_human_readable_log")
 
     @classmethod
-    def parse(cls, data) -> Optional[OWNMessage]:
-        if (
-            cls._ACK.match(data)
-            or cls._NACK.match(data)
-            or cls._COMMAND_SESSION.match(data)
-            or cls._EVENT_SESSION.match(data)
-            or cls._NONCE.match(data)
-            or cls._SHA.match(data)
-        ):
-            return OWNSignaling(data)
-        elif cls._STATUS.match(data) or cls._DIMENSION_REQUEST_REPLY.match(data):
-            return OWNEvent.parse(data)
-        elif (
-            cls._STATUS_REQUEST.match(data)
-            or cls._DIMENSION_REQUEST.match(data)
-            or cls._DIMENSION_WRITING.match(data)
-        ):
-            return OWNCommand.parse(data)
-        else:
+    def parse(cls, data, lazy: bool = False) -> Optional[OWNMessage]:
+        """Parse a raw frame into the matching message class.
+        With `lazy`, only the addressing fields are set right away and the
+        rest of the message is decoded the first time it is read."""
+        frame = OWNFrame.parse(data)
+        if frame is None:
             return None
+        elif frame.kind not in _FRAME_FAMILIES:
+            return OWNSignaling(data, frame)
+        elif _FRAME_FAMILIES[frame.kind] == _EVENT_FAMILY:
+            return OWNEvent.parse(data, frame, lazy)
+        else:
+            return OWNCommand.parse(data, frame, lazy)
 
     @property
     def is_event(self) -> bool:
@@ -196,6 +347,12 @@ class OWNMessage:
     def is_valid(self) -> bool:
         return self._is_valid_message
 
+    @property
+    def depends_on_date(self) -> bool:
+        """Whether decoding the message depends on the current date,
+        the same frame may then decode differently on another day"""
+        return False
+
     @property
     def who(self) -> int:
         """The 'who' ID of the subject of this message"""
@@ -341,48 +498,45 @@ class OWNEvent(OWNMessage):
     Dividing this in a subclass provides better clarity
     """
 
+    __slots__ = ()
+
+    _registry = _WhoRegistry()
+
+    @classmethod
+    def register(cls, who: int, handler, where_prefix: Optional[str] = None):
+        """Register the constructor used for frames of a WHO.
+        `handler` is called with the raw frame, its OWNFrame and the lazy flag.
+        With `where_prefix`, it only applies to WHEREs starting with that digit."""
+        cls._registry.register(who, handler, where_prefix)
+
     @classmethod
-    def parse(cls, data) -> Optional[OWNEvent]:
-        _match = re.match(r"^\*#?(?P<who>\d+)\*.+##$", data)
-
-        if _match:
-            _who = int(_match.group("who"))
-
-            if _who == 0:
-                return OWNScenarioEvent(data)
-            elif _who == 1:
-                return OWNLightingEvent(data)
-            elif _who == 2:
-                return OWNAutomationEvent(data)
-            elif _who == 4:
-                return OWNHeatingEvent(data)
-            elif _who == 5:
-                return OWNAlarmEvent(data)
-            elif _who == 9:
-                return OWNAuxEvent(data)
-            elif _who == 13:
-                return OWNGatewayEvent(data)
-            elif _who == 15:
-                return OWNCENEvent(data)
-            elif _who == 17:
-                return OWNSceneEvent(data)
-            elif _who == 18:
-                return OWNEnergyEvent(data)
-            elif _who == 25:
-                _where = re.match(r"^\*.+\*(?P<where>\d+)##$", data).group("where")
-                if _where.startswith("2"):
-                    return OWNCENPlusEvent(data)
-                elif _where.startswith("3"):
-                    return OWNDryContactEvent(data)
+    def parse(
+        cls, data, frame: Optional[OWNFrame] = None, lazy: bool = False
+    ) -> Optional[OWNEvent]:
+        if frame is None:
+            frame = OWNFrame.parse(data)
+        if frame is not None:
+            _who = frame.who
+            _where = frame.where
+        else:
+            _who = _loose_who(data)
+            _where = None
+
+        if _who is not None:
+            _handler = cls._registry.lookup(_who, _where)
+            if _handler is not None:
+                return _handler(data, frame, lazy)
             elif _who > 1000:
-                return cls(data)
+                return cls(data, frame, lazy)
 
         return None
 
 
 class OWNScenarioEvent(OWNEvent):
-    def __init__(self, data):
-        super().__init__(data)
+    __slots__ = ("_scenario", "_control_panel")
+
+    def _decode(self):
+        super()._decode()
 
         self._scenario = self._what
         self._control_panel = self._where
@@ -398,8 +552,22 @@ class OWNScenarioEvent(OWNEvent):
 
 
 class OWNLightingEvent(OWNEvent):
-    def __init__(self, data):
-        super().__init__(data)
+    __slots__ = (
+        "_type",
+        "_state",
+        "_brightness",
+        "_brightness_preset",
+        "_transition",
+        "_timer",
+        "_blinker",
+        "_illuminance",
+        "_motion",
+        "_pir_sensitivity",
+        "_motion_timeout",
+    )
+
+    def _decode(self):
+        super()._decode()
 
         self._type = None
         self._state = None
@@ -544,8 +712,18 @@ class OWNLightingEvent(OWNEvent):
 
 
 class OWNAutomationEvent(OWNEvent):
-    def __init__(self, data):
-        super().__init__(data)
+    __slots__ = (
+        "_state",
+        "_position",
+        "_priority",
+        "_info",
+        "_is_opening",
+        "_is_closing",
+        "_is_closed",
+    )
+
+    def _decode(self):
+        super()._decode()
 
         self._state = None
         self._position = None
@@ -628,8 +806,30 @@ class OWNAutomationEvent(OWNEvent):
 
 
 class OWNHeatingEvent(OWNEvent):
-    def __init__(self, data):
-        super().__init__(data)
+    __slots__ = (
+        "_type",
+        "_zone",
+        "_sensor",
+        "_actuator",
+        "_mode",
+        "_mode_name",
+        "_set_temperature",
+        "_local_offset",
+        "_local_set_temperature",
+        "_measured_temperature",
+        "_secondary_temperature",
+        "_measured_humidity",
+        "_is_active",
+        "_is_heating",
+        "_is_cooling",
+        "_fan_on",
+        "_fan_speed",
+        "_cooling_fan_on",
+        "_cooling_fan_speed",
+    )
+
+    def _decode(self):
+        super()._decode()
 
         self._type = None
 
@@ -965,8 +1165,10 @@ class OWNHeatingEvent(OWNEvent):
 
 
 class OWNAlarmEvent(OWNEvent):
-    def __init__(self, data):
-        super().__init__(data)
+    __slots__ = ("_state_code", "_state", "_system", "_zone", "_sensor")
+
+    def _decode(self):
+        super()._decode()
 
         self._state_code = int(self._what)
         self._state = None
@@ -1078,8 +1280,10 @@ class OWNAlarmEvent(OWNEvent):
 
 
 class OWNAuxEvent(OWNEvent):
-    def __init__(self, data):
-        super().__init__(data)
+    __slots__ = ("_channel", "_state")
+
+    def _decode(self):
+        super()._decode()
 
         self._channel = self._where
 
@@ -1143,8 +1347,29 @@ class OWNAuxEvent(OWNEvent):
 
 
 class OWNGatewayEvent(OWNEvent):
-    def __init__(self, data):
-        super().__init__(data)
+    __slots__ = (
+        "_year",
+        "_month",
+        "_day",
+        "_hour",
+        "_minute",
+        "_second",
+        "_timezone",
+        "_time",
+        "_date",
+        "_datetime",
+        "_ip_address",
+        "_netmask",
+        "_mac_address",
+        "_device_type",
+        "_firmware_version",
+        "_uptime",
+        "_kernel_version",
+        "_distribution_version",
+    )
+
+    def _decode(self):
+        super()._decode()
 
         self._year = None
         self._month = None
@@ -1279,8 +1504,10 @@ class OWNGatewayEvent(OWNEvent):
 
 
 class OWNCENEvent(OWNEvent):
-    def __init__(self, data):
-        super().__init__(data)
+    __slots__ = ("push_button", "object", "_state")
+
+    def _decode(self):
+        super()._decode()
 
         try:
             self._state = self._what_param[0]
@@ -1316,8 +1543,10 @@ class OWNCENEvent(OWNEvent):
 
 
 class OWNSceneEvent(OWNEvent):
-    def __init__(self, data):
-        super().__init__(data)
+    __slots__ = ("_scene", "_state")
+
+    def _decode(self):
+        super()._decode()
 
         self._scene = self._where
         self._state = self._what
@@ -1363,8 +1592,26 @@ class OWNSceneEvent(OWNEvent):
 
 
 class OWNEnergyEvent(OWNEvent):
-    def __init__(self, data):
-        super().__init__(data)
+    __slots__ = (
+        "_type",
+        "_sensor",
+        "_active_power",
+        "_total_consumption",
+        "_hourly_consumption",
+        "_daily_consumption",
+        "_current_day_partial_consumption",
+        "_monthly_consumption",
+        "_current_month_partial_consumption",
+    )
+
+    @property
+    def depends_on_date(self) -> bool:
+        # Hourly and daily consumptions only give the month and the day, the
+        # year is the one of today's date, or of an earlier date that has them
+        return self._dimension in (511, 513, 514)
+
+    def _decode(self):
+        super()._decode()
 
         if not self._where.startswith("5") and not self._where.startswith("7"):
             return None
@@ -1514,8 +1761,10 @@ class OWNEnergyEvent(OWNEvent):
 
 
 class OWNDryContactEvent(OWNEvent):
-    def __init__(self, data):
-        super().__init__(data)
+    __slots__ = ("_state", "_detection", "_sensor")
+
+    def _decode(self):
+        super()._decode()
 
         self._state = 1 if self._what == 31 else 0
         self._detection = int(self._what_param[0])
@@ -1544,8 +1793,10 @@ class OWNDryContactEvent(OWNEvent):
 
 
 class OWNCENPlusEvent(OWNEvent):
-    def __init__(self, data):
-        super().__init__(data)
+    __slots__ = ("_state", "push_button", "object")
+
+    def _decode(self):
+        super()._decode()
 
         self._state = self._what
         self.push_button = int(self._what_param[0])
@@ -1605,6 +1856,34 @@ class OWNCENPlusEvent(OWNEvent):
         return self._human_readable_log
 
 
+def _none_if_malformed(event_class):
+    """Constructor returning None, as the regex based parser did, for a frame
+    of the family its decoder cannot make sense of. These messages are
+    decoded right away even when parsed lazily, to know whether they can be."""
+
+    def _parse(data, frame: Optional[OWNFrame] = None, lazy: bool = False):
+        try:
+            return event_class(data, frame)
+        except (TypeError, ValueError, IndexError):
+            return None
+
+    return _parse
+
+
+OWNEvent.register(0, OWNScenarioEvent)
+OWNEvent.register(1, OWNLightingEvent)
+OWNEvent.register(2, OWNAutomationEvent)
+OWNEvent.register(4, OWNHeatingEvent)
+OWNEvent.register(5, OWNAlarmEvent)
+OWNEvent.register(9, OWNAuxEvent)
+OWNEvent.register(13, OWNGatewayEvent)
+OWNEvent.register(15, OWNCENEvent)
+OWNEvent.register(17, OWNSceneEvent)
+OWNEvent.register(18, OWNEnergyEvent)
+OWNEvent.register(25, _none_if_malformed(OWNCENPlusEvent), where_prefix="2")
+OWNEvent.register(25, _none_if_malformed(OWNDryContactEvent), where_prefix="3")
+
+
 class OWNCommand(OWNMessage):
     """
     This class is a subclass of messages.
@@ -1612,60 +1891,43 @@ class OWNCommand(OWNMessage):
     Dividing this in a subclass provides better clarity
     """
 
+    __slots__ = ()
+
+    _registry = _WhoRegistry()
+
+    @classmethod
+    def register(cls, who: int, handler, where_prefix: Optional[str] = None):
+        """Register the constructor used for frames of a WHO.
+        `handler` is called with the raw frame, its OWNFrame and the lazy flag.
+        With `where_prefix`, it only applies to WHEREs starting with that digit."""
+        cls._registry.register(who, handler, where_prefix)
+
     @classmethod
-    def parse(cls, data) -> Optional[OWNCommand]:
-        _match = re.match(r"^\*#?(?P<who>\d+)\*.+##$", data)
-
-        if _match:
-            _who = int(_match.group("who"))
-
-            if _who == 0:
-                return cls(data)
-            elif _who == 1:
-                return OWNLightingCommand(data)
-            elif _who == 2:
-                return OWNAutomationCommand(data)
-            elif _who == 3:  # Charges / Loads ?
-                return cls(data)
-            elif _who == 4:
-                return OWNHeatingCommand(data)
-            elif _who == 5:
-                return cls(data)
-            elif _who == 6:  # VDES
-                return cls(data)
-            elif _who == 7:
-                return cls(data)
-            elif _who == 9:
-                return cls(data)
-            elif _who == 13:
-                return OWNGatewayCommand(data)
-            elif _who == 14:
-                return cls(data)
-            elif _who == 15:
-                return cls(data)
-            elif _who == 16:
-                return cls(data)
-            elif _who == 17:
-                return cls(data)
-            elif _who == 18:
-                return OWNEnergyCommand(data)
-            elif _who == 22:
-                return cls(data)
-            elif _who == 24:
-                return cls(data)
-            elif _who == 25:
-                _where = re.match(r"^\*.+\*(?P<where>\d+)##$", data).group("where")
-                if _where.startswith("2"):
-                    return cls(data)
-                elif _where.startswith("3"):
-                    return OWNDryContactCommand(data)
+    def parse(
+        cls, data, frame: Optional[OWNFrame] = None, lazy: bool = False
+    ) -> Optional[OWNCommand]:
+        if frame is None:
+            frame = OWNFrame.parse(data)
+        if frame is not None:
+            _who = frame.who
+            _where = frame.where
+        else:
+            _who = _loose_who(data)
+            _where = None
+
+        if _who is not None:
+            _handler = cls._registry.lookup(_who, _where)
+            if _handler is not None:
+                return _handler(data, frame, lazy)
             elif _who > 1000:
-                return cls(data)
+                return cls(data, frame, lazy)
 
         return None
 
 
 class OWNLightingCommand(OWNCommand):
+    __slots__ = ()
+
     @classmethod
     def status(cls, where):
         message = cls(f"*#1*{where}##")
@@ -1741,6 +2003,8 @@ class OWNLightingCommand(OWNCommand):
 
 
 class OWNAutomationCommand(OWNCommand):
+    __slots__ = ()
+
     @classmethod
     def status(cls, where):
         message = cls(f"*#2*{where}##")
@@ -1781,6 +2045,8 @@ class OWNAutomationCommand(OWNCommand):
 
 
 class OWNHeatingCommand(OWNCommand):
+    __slots__ = ()
+
     @classmethod
     def status(cls, where):
         message = cls(f"*#4*{where}##")
@@ -1863,6 +2129,8 @@ class OWNHeatingCommand(OWNCommand):
 
 
 class OWNAVCommand(OWNCommand):
+    __slots__ = ()
+
     @classmethod
     def receive_video(cls, where):
         camera_id = where
@@ -1885,8 +2153,21 @@ class OWNAVCommand(OWNCommand):
 
 
 class OWNGatewayCommand(OWNCommand):
-    def __init__(self, data):
-        super().__init__(data)
+    __slots__ = (
+        "_year",
+        "_month",
+        "_day",
+        "_hour",
+        "_minute",
+        "_second",
+        "_timezone",
+        "_time",
+        "_date",
+        "_datetime",
+    )
+
+    def _decode(self):
+        super()._decode()
 
         self._year = None
         self._month = None
@@ -1992,6 +2273,8 @@ class OWNGatewayCommand(OWNCommand):
 
 
 class OWNEnergyCommand(OWNCommand):
+    __slots__ = ()
+
     @classmethod
     def start_sending_instant_power(cls, where, duration: int = 65):
         where = f"{where}#0" if str(where).startswith("7") else str(where)
@@ -2069,6 +2352,8 @@ class OWNEnergyCommand(OWNCommand):
 
 
 class OWNDryContactCommand(OWNCommand):
+    __slots__ = ()
+
     @classmethod
     def status(cls, where):
         message = cls(f"*#25*{where}##")
@@ -2076,64 +2361,82 @@ class OWNDryContactCommand(OWNCommand):
         return message
 
 
+OWNCommand.register(0, OWNCommand)
+OWNCommand.register(1, OWNLightingCommand)
+OWNCommand.register(2, OWNAutomationCommand)
+OWNCommand.register(3, OWNCommand)  # Charges / Loads ?
+OWNCommand.register(4, OWNHeatingCommand)
+OWNCommand.register(5, OWNCommand)
+OWNCommand.register(6, OWNCommand)  # VDES
+OWNCommand.register(7, OWNCommand)
+OWNCommand.register(9, OWNCommand)
+OWNCommand.register(13, OWNGatewayCommand)
+OWNCommand.register(14, OWNCommand)
+OWNCommand.register(15, OWNCommand)
+OWNCommand.register(16, OWNCommand)
+OWNCommand.register(17, OWNCommand)
+OWNCommand.register(18, OWNEnergyCommand)
+OWNCommand.register(22, OWNCommand)
+OWNCommand.register(24, OWNCommand)
+OWNCommand.register(25, OWNCommand, where_prefix="2")
+OWNCommand.register(25, OWNDryContactCommand, where_prefix="3")
+
+
 class OWNSignaling(OWNMessage):
     """
     This class is a subclass of messages.
     It is dedicated to signaling messages such as ACK or Authentication negotiation
     """
 
-    def __init__(self, data):  # pylint: disable=super-init-not-called
+    __slots__ = ("_type", "_value")
+
+    _HUMAN_READABLE_LOGS = {
+        "ACK": "ACK.",
+        "NACK": "NACK.",
+        "COMMAND_SESSION": "Command session requested.",
+        "EVENT_SESSION": "Event session requested.",
+    }
+
+    def __init__(
+        self, data, frame: Optional[OWNFrame] = None
+    ):  # pylint: disable=super-init-not-called
         self._raw = data
         self._family = None
         self._type = "UNKNOWN"
+        self._value = None
         self._human_readable_log = data
 
-        if self._ACK.match(self._raw):
-            self._match = self._ACK.match(self._raw)
-            self._family = "SIGNALING"
-            self._type = "ACK"
-            self._human_readable_log = "ACK."
-        elif self._NACK.match(self._raw):
-            self._match = self._NACK.match(self._raw)
-            self._family = "SIGNALING"
-            self._type = "NACK"
-            self._human_readable_log = "NACK."
-        elif self._NONCE.match(self._raw):
-            self._match = self._NONCE.match(self._raw)
-            self._family = "SIGNALING"
+        if frame is None:
+            frame = OWNFrame.parse(data)
+        if frame is None or frame.kind in _FRAME_FAMILIES:
+            return
+
+        self._family = "SIGNALING"
+        if frame.kind == "NONCE":
             self._type = "NONCE"
-            self._human_readable_log = (
-                f"Nonce challenge received: {self._match.group(1)}."
-            )
-        elif self._SHA.match(self._raw):
-            self._match = self._SHA.match(self._raw)
-            self._family = "SIGNALING"
-            self._type = f"SHA{'-1' if self._match.group(1) == '1' else '-256'}"
-            self._human_readable_log = f"SHA{'-1' if self._match.group(1) == '1' else '-256'} challenge received."  # pylint: disable=line-too-long
-        elif self._COMMAND_SESSION.match(self._raw):
-            self._match = self._COMMAND_SESSION.match(self._raw)
-            self._family = "SIGNALING"
-            self._type = "COMMAND_SESSION"
-            self._human_readable_log = "Command session requested."
-        elif self._EVENT_SESSION.match(self._raw):
-            self._match = self._EVENT_SESSION.match(self._raw)
-            self._family = "SIGNALING"
-            self._type = "EVENT_SESSION"
-            self._human_readable_log = "Event session requested."
+            self._value = frame.values[0]
+            self._human_readable_log = f"Nonce challenge received: {self._value}."
+        elif frame.kind == "SHA":
+            self._type = f"SHA{'-1' if frame.values[0] == '1' else '-256'}"
+            self._value = frame.values[0]
+            self._human_readable_log = f"{self._type} challenge received."
+        else:
+            self._type = frame.kind
+            self._human_readable_log = self._HUMAN_READABLE_LOGS[frame.kind]
 
     @property
     def nonce(self):
         """Return the authentication nonce IF the message is a nonce message"""
-        if self.is_nonce:  # pylint: disable=using-constant-test
-            return self._match.group(1)
+        if self.is_nonce():
+            return self._value
         else:
             return None
 
     @property
     def sha_version(self):
         """Return the authentication SHA version IF the message is a SHA challenge message"""
-        if self.is_sha:  # pylint: disable=using-constant-test
-            return self._match.group(1)
+        if self.is_sha():
+            return self._value
         else:
             return None
 
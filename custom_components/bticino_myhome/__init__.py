@@ -6,6 +6,7 @@ from homeassistant.config_entries import SOURCE_REAUTH, ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.exceptions import ConfigEntryNotReady
 from homeassistant.helpers import device_registry as dr, entity_registry as er, config_validation as cv
+from homeassistant.components.sensor import DOMAIN as SENSOR
 from homeassistant.const import CONF_MAC
 
 from .const import (
@@ -13,10 +14,12 @@ from .const import (
     ATTR_AREA_START,
     ATTR_CLEAR,
     ATTR_DURATION,
+    ATTR_FAST,
     ATTR_GATEWAY,
     ATTR_MESSAGE,
     ATTR_POINT_END,
     ATTR_POINT_START,
+    ATTR_RESCAN,
     ATTR_SCAN_COVERS,
     ATTR_SCAN_CLIMATE,
     ATTR_SCAN_POWER,
@@ -31,9 +34,21 @@ from .const import (
     DISCOVERY_DEFAULT_POINT_START,
     CONF_WORKER_COUNT,
     CONF_GENERATE_EVENTS,
+    CONF_MESSAGE_CACHE_SIZE,
+    MESSAGE_CACHE_DEFAULT_SIZE,
+    CONF_COMMAND_POOL_SIZE,
+    COMMAND_POOL_DEFAULT_SIZE,
+    CONF_EVENT_QUEUE_OVERFLOW,
+    EVENT_QUEUE_OVERFLOW_BLOCK,
+    CONF_STATE_WRITE_WINDOW,
+    STATE_WRITE_DEFAULT_WINDOW,
+    CONF_SHADOW_STATE_TTL,
+    SHADOW_STATE_DEFAULT_TTL,
+    CONF_COLLECT_METRICS,
     DOMAIN,
     LOGGER,
 )
+from .metrics import METRIC_SENSORS, metric_sensor_unique_id
 from .validate import config_schema, format_mac
 from .gateway import MyHOMEGatewayHandler
 from .web import async_setup_web, async_unload_web
@@ -66,6 +81,36 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
         if CONF_GENERATE_EVENTS in entry.options
         else False
     )
+    _message_cache_size = (
+        int(entry.options[CONF_MESSAGE_CACHE_SIZE])
+        if CONF_MESSAGE_CACHE_SIZE in entry.options
+        else MESSAGE_CACHE_DEFAULT_SIZE
+    )
+    _command_pool_size = (
+        int(entry.options[CONF_COMMAND_POOL_SIZE])
+        if CONF_COMMAND_POOL_SIZE in entry.options
+        else COMMAND_POOL_DEFAULT_SIZE
+    )
+    _event_queue_overflow = (
+        entry.options[CONF_EVENT_QUEUE_OVERFLOW]
+        if CONF_EVENT_QUEUE_OVERFLOW in entry.options
+        else EVENT_QUEUE_OVERFLOW_BLOCK
+    )
+    _state_write_window = (
+        int(entry.options[CONF_STATE_WRITE_WINDOW])
+        if CONF_STATE_WRITE_WINDOW in entry.options
+        else STATE_WRITE_DEFAULT_WINDOW
+    )
+    _shadow_state_ttl = (
+        int(entry.options[CONF_SHADOW_STATE_TTL])
+        if CONF_SHADOW_STATE_TTL in entry.options
+        else SHADOW_STATE_DEFAULT_TTL
+    )
+    _collect_metrics = (
+        entry.options[CONF_COLLECT_METRICS]
+        if CONF_COLLECT_METRICS in entry.options
+        else True
+    )
     _discovery_by_activation = True
 
     raw_gateway_config = await async_get_or_init_gateway_config(
@@ -87,6 +132,12 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
         config_entry=entry,
         generate_events=_generate_events,
         discovery_by_activation=_discovery_by_activation,
+        message_cache_size=_message_cache_size,
+        command_pool_size=_command_pool_size,
+        event_queue_overflow=_event_queue_overflow,
+        state_write_window=_state_write_window / 1000,
+        collect_metrics=_collect_metrics,
+        shadow_state_ttl=_shadow_state_ttl,
     )
 
     try:
@@ -141,6 +192,10 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
         sw_version=hass.data[DOMAIN][entry.data[CONF_MAC]][CONF_ENTITY].firmware,
     )
 
+    # The gateway metrics are diagnostic sensors, even without any configured sensor
+    if hass.data[DOMAIN][entry.data[CONF_MAC]][CONF_ENTITY].metrics is not None:
+        hass.data[DOMAIN][entry.data[CONF_MAC]][CONF_PLATFORMS].setdefault(SENSOR, {})
+
     await hass.config_entries.async_forward_entry_setups(
         entry, hass.data[DOMAIN][entry.data[CONF_MAC]][CONF_PLATFORMS].keys()
     )
@@ -150,6 +205,12 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
             hass.data[DOMAIN][entry.data[CONF_MAC]][CONF_ENTITY].listening_loop()
         )
     )
+    hass.data[DOMAIN][entry.data[CONF_MAC]][CONF_ENTITY].dispatching_worker = (
+        hass.loop.create_task(
+            hass.data[DOMAIN][entry.data[CONF_MAC]][CONF_ENTITY].dispatching_loop()
+        )
+    )
+    hass.data[DOMAIN][entry.data[CONF_MAC]][CONF_ENTITY].command_pool.start()
     for i in range(_command_worker_count):
         hass.data[DOMAIN][entry.data[CONF_MAC]][CONF_ENTITY].sending_workers.append(
             hass.loop.create_task(
@@ -157,6 +218,17 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
             )
         )
 
+    # The lights, switches and covers added above are refreshed together
+    hass.data[DOMAIN][entry.data[CONF_MAC]][CONF_ENTITY].start_startup_refresh()
+    hass.data[DOMAIN][entry.data[CONF_MAC]][CONF_ENTITY].polling_worker = (
+        hass.loop.create_task(
+            hass.data[DOMAIN][entry.data[CONF_MAC]][CONF_ENTITY].polling_loop()
+        )
+    )
+
+    # A discovery scan interrupted by a restart goes on where it stopped
+    await hass.data[DOMAIN][entry.data[CONF_MAC]][CONF_ENTITY].resume_discovery_job()
+
     # Pruning lose entities and devices from the registry
     entity_entries = er.async_entries_for_config_entry(entity_registry, entry.entry_id)
 
@@ -185,6 +257,11 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
                         f"{entry.data[CONF_MAC]}-{_device}"
                     )  # extrapolating _attr_unique_id out of the entity's place in the config data structure
 
+    if hass.data[DOMAIN][entry.data[CONF_MAC]][CONF_ENTITY].metrics is not None:
+        configured_entities.extend(
+            metric_sensor_unique_id(entry.data[CONF_MAC], _key) for _key in METRIC_SENSORS
+        )
+
     for entity_entry in entity_entries:
         if entity_entry.unique_id in configured_entities:
             if entity_entry.device_id in devices_to_be_removed:
@@ -346,10 +423,12 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
         )
         point_end = int(call.data.get(ATTR_POINT_END, DISCOVERY_DEFAULT_POINT_END))
         duration = int(call.data.get(ATTR_DURATION, DISCOVERY_DEFAULT_DURATION))
+        rescan = bool(call.data.get(ATTR_RESCAN, False))
+        fast = bool(call.data.get(ATTR_FAST, False))
 
         gateway_handler = hass.data[DOMAIN][gateway][CONF_ENTITY]
         LOGGER.info(
-            "%s Starting device discovery (lights=%s, covers=%s, climate=%s, power=%s, area=%s-%s, point=%s-%s, duration=%ss).",
+            "%s Starting device discovery (lights=%s, covers=%s, climate=%s, power=%s, area=%s-%s, point=%s-%s, duration=%ss, rescan=%s, fast=%s).",
             gateway_handler.log_id,
             scan_lights,
             scan_covers,
@@ -360,6 +439,8 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
             point_start,
             point_end,
             duration,
+            rescan,
+            fast,
         )
 
         try:
@@ -373,9 +454,11 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
                 point_start=point_start,
                 point_end=point_end,
                 duration=duration,
+                rescan=rescan,
+                fast=fast,
             )
-        except RuntimeError as runtime_error:
-            LOGGER.warning("%s %s", gateway_handler.log_id, runtime_error)
+        except (RuntimeError, ConnectionError) as discovery_error:
+            LOGGER.warning("%s %s", gateway_handler.log_id, discovery_error)
             return False
 
         light_results = results.get("light", [])
@@ -8,7 +8,6 @@ from homeassistant.components.binary_sensor import (
 from homeassistant.const import (
     CONF_NAME,
     CONF_MAC,
-    CONF_ENTITIES,
     STATE_ON,
 )
 from homeassistant.helpers.restore_state import RestoreEntity
@@ -35,8 +34,9 @@ from .const import (
     CONF_INVERTED,
     DOMAIN,
     LOGGER,
+    SEND_PRIORITY_BACKGROUND,
 )
-from .myhome_device import MyHOMEEntity
+from .myhome_device import MyHOMEEntity, send_priority
 from .gateway import MyHOMEGatewayHandler
 
 SCAN_INTERVAL = timedelta(seconds=5)
@@ -149,15 +149,9 @@ class MyHOMEDryContact(MyHOMEEntity, BinarySensorEntity):
         self._attr_is_on = False
         self._attr_extra_state_attributes = {"Sensor": f"({self._where[0]}){self._where[1:]}"}
 
-    async def async_added_to_hass(self):
-        """When entity is added to hass."""
-        self._hass.data[DOMAIN][self._gateway_handler.mac][CONF_PLATFORMS][self._platform][self._device_id][CONF_ENTITIES][self._attr_device_class] = self
-        await self.async_update()
-
-    async def async_will_remove_from_hass(self):
-        """When entity is removed from hass."""
-        if self._attr_device_class in self._hass.data[DOMAIN][self._gateway_handler.mac][CONF_PLATFORMS][self._platform][self._device_id][CONF_ENTITIES]:
-            del self._hass.data[DOMAIN][self._gateway_handler.mac][CONF_PLATFORMS][self._platform][self._device_id][CONF_ENTITIES][self._attr_device_class]
+    @property
+    def _entity_key(self) -> str:
+        return self._attr_device_class
 
     async def async_update(self):
         """Update the entity.
@@ -174,7 +168,7 @@ class MyHOMEDryContact(MyHOMEEntity, BinarySensorEntity):
             message.human_readable_log,
         )
         self._attr_is_on = message.is_on != self._inverted
-        self.async_schedule_update_ha_state()
+        self.async_schedule_state_write()
 
 
 class MyHOMEAuxiliary(MyHOMEEntity, BinarySensorEntity):
@@ -214,15 +208,9 @@ class MyHOMEAuxiliary(MyHOMEEntity, BinarySensorEntity):
         self._attr_is_on = False
         self._attr_extra_state_attributes = {"Auxiliary channel": self._where}
 
-    async def async_added_to_hass(self):
-        """When entity is added to hass."""
-        self._hass.data[DOMAIN][self._gateway_handler.mac][CONF_PLATFORMS][self._platform][self._device_id][CONF_ENTITIES][self._attr_device_class] = self
-        await self.async_update()
-
-    async def async_will_remove_from_hass(self):
-        """When entity is removed from hass."""
-        if self._attr_device_class in self._hass.data[DOMAIN][self._gateway_handler.mac][CONF_PLATFORMS][self._platform][self._device_id][CONF_ENTITIES]:
-            del self._hass.data[DOMAIN][self._gateway_handler.mac][CONF_PLATFORMS][self._platform][self._device_id][CONF_ENTITIES][self._attr_device_class]
+    @property
+    def _entity_key(self) -> str:
+        return self._attr_device_class
 
     async def async_update(self):
         """AUX sensors are read only and cannot be queried, no async_update implementation."""
@@ -235,10 +223,13 @@ class MyHOMEAuxiliary(MyHOMEEntity, BinarySensorEntity):
             message.human_readable_log,
         )
         self._attr_is_on = message.is_on != self._inverted
-        self.async_schedule_update_ha_state()
+        self.async_schedule_state_write()
 
 
 class MyHOMEMotionSensor(MyHOMEEntity, BinarySensorEntity, RestoreEntity):
+    # Polls only check the motion timeout, they send nothing to the bus
+    _poll_interval = SCAN_INTERVAL.total_seconds()
+
     def __init__(
         self,
         hass,
@@ -274,7 +265,6 @@ class MyHOMEMotionSensor(MyHOMEEntity, BinarySensorEntity, RestoreEntity):
         self._attr_name = entity_name if entity_name else self._attr_device_class.replace("_", " ").capitalize()
 
         self._attr_unique_id = f"{gateway.mac}-{self._device_id}-{self._attr_device_class}"
-        self._attr_should_poll = True
         self._attr_is_on = None
         self._attr_extra_state_attributes = {
             "A": where[: len(where) // 2],
@@ -283,31 +273,32 @@ class MyHOMEMotionSensor(MyHOMEEntity, BinarySensorEntity, RestoreEntity):
             "Sensitivity": PIR_SENSITIVITY[1],
         }
 
+    @property
+    def _entity_key(self) -> str:
+        return self._attr_device_class
+
     async def async_added_to_hass(self):
         """When entity is added to hass."""
-        self._hass.data[DOMAIN][self._gateway_handler.mac][CONF_PLATFORMS][self._platform][self._device_id][CONF_ENTITIES][self._attr_device_class] = self
-        await self._gateway_handler.send_status_request(OWNLightingCommand.get_pir_sensitivity(self._where))
-        await self._gateway_handler.send_status_request(OWNLightingCommand.get_motion_timeout(self._where))
+        self._register_entity()
+        with send_priority(SEND_PRIORITY_BACKGROUND):
+            await self._gateway_handler.send_status_request(OWNLightingCommand.get_pir_sensitivity(self._where))
+            await self._gateway_handler.send_status_request(OWNLightingCommand.get_motion_timeout(self._where))
         state = await self.async_get_last_state()
         if state:
             self._attr_is_on = state.state == STATE_ON
             self._last_updated = state.last_updated
-        await self.async_update()
-
-    async def async_will_remove_from_hass(self):
-        """When entity is removed from hass."""
-        if self._attr_device_class in self._hass.data[DOMAIN][self._gateway_handler.mac][CONF_PLATFORMS][self._platform][self._device_id][CONF_ENTITIES]:
-            del self._hass.data[DOMAIN][self._gateway_handler.mac][CONF_PLATFORMS][self._platform][self._device_id][CONF_ENTITIES][self._attr_device_class]
+        with send_priority(SEND_PRIORITY_BACKGROUND):
+            await self.async_update()
 
     async def async_update(self):
         """Update the entity.
 
-        Only used by the generic entity update service.
+        Called by the gateway poll scheduler and the generic entity update service.
         """
         if self._attr_is_on and self._last_updated and self._last_updated + self._timeout < datetime.now(timezone.utc):
             self._attr_is_on = False
             self._last_updated = datetime.now(timezone.utc)
-            self.async_schedule_update_ha_state()
+            self.async_schedule_state_write()
 
     def handle_event(self, message: OWNLightingEvent):
         """Handle an event message."""
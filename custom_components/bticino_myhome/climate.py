@@ -300,7 +300,7 @@ class MyHOMEClimate(MyHOMEEntity, ClimateEntity):
             self._attr_hvac_action = (
                 HVACAction.COOLING if valve_position > 0 else HVACAction.IDLE
             )
-        self.async_schedule_update_ha_state()
+        self.async_schedule_state_write()
 
     async def async_set_hvac_mode(self, hvac_mode):
         """Set new target hvac mode."""
@@ -561,10 +561,10 @@ class MyHOMEClimate(MyHOMEEntity, ClimateEntity):
                     self._attr_fan_mode = fan_mode
 
             dim_values = getattr(message, "_dimension_value", None)
-            if isinstance(dim_values, list) and len(dim_values) >= 2:
+            if isinstance(dim_values, (list, tuple)) and len(dim_values) >= 2:
                 self._cooling_valve_state = self._decode_thermo_state(dim_values[0])
                 self._heating_valve_state = self._decode_thermo_state(dim_values[1])
-            elif isinstance(dim_values, list) and len(dim_values) == 1:
+            elif isinstance(dim_values, (list, tuple)) and len(dim_values) == 1:
                 actuator = getattr(message, "_actuator", None)
                 if actuator is not None:
                     self._actuators_status[str(actuator)] = self._decode_thermo_state(
@@ -591,4 +591,4 @@ class MyHOMEClimate(MyHOMEEntity, ClimateEntity):
             else:
                 self._attr_hvac_action = HVACAction.IDLE
 
-        self.async_schedule_update_ha_state()
+        self.async_schedule_state_write()
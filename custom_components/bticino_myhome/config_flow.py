@@ -45,6 +45,18 @@ from .const import (
     CONF_UDN,
     CONF_WORKER_COUNT,
     CONF_GENERATE_EVENTS,
+    CONF_MESSAGE_CACHE_SIZE,
+    MESSAGE_CACHE_DEFAULT_SIZE,
+    CONF_COMMAND_POOL_SIZE,
+    COMMAND_POOL_DEFAULT_SIZE,
+    CONF_EVENT_QUEUE_OVERFLOW,
+    EVENT_QUEUE_OVERFLOW_BLOCK,
+    EVENT_QUEUE_OVERFLOW_POLICIES,
+    CONF_STATE_WRITE_WINDOW,
+    STATE_WRITE_DEFAULT_WINDOW,
+    CONF_SHADOW_STATE_TTL,
+    SHADOW_STATE_DEFAULT_TTL,
+    CONF_COLLECT_METRICS,
     DOMAIN,
     LOGGER,
 )
@@ -428,6 +440,18 @@ class MyhomeOptionsFlowHandler(OptionsFlow):
             self.options[CONF_WORKER_COUNT] = 1
         if CONF_GENERATE_EVENTS not in self.options:
             self.options[CONF_GENERATE_EVENTS] = False
+        if CONF_MESSAGE_CACHE_SIZE not in self.options:
+            self.options[CONF_MESSAGE_CACHE_SIZE] = MESSAGE_CACHE_DEFAULT_SIZE
+        if CONF_COMMAND_POOL_SIZE not in self.options:
+            self.options[CONF_COMMAND_POOL_SIZE] = COMMAND_POOL_DEFAULT_SIZE
+        if CONF_EVENT_QUEUE_OVERFLOW not in self.options:
+            self.options[CONF_EVENT_QUEUE_OVERFLOW] = EVENT_QUEUE_OVERFLOW_BLOCK
+        if CONF_STATE_WRITE_WINDOW not in self.options:
+            self.options[CONF_STATE_WRITE_WINDOW] = STATE_WRITE_DEFAULT_WINDOW
+        if CONF_SHADOW_STATE_TTL not in self.options:
+            self.options[CONF_SHADOW_STATE_TTL] = SHADOW_STATE_DEFAULT_TTL
+        if CONF_COLLECT_METRICS not in self.options:
+            self.options[CONF_COLLECT_METRICS] = True
 
     async def async_step_init(self, user_input=None):  # pylint: disable=unused-argument
         """Manage the MyHome options."""
@@ -445,6 +469,12 @@ class MyhomeOptionsFlowHandler(OptionsFlow):
 
             self.options.update({CONF_WORKER_COUNT: user_input[CONF_WORKER_COUNT]})
             self.options.update({CONF_GENERATE_EVENTS: user_input[CONF_GENERATE_EVENTS]})
+            self.options.update({CONF_MESSAGE_CACHE_SIZE: user_input[CONF_MESSAGE_CACHE_SIZE]})
+            self.options.update({CONF_COMMAND_POOL_SIZE: user_input[CONF_COMMAND_POOL_SIZE]})
+            self.options.update({CONF_EVENT_QUEUE_OVERFLOW: user_input[CONF_EVENT_QUEUE_OVERFLOW]})
+            self.options.update({CONF_STATE_WRITE_WINDOW: user_input[CONF_STATE_WRITE_WINDOW]})
+            self.options.update({CONF_SHADOW_STATE_TTL: user_input[CONF_SHADOW_STATE_TTL]})
+            self.options.update({CONF_COLLECT_METRICS: user_input[CONF_COLLECT_METRICS]})
             self.options.update({CONF_NAME: entry_name})
 
             _data_update = not (self.data[CONF_HOST] == user_input[CONF_ADDRESS] and self.data[CONF_OWN_PASSWORD] == user_input[CONF_OWN_PASSWORD])
@@ -493,6 +523,30 @@ class MyhomeOptionsFlowHandler(OptionsFlow):
                         CONF_GENERATE_EVENTS,
                         description={"suggested_value": self.options[CONF_GENERATE_EVENTS]},
                     ): bool,
+                    Required(
+                        CONF_MESSAGE_CACHE_SIZE,
+                        description={"suggested_value": self.options[CONF_MESSAGE_CACHE_SIZE]},
+                    ): All(Coerce(int), Range(min=0, max=4096)),
+                    Required(
+                        CONF_COMMAND_POOL_SIZE,
+                        description={"suggested_value": self.options[CONF_COMMAND_POOL_SIZE]},
+                    ): All(Coerce(int), Range(min=1, max=10)),
+                    Required(
+                        CONF_EVENT_QUEUE_OVERFLOW,
+                        description={"suggested_value": self.options[CONF_EVENT_QUEUE_OVERFLOW]},
+                    ): In(EVENT_QUEUE_OVERFLOW_POLICIES),
+                    Required(
+                        CONF_STATE_WRITE_WINDOW,
+                        description={"suggested_value": self.options[CONF_STATE_WRITE_WINDOW]},
+                    ): All(Coerce(int), Range(min=0, max=1000)),
+                    Required(
+                        CONF_SHADOW_STATE_TTL,
+                        description={"suggested_value": self.options[CONF_SHADOW_STATE_TTL]},
+                    ): All(Coerce(int), Range(min=0, max=300)),
+                    Required(
+                        CONF_COLLECT_METRICS,
+                        description={"suggested_value": self.options[CONF_COLLECT_METRICS]},
+                    ): bool,
                 }
             ),
             errors=errors,
@@ -8,16 +8,23 @@ from typing import Any
 from homeassistant.const import CONF_MAC
 from homeassistant.helpers.storage import Store
 
-from .const import STORAGE_KEY, STORAGE_VERSION
+from .const import STATE_STORAGE_KEY, STORAGE_KEY, STORAGE_VERSION
 
 _ACTIVATION_KEY = "activation_discovery"
 _ACTIVATION_TYPES = ("light", "cover", "climate", "power")
+_DISCOVERY_KEY = "active_discovery"
 
 
 def _store(hass) -> Store:
     return Store(hass, STORAGE_VERSION, STORAGE_KEY)
 
 
+def state_snapshot_store(hass, gateway: str) -> Store:
+    """Store of the last known state of a gateway's endpoints, kept apart from
+    the configuration as it is written far more often."""
+    return Store(hass, STORAGE_VERSION, f"{STATE_STORAGE_KEY}_{gateway.replace(':', '').lower()}")
+
+
 async def async_load_data(hass) -> dict[str, Any]:
     """Load full MyHOME config storage payload."""
     data = await _store(hass).async_load()
@@ -29,6 +36,9 @@ async def async_load_data(hass) -> dict[str, Any]:
     activation = data.get(_ACTIVATION_KEY)
     if not isinstance(activation, dict):
         data[_ACTIVATION_KEY] = {}
+    discovery = data.get(_DISCOVERY_KEY)
+    if not isinstance(discovery, dict):
+        data[_DISCOVERY_KEY] = {}
     return data
 
 
@@ -66,7 +76,11 @@ async def async_remove_gateway_config(hass, gateway: str) -> None:
     activation = data.get(_ACTIVATION_KEY, {})
     if isinstance(activation, dict):
         activation.pop(gateway, None)
+    discovery = data.get(_DISCOVERY_KEY, {})
+    if isinstance(discovery, dict):
+        discovery.pop(gateway, None)
     await async_save_data(hass, data)
+    await state_snapshot_store(hass, gateway).async_remove()
 
 
 def _normalize_activation_snapshot(raw: dict[str, Any] | None) -> dict[str, list[str]]:
@@ -114,6 +128,61 @@ async def async_clear_activation_discovery_results(hass, gateway: str) -> None:
         await async_save_data(hass, data)
 
 
+def _normalize_discovery_progress(raw: dict[str, Any] | None) -> dict[str, Any]:
+    raw = raw if isinstance(raw, dict) else {}
+    job = raw.get("job")
+    return {
+        "probed": _normalize_activation_snapshot(raw.get("probed")),
+        "found": _normalize_activation_snapshot(raw.get("found")),
+        "job": deepcopy(job) if isinstance(job, dict) else None,
+    }
+
+
+async def async_get_discovery_progress(hass, gateway: str) -> dict[str, Any]:
+    """Get persisted active discovery progress for one gateway."""
+    data = await async_load_data(hass)
+    discovery = data.get(_DISCOVERY_KEY, {})
+    raw = discovery.get(gateway) if isinstance(discovery, dict) else None
+    return _normalize_discovery_progress(raw)
+
+
+async def async_set_discovery_progress(
+    hass,
+    gateway: str,
+    progress: dict[str, Any],
+) -> None:
+    """Persist active discovery progress for one gateway."""
+    data = await async_load_data(hass)
+    discovery = data.get(_DISCOVERY_KEY)
+    if not isinstance(discovery, dict):
+        discovery = {}
+        data[_DISCOVERY_KEY] = discovery
+    discovery[gateway] = _normalize_discovery_progress(progress)
+    await async_save_data(hass, data)
+
+
+async def async_clear_discovery_progress(hass, gateway: str) -> None:
+    """Clear persisted active discovery progress for one gateway."""
+    data = await async_load_data(hass)
+    discovery = data.get(_DISCOVERY_KEY)
+    if isinstance(discovery, dict):
+        discovery.pop(gateway, None)
+        await async_save_data(hass, data)
+
+
+def state_snapshot_payload(frames: list[str]) -> dict[str, Any]:
+    return {"frames": list(frames)}
+
+
+async def async_load_state_snapshot(store: Store) -> list[str]:
+    """Frames of the last known state saved in `store`, oldest first."""
+    data = await store.async_load()
+    frames = data.get("frames") if isinstance(data, dict) else None
+    if not isinstance(frames, list):
+        return []
+    return [frame for frame in frames if isinstance(frame, str)]
+
+
 async def async_get_or_init_gateway_config(hass, gateway: str) -> dict[str, Any]:
     """Return gateway config from storage, initializing an empty one when absent."""
     if stored := await async_get_gateway_config(hass, gateway):
@@ -5,6 +5,7 @@ LOGGER = logging.getLogger(__package__)
 DOMAIN = "bticino_myhome"
 STORAGE_VERSION = 1
 STORAGE_KEY = f"{DOMAIN}_config"
+STATE_STORAGE_KEY = f"{DOMAIN}_state"
 
 ATTR_GATEWAY = "gateway"
 ATTR_MESSAGE = "message"
@@ -17,6 +18,8 @@ ATTR_AREA_START = "area_start"
 ATTR_AREA_END = "area_end"
 ATTR_POINT_START = "point_start"
 ATTR_POINT_END = "point_end"
+ATTR_RESCAN = "rescan"
+ATTR_FAST = "fast"
 ATTR_ENABLED = "enabled"
 ATTR_CLEAR = "clear"
 
@@ -25,6 +28,57 @@ DISCOVERY_DEFAULT_AREA_END = 0
 DISCOVERY_DEFAULT_POINT_START = 1
 DISCOVERY_DEFAULT_POINT_END = 15
 DISCOVERY_DEFAULT_DURATION = 8
+# Discovery scans use sessions of their own, see DiscoveryScanner
+DISCOVERY_SESSION_COUNT = 1
+DISCOVERY_WINDOW = 8
+DISCOVERY_RATE = 40
+# Seconds between two saves of the progress of a discovery scan
+DISCOVERY_SAVE_INTERVAL = 5
+# Seconds after startup before a scan interrupted by a restart is resumed
+DISCOVERY_RESUME_DELAY = 60
+# Startup refresh: a family with endpoints in this many areas is asked with one general
+# status request, replies are awaited until none came for STARTUP_REFRESH_QUIET seconds
+STARTUP_REFRESH_GENERAL_AREAS = 3
+STARTUP_REFRESH_QUIET = 5
+STARTUP_REFRESH_TIMEOUT = 60
+# Status requests following general and area lighting events are merged until none came for
+# the window, at most the max delay; as many areas as FOLLOW_UP_REFRESH_GENERAL_AREAS make a general one
+FOLLOW_UP_REFRESH_WINDOW = 0.5
+FOLLOW_UP_REFRESH_MAX_DELAY = 2
+FOLLOW_UP_REFRESH_GENERAL_AREAS = 3
+# Status requests per second sent by the poll scheduler, and fraction of its interval
+# under which a state read from the bus makes a poll unnecessary
+POLL_FRAME_BUDGET = 2
+POLL_FRESH_FRACTION = 0.5
+
+MESSAGE_CACHE_DEFAULT_SIZE = 256
+# Commands kept in flight on each command session before waiting for ACK/NACK
+COMMAND_PIPELINE_DEPTH = 8
+COMMAND_POOL_DEFAULT_SIZE = 2
+# Classes of the send buffer, the lower goes out first
+SEND_PRIORITY_INTERACTIVE = 0
+SEND_PRIORITY_REFRESH = 1
+SEND_PRIORITY_BACKGROUND = 2
+SEND_PRIORITY_DISCOVERY = 3
+SEND_PRIORITY_NAMES = ("interactive", "refresh", "background", "discovery")
+# Seconds the oldest command of a class waits to move up one class
+SEND_PRIORITY_AGING = 2
+# Messages read from the event session waiting to be dispatched
+EVENT_QUEUE_SIZE = 1024
+EVENT_QUEUE_OVERFLOW_BLOCK = "block"
+EVENT_QUEUE_OVERFLOW_DROP_OLDEST = "drop_oldest"
+EVENT_QUEUE_OVERFLOW_DROP_NEWEST = "drop_newest"
+EVENT_QUEUE_OVERFLOW_POLICIES = [
+    EVENT_QUEUE_OVERFLOW_BLOCK,
+    EVENT_QUEUE_OVERFLOW_DROP_OLDEST,
+    EVENT_QUEUE_OVERFLOW_DROP_NEWEST,
+]
+# Milliseconds entity state writes are held back to be coalesced, 0 is one event loop tick
+STATE_WRITE_DEFAULT_WINDOW = 0
+# Seconds a state read from the bus answers status requests instead of the bus, 0 always asks the bus
+SHADOW_STATE_DEFAULT_TTL = 5
+# Seconds between a change of the shadow state and the save of the last known state
+STATE_SNAPSHOT_SAVE_DELAY = 60
 
 CONF = "config"
 CONF_ENTITY = "entity"
@@ -45,6 +99,12 @@ CONF_MANUFACTURER_URL = "manufacturerURL"
 CONF_UDN = "UDN"
 CONF_WORKER_COUNT = "command_worker_count"
 CONF_GENERATE_EVENTS = "generate_events"
+CONF_MESSAGE_CACHE_SIZE = "message_cache_size"
+CONF_COMMAND_POOL_SIZE = "command_pool_size"
+CONF_EVENT_QUEUE_OVERFLOW = "event_queue_overflow"
+CONF_STATE_WRITE_WINDOW = "state_write_window"
+CONF_SHADOW_STATE_TTL = "shadow_state_ttl"
+CONF_COLLECT_METRICS = "collect_metrics"
 CONF_DISCOVERY_BY_ACTIVATION = "discovery_by_activation"
 CONF_PARENT_ID = "parent_id"
 CONF_WHO = "who"
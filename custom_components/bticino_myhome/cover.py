@@ -121,6 +121,10 @@ class MyHOMECover(MyHOMEEntity, CoverEntity):
         self._attr_is_closing = None
         self._attr_is_closed = None
 
+    @property
+    def _status_scope(self) -> tuple | None:
+        return (self._who, self._where) if self._interface is None else None
+
     async def async_update(self):
         """Update the entity.
 
@@ -160,4 +164,4 @@ class MyHOMECover(MyHOMEEntity, CoverEntity):
         if message.current_position is not None:
             self._attr_current_cover_position = message.current_position
 
-        self.async_schedule_update_ha_state()
+        self.async_schedule_state_write()
@@ -0,0 +1,227 @@
+"""Active discovery of the devices on a MyHome bus."""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .OWNd.connection import OWNCommandSession, OWNGateway
+from .OWNd.message import OWNCommand, OWNMessage
+
+DISCOVERY_FAMILIES = ("light", "cover", "climate", "power")
+
+# Status of a discovery job
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+# Reported for a running job that is no longer scheduled, never persisted
+JOB_INTERRUPTED = "interrupted"
+
+
+class DiscoveryProgress:
+    """Addresses probed and endpoints found by the discovery scans of a gateway.
+
+    It is persisted while a scan runs: a scan interrupted by a restart
+    resumes with the addresses not probed yet, and a scan of a wider range
+    only probes the addresses it adds. `job` describes the last scan, its
+    parameters, status and counters.
+    """
+
+    def __init__(
+        self,
+        probed: Optional[Dict[str, Iterable[str]]] = None,
+        found: Optional[Dict[str, Iterable[str]]] = None,
+        job: Optional[dict] = None,
+    ):
+        probed = probed or {}
+        found = found or {}
+        self.probed = {family: set(probed.get(family, ())) for family in DISCOVERY_FAMILIES}
+        self.found = {family: set(found.get(family, ())) for family in DISCOVERY_FAMILIES}
+        self.job = dict(job) if job else None
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "DiscoveryProgress":
+        return cls(data.get("probed"), data.get("found"), data.get("job"))
+
+    def as_dict(self) -> dict:
+        return {
+            "probed": {family: sorted(wheres) for family, wheres in self.probed.items()},
+            "found": {family: sorted(wheres) for family, wheres in self.found.items()},
+            "job": dict(self.job) if self.job else None,
+        }
+
+    def pending(self, targets: Iterable[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        """(family, where) targets not probed yet"""
+        return [(family, where) for family, where in targets if where not in self.probed[family]]
+
+    def forget(self, targets: Iterable[Tuple[str, str]]) -> None:
+        """Probe `targets` again, dropping what earlier scans found there"""
+        for family, where in targets:
+            self.probed[family].discard(where)
+            self.found[family].discard(where)
+
+    def results(self) -> Dict[str, List[str]]:
+        return {family: sorted(wheres) for family, wheres in self.found.items()}
+
+
+class DiscoveryScanner:
+    """Sends discovery status requests on command sessions of its own.
+
+    Requests are pipelined `window` at a time on each session and paced
+    to at most `rate` per second, so a scan never queues behind, or ahead
+    of, the commands of the sending workers. While `busy()` is true the
+    scanner steps aside so that user commands reach the bus first.
+
+    Once every request has been answered, the scan waits for late replies
+    until none came for a quiet period derived from the slowest batch round
+    trip, and at most `max_quiet` seconds.
+
+    `on_batch` is awaited with (request, acknowledged) pairs for the requests
+    of each batch the gateway answered, so that the progress of a scan can be
+    recorded.
+    """
+
+    # Bounds of the quiet period, the upper one is given to scan()
+    QUIET_MIN = 0.5
+    # Quiet period, in slowest batch round trips
+    QUIET_FACTOR = 4
+    # Seconds between two checks of busy()
+    BUSY_POLL = 0.05
+
+    def __init__(
+        self,
+        gateway: OWNGateway,
+        logger: logging.Logger,
+        on_message: Callable[[OWNMessage], None],
+        busy: Optional[Callable[[], bool]] = None,
+        sessions: int = 1,
+        window: int = 8,
+        rate: float = 40,
+        on_batch: Optional[Callable[[List[Tuple[OWNCommand, bool]]], Awaitable[None]]] = None,
+    ):
+        self._gateway = gateway
+        self._logger = logger
+        self._on_message = on_message
+        self._busy = busy if busy is not None else lambda: False
+        self.sessions = max(1, sessions)
+        self.window = max(1, window)
+        self.rate = rate
+        self._on_batch = on_batch
+        self._next_slot = 0.0
+        self._last_activity = 0.0
+        self._slowest_batch = 0.0
+        self.requests = 0
+        self.sent = 0
+        self.failed = 0
+        self.yielded = 0
+        self.quiet = None
+        self.elapsed = None
+
+    def note_activity(self) -> None:
+        """A reply to the scan was seen, possibly on the event session"""
+        self._last_activity = time.monotonic()
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "sent": self.sent,
+            "failed": self.failed,
+            "yielded": self.yielded,
+            "quiet": round(self.quiet, 2) if self.quiet is not None else None,
+            "elapsed": round(self.elapsed, 2) if self.elapsed is not None else None,
+        }
+
+    async def scan(self, requests: List[OWNCommand], max_quiet: float) -> None:
+        """Send every status request and wait for the replies to settle.
+        Raises ConnectionError if no session could be opened."""
+        _started = time.monotonic()
+        self.requests = len(requests)
+        _sessions = await self._open_sessions()
+        if not _sessions:
+            raise ConnectionError("Could not open a discovery session.")
+
+        _pending = deque(requests)
+        self._next_slot = time.monotonic()
+        self._last_activity = time.monotonic()
+        try:
+            await asyncio.gather(
+                *(self._send_requests(_session, _pending) for _session in _sessions)
+            )
+            await self._wait_for_quiet(max_quiet)
+        finally:
+            for _session in _sessions:
+                try:
+                    await _session.close()
+                except OSError:
+                    pass
+            self.elapsed = time.monotonic() - _started
+
+    async def _open_sessions(self) -> List[OWNCommandSession]:
+        _sessions = []
+        for _ in range(self.sessions):
+            _session = OWNCommandSession(gateway=self._gateway, logger=self._logger)
+            try:
+                _result = await _session.connect()
+            except OSError as err:
+                self._logger.warning(
+                    "%s Could not open a discovery session: %s", self._gateway.log_id, err
+                )
+                continue
+            if _result is None or not _result["Success"]:
+                await _session.close()
+                continue
+            _sessions.append(_session)
+        return _sessions
+
+    async def _send_requests(self, session: OWNCommandSession, pending: deque) -> None:
+        while pending:
+            if self._busy():
+                self.yielded += 1
+                while self._busy():
+                    await asyncio.sleep(self.BUSY_POLL)
+                continue
+
+            _batch = [pending.popleft() for _ in range(min(self.window, len(pending)))]
+            await self._pace(len(_batch))
+
+            _started = time.monotonic()
+            _results = await session.send_pipelined(
+                [(_request, True) for _request in _batch],
+                depth=self.window,
+                retries=0,
+                on_message=self._on_message,
+            )
+            _now = time.monotonic()
+            self._slowest_batch = max(self._slowest_batch, _now - _started)
+            self._last_activity = max(self._last_activity, _now)
+            self.sent += len(_batch)
+            self.failed += sum(1 for _result in _results if _result is None)
+            if self._on_batch is not None:
+                await self._on_batch(
+                    [
+                        (_request, _result)
+                        for _request, _result in zip(_batch, _results)
+                        if _result is not None
+                    ]
+                )
+
+    async def _pace(self, count: int) -> None:
+        """Wait for the slot of the next `count` requests"""
+        if self.rate <= 0:
+            return
+        _now = time.monotonic()
+        _slot = max(_now, self._next_slot)
+        self._next_slot = _slot + count / self.rate
+        if _slot > _now:
+            await asyncio.sleep(_slot - _now)
+
+    async def _wait_for_quiet(self, max_quiet: float) -> None:
+        self.quiet = min(max_quiet, max(self.QUIET_MIN, self.QUIET_FACTOR * self._slowest_batch))
+        _deadline = time.monotonic() + max_quiet
+        while True:
+            _now = time.monotonic()
+            _idle = _now - self._last_activity
+            if _idle >= self.quiet or _now >= _deadline:
+                return
+            await asyncio.sleep(min(self.quiet - _idle, _deadline - _now))
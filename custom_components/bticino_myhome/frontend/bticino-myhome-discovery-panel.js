@@ -8,6 +8,9 @@ class MyHOMEDiscoveryPanel extends HTMLElement {
     this._loadingConfig = false;
     this._savingConfig = false;
     this._result = null;
+    this._scanJob = null;
+    this._scanPoll = null;
+    this._startingScan = false;
     this._configDevices = null;
     this._candidateDrafts = {};
     this._error = "";
@@ -26,13 +29,32 @@ class MyHOMEDiscoveryPanel extends HTMLElement {
       manual_fan: true,
       manual_standalone: true,
       manual_section_open: false,
+      scan_area_start: 0,
+      scan_area_end: 0,
+      scan_point_start: 1,
+      scan_point_end: 15,
+      scan_lights: true,
+      scan_covers: true,
+      scan_climate: true,
+      scan_power: true,
+      scan_rescan: false,
+      scan_fast: false,
+      scan_section_open: false,
     };
   }
 
+  disconnectedCallback() {
+    if (this._scanPoll) {
+      clearTimeout(this._scanPoll);
+      this._scanPoll = null;
+    }
+  }
+
   set hass(hass) {
     if (this.childElementCount > 0) {
       this._readGatewayState();
       this._readManualState();
+      this._readScanState();
     }
     this._hass = hass;
     if (!this._loadingGateways && this._gateways.length === 0) {
@@ -118,6 +140,124 @@ class MyHOMEDiscoveryPanel extends HTMLElement {
     }
   }
 
+  _readScanState() {
+    const root = this;
+    ["scan_area_start", "scan_area_end", "scan_point_start", "scan_point_end"].forEach((field) => {
+      const input = root.querySelector(`#${field}`);
+      if (input && input.value !== "") {
+        this._state[field] = Number(input.value);
+      }
+    });
+    ["scan_lights", "scan_covers", "scan_climate", "scan_power", "scan_rescan", "scan_fast"].forEach((field) => {
+      const input = root.querySelector(`#${field}`);
+      if (input) {
+        this._state[field] = !!input.checked;
+      }
+    });
+    const scanSection = root.querySelector("#scan_section");
+    if (scanSection) {
+      this._state.scan_section_open = !!scanSection.open;
+    }
+  }
+
+  _scanRunning() {
+    return this._scanJob?.status === "running";
+  }
+
+  _applyScanStatus(response, showResults) {
+    if (response.gateway !== this._state.gateway) {
+      return;
+    }
+    const wasRunning = this._scanRunning();
+    this._scanJob = response.job || null;
+    if (showResults || this._scanRunning()) {
+      this._result = response;
+      this._refreshCandidateDrafts();
+    }
+    if (this._scanRunning()) {
+      this._scheduleScanPoll();
+    } else if (wasRunning && this._scanJob?.status === "completed") {
+      this._notice = "Bus scan completed.";
+    } else if (wasRunning && this._scanJob?.error) {
+      this._error = `Bus scan failed: ${this._scanJob.error}`;
+    }
+  }
+
+  _scheduleScanPoll() {
+    if (this._scanPoll) {
+      return;
+    }
+    // The scan runs on the gateway handler, its progress is polled
+    this._scanPoll = setTimeout(async () => {
+      this._scanPoll = null;
+      await this._loadScanStatus(true);
+      this._render();
+    }, 2000);
+  }
+
+  async _loadScanStatus(showResults = false) {
+    if (!this._hass || !this._state.gateway) {
+      return;
+    }
+    try {
+      const encodedGateway = encodeURIComponent(this._state.gateway);
+      const response = await this._hass.callApi("GET", `bticino_myhome/discovery?gateway=${encodedGateway}`);
+      this._applyScanStatus(response, showResults);
+    } catch (err) {
+      this._error = err?.body?.message || err?.message || "Unable to read the bus scan status.";
+    }
+  }
+
+  async _startScan() {
+    if (!this._hass || !this._state.gateway) {
+      return;
+    }
+    this._readScanState();
+    this._startingScan = true;
+    this._error = "";
+    this._notice = "";
+    this._render();
+    try {
+      const response = await this._hass.callApi("POST", "bticino_myhome/discovery", {
+        gateway: this._state.gateway,
+        scan_lights: this._state.scan_lights,
+        scan_covers: this._state.scan_covers,
+        scan_climate: this._state.scan_climate,
+        scan_power: this._state.scan_power,
+        area_start: this._state.scan_area_start,
+        area_end: this._state.scan_area_end,
+        point_start: this._state.scan_point_start,
+        point_end: this._state.scan_point_end,
+        rescan: this._state.scan_rescan,
+        fast: this._state.scan_fast,
+      });
+      this._applyScanStatus(response, true);
+    } catch (err) {
+      this._error = err?.body?.message || err?.message || "Unable to start the bus scan.";
+    } finally {
+      this._startingScan = false;
+      this._render();
+    }
+  }
+
+  async _forgetScan() {
+    if (!this._hass || !this._state.gateway) {
+      return;
+    }
+    this._error = "";
+    this._notice = "";
+    try {
+      const encodedGateway = encodeURIComponent(this._state.gateway);
+      const response = await this._hass.callApi("DELETE", `bticino_myhome/discovery?gateway=${encodedGateway}`);
+      this._applyScanStatus(response, false);
+      this._notice = "Scanned addresses forgotten, the next scan probes every address again.";
+    } catch (err) {
+      this._error = err?.body?.message || err?.message || "Unable to forget the scanned addresses.";
+    } finally {
+      this._render();
+    }
+  }
+
   async _ensurePassiveDiscoveryEnabled() {
     if (!this._hass || !this._state.gateway) {
       return;
@@ -155,6 +295,7 @@ class MyHOMEDiscoveryPanel extends HTMLElement {
       await this._ensurePassiveDiscoveryEnabled();
       await this._loadConfiguration();
       await this._showActivationResults(false, false);
+      await this._loadScanStatus();
     } catch (err) {
       this._error = `Error loading gateways: ${err?.body?.message || err?.message || "unknown"}`;
     } finally {
@@ -441,6 +582,7 @@ class MyHOMEDiscoveryPanel extends HTMLElement {
         await this._ensurePassiveDiscoveryEnabled();
         await this._loadConfiguration();
         await this._showActivationResults(false, false);
+        await this._loadScanStatus();
         this._render();
       });
     }
@@ -460,6 +602,23 @@ class MyHOMEDiscoveryPanel extends HTMLElement {
       clearActivation.addEventListener("click", () => this._showActivationResults(true));
     }
 
+    const startScan = this.querySelector("#start_scan");
+    if (startScan) {
+      startScan.addEventListener("click", () => this._startScan());
+    }
+
+    const forgetScan = this.querySelector("#forget_scan");
+    if (forgetScan) {
+      forgetScan.addEventListener("click", () => this._forgetScan());
+    }
+
+    const scanSection = this.querySelector("#scan_section");
+    if (scanSection) {
+      scanSection.addEventListener("toggle", () => {
+        this._state.scan_section_open = !!scanSection.open;
+      });
+    }
+
     const importSelected = this.querySelector("#import_selected_candidates");
     if (importSelected) {
       importSelected.addEventListener("click", () => this._importSelectedCandidates());
@@ -616,7 +775,7 @@ class MyHOMEDiscoveryPanel extends HTMLElement {
   _renderDiscoveryCandidates() {
     const header = `
       <div class="row-between">
-        <h3>Discovered devices (automatic discovery)</h3>
+        <h3>Discovered devices (${this._result?.kind === "active_discovery" ? "bus scan" : "automatic discovery"})</h3>
         <div class="actions">
           <button id="show_activation_discovery" type="button" ${this._loadingActivation ? "disabled" : ""}>${this._loadingActivation ? "Refreshing..." : "Refresh results"}</button>
           <button id="show_activation_discovery_clear" type="button" ${this._loadingActivation ? "disabled" : ""}>Clear list</button>
@@ -718,6 +877,57 @@ class MyHOMEDiscoveryPanel extends HTMLElement {
     `;
   }
 
+  _renderScanSection() {
+    const running = this._scanRunning();
+    const scanDisabled = running || this._startingScan || !this._state.gateway ? "disabled" : "";
+    const job = this._scanJob;
+    const number = (field, label, min, max) => `
+      <label>${label}
+        <input id="${field}" type="number" min="${min}" max="${max}" value="${this._esc(this._state[field])}" ${scanDisabled} />
+      </label>
+    `;
+    const check = (field, label) => `
+      <label><input id="${field}" type="checkbox" ${this._state[field] ? "checked" : ""} ${scanDisabled} /> ${label}</label>
+    `;
+    const progress = job
+      ? `
+        <p class="subtle">
+          Last scan: <strong>${this._esc(job.status)}</strong> |
+          probed <strong>${this._esc(job.probed)}</strong> / ${this._esc(job.total)} addresses
+          ${job.error ? `| ${this._esc(job.error)}` : ""}
+        </p>
+      `
+      : '<p class="subtle">No bus scan yet.</p>';
+
+    return `
+      <section class="panel">
+        <details id="scan_section" ${this._state.scan_section_open || running ? "open" : ""}>
+          <summary>Scan the bus</summary>
+          <div class="grid">
+            ${number("scan_area_start", "Area start", 0, 10)}
+            ${number("scan_area_end", "Area end", 0, 10)}
+            ${number("scan_point_start", "Point start", 0, 15)}
+            ${number("scan_point_end", "Point end", 0, 15)}
+          </div>
+          <div class="checks">
+            ${check("scan_lights", "Lights")}
+            ${check("scan_covers", "Covers")}
+            ${check("scan_climate", "Climate")}
+            ${check("scan_power", "Power")}
+            ${check("scan_rescan", "Probe scanned addresses again")}
+            ${check("scan_fast", "Fast (area requests first)")}
+          </div>
+          <p class="subtle">Addresses probed by earlier scans are skipped, so widening the range only probes the new addresses. A scan interrupted by a restart resumes on its own. A fast scan asks each area at once, and only probes one by one the areas that do not answer.</p>
+          ${progress}
+          <div class="actions">
+            <button id="start_scan" type="button" ${scanDisabled}>${running ? "Scanning..." : "Start scan"}</button>
+            <button id="forget_scan" class="danger" type="button" ${scanDisabled}>Forget scanned addresses</button>
+          </div>
+        </details>
+      </section>
+    `;
+  }
+
   _render() {
     const loadingGateways = this._loadingGateways ? "disabled" : "";
     const configDisabled = this._savingConfig || this._loadingGateways ? "disabled" : "";
@@ -968,6 +1178,7 @@ class MyHOMEDiscoveryPanel extends HTMLElement {
           <p class="subtle">Passive collection is always enabled. Devices are detected only when they are actually triggered (physically or by other apps).</p>
         </section>
 
+        ${this._renderScanSection()}
         ${errorBlock}
         ${noticeBlock}
         ${this._renderDiscoveryCandidates()}
@@ -2,7 +2,9 @@
 import asyncio
 import logging
 import re
-from typing import Dict, List
+import time
+from collections import deque
+from typing import Dict, List, Optional
 
 from homeassistant.const import (
     CONF_ENTITIES,
@@ -14,11 +16,10 @@ from homeassistant.const import (
     CONF_FRIENDLY_NAME,
 )
 from homeassistant.components.light import DOMAIN as LIGHT
-from homeassistant.components.button import DOMAIN as BUTTON
-from homeassistant.components.sensor import DOMAIN as SENSOR
 from homeassistant.components.climate import DOMAIN as CLIMATE
+from homeassistant.util import dt as dt_util
 
-from .OWNd.connection import OWNSession, OWNEventSession, OWNCommandSession, OWNGateway
+from .OWNd.connection import OWNSession, OWNEventSession, OWNCommandSessionPool, OWNGateway, OWNMessageCache
 from .OWNd.message import (
     OWNMessage,
     OWNLightingEvent,
@@ -36,6 +37,7 @@ from .OWNd.message import (
     OWNGatewayEvent,
     OWNGatewayCommand,
     OWNCommand,
+    OWNDecodeError,
 )
 
 from .const import (
@@ -57,13 +59,56 @@ from .const import (
     DISCOVERY_DEFAULT_DURATION,
     DISCOVERY_DEFAULT_POINT_END,
     DISCOVERY_DEFAULT_POINT_START,
+    DISCOVERY_RATE,
+    DISCOVERY_RESUME_DELAY,
+    DISCOVERY_SAVE_INTERVAL,
+    DISCOVERY_SESSION_COUNT,
+    DISCOVERY_WINDOW,
+    MESSAGE_CACHE_DEFAULT_SIZE,
+    POLL_FRAME_BUDGET,
+    POLL_FRESH_FRACTION,
+    COMMAND_PIPELINE_DEPTH,
+    COMMAND_POOL_DEFAULT_SIZE,
+    EVENT_QUEUE_OVERFLOW_BLOCK,
+    EVENT_QUEUE_OVERFLOW_DROP_NEWEST,
+    EVENT_QUEUE_OVERFLOW_DROP_OLDEST,
+    EVENT_QUEUE_SIZE,
+    FOLLOW_UP_REFRESH_GENERAL_AREAS,
+    FOLLOW_UP_REFRESH_MAX_DELAY,
+    FOLLOW_UP_REFRESH_WINDOW,
+    SEND_PRIORITY_AGING,
+    SEND_PRIORITY_BACKGROUND,
+    SEND_PRIORITY_DISCOVERY,
+    SEND_PRIORITY_INTERACTIVE,
+    SEND_PRIORITY_NAMES,
+    SEND_PRIORITY_REFRESH,
+    SHADOW_STATE_DEFAULT_TTL,
+    STATE_SNAPSHOT_SAVE_DELAY,
+    STARTUP_REFRESH_GENERAL_AREAS,
+    STARTUP_REFRESH_QUIET,
+    STARTUP_REFRESH_TIMEOUT,
     DOMAIN,
     LOGGER,
 )
-from .myhome_device import MyHOMEEntity
-from .button import (
-    DisableCommandButtonEntity,
-    EnableCommandButtonEntity,
+from .myhome_device import MyHOMEEntity, StateWriteCoalescer, current_send_priority, send_priority
+from .metrics import GatewayMetrics, Histogram
+from .refresh import FollowUpRefresh, PollScheduler, StartupRefresh
+from .shadow import ShadowStateTable
+from .discovery import (
+    DiscoveryProgress,
+    DiscoveryScanner,
+    JOB_COMPLETED,
+    JOB_FAILED,
+    JOB_INTERRUPTED,
+    JOB_RUNNING,
+)
+from .config_store import (
+    async_clear_discovery_progress,
+    async_get_discovery_progress,
+    async_load_state_snapshot,
+    async_set_discovery_progress,
+    state_snapshot_payload,
+    state_snapshot_store,
 )
 
 HEATING_DIM20_PATTERN = re.compile(
@@ -73,6 +118,8 @@ UNSUPPORTED_MESSAGE_SIGNATURE_PATTERN = re.compile(
     r"^\*#?(?P<who>\d+)\*(?P<where>[^*#]+)(?:\*\#?(?P<dimension>\d+))?"
 )
 POWER_DISCOVERY_DEFAULT_ENDPOINTS = ("51",)
+# Energy values are dated relative to the day they are read, they are not restored
+STATE_SNAPSHOT_SKIPPED_WHO = (18,)
 
 
 class DiscoverySendErrorDowngradeFilter(logging.Filter):
@@ -101,6 +148,286 @@ class DiscoverySendErrorDowngradeFilter(logging.Filter):
         return True
 
 
+def _priority_or(default: int) -> int:
+    """Priority class set by the caller with send_priority, `default` otherwise."""
+    _priority = current_send_priority()
+    return default if _priority is None else _priority
+
+
+class SendPriorityLevels:
+    """Pending send tasks, one FIFO per priority class, see SEND_PRIORITY_*.
+
+    The next task comes from the most urgent class. A class moves up one
+    class for every `aging` seconds its oldest task waited, so that
+    background traffic still goes out while user commands keep coming.
+    """
+
+    def __init__(self, aging: float):
+        self.aging = aging
+        self._levels = [deque() for _ in SEND_PRIORITY_NAMES]
+        self._length = 0
+        # Tasks taken ahead of a more urgent class thanks to aging
+        self.aged = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    @staticmethod
+    def priority_of(task) -> int:
+        # The shutdown signal goes out with user commands
+        return SEND_PRIORITY_INTERACTIVE if task is None else task["priority"]
+
+    @property
+    def depths(self) -> Dict[str, int]:
+        return {_name: len(_level) for _name, _level in zip(SEND_PRIORITY_NAMES, self._levels)}
+
+    def pending_before(self, priority: int) -> int:
+        """Tasks pending in the classes more urgent than `priority`"""
+        return sum(len(_level) for _level in self._levels[:priority])
+
+    def append(self, task) -> None:
+        self._levels[self.priority_of(task)].append(task)
+        self._length += 1
+
+    def popleft(self):
+        _now = time.monotonic()
+        _first = None
+        _best = None
+        _best_rank = None
+        for _priority, _level in enumerate(self._levels):
+            if not _level:
+                continue
+            if _first is None:
+                _first = _priority
+            _rank = _priority
+            if _level[0] is not None and self.aging > 0:
+                _rank -= int((_now - _level[0]["queued_at"]) / self.aging)
+            if _best is None or _rank < _best_rank:
+                _best = _priority
+                _best_rank = _rank
+        if _best is None:
+            raise IndexError("pop from an empty send queue")
+        if _best != _first:
+            self.aged += 1
+        self._length -= 1
+        return self._levels[_best].popleft()
+
+    def promote(self, task, priority: int) -> None:
+        """Move a pending task to a more urgent class"""
+        _current = self.priority_of(task)
+        if priority >= _current:
+            return
+        self._levels[_current].remove(task)
+        task["priority"] = priority
+        self._levels[priority].append(task)
+
+    def replace(self, task, new_task) -> None:
+        """Drop a pending task and queue `new_task` at the end of its class"""
+        self._levels[self.priority_of(task)].remove(task)
+        self._levels[self.priority_of(new_task)].append(new_task)
+
+
+class CoalescingSendQueue(asyncio.Queue):
+    """Send buffer that drops commands superseded before they went out.
+
+    A newer command for the same target (WHO, WHERE and, for dimension
+    writing, dimension) replaces the pending one and goes to the end of the
+    queue, after the commands queued for other dimensions of the endpoint in
+    between, and a status request identical to a pending one is merged into it.
+
+    Tasks are taken by priority class, see SendPriorityLevels. A task without
+    a `priority` is interactive if it is a command and refresh if it is a
+    status request. The time tasks waited is recorded for each class.
+
+    Each task taken gets a turn for its target (WHO and WHERE). Sending
+    workers wait for their turn with wait_turn() and end it once the task is
+    sent, so tasks for a target reach the gateway in the order they were
+    taken, whichever worker and command session sends them.
+    """
+
+    # Families whose commands set a state, so only the last one matters.
+    # CEN/CEN+ presses and releases must all be sent.
+    COALESCED_WHO = {1, 2, 4}
+
+    def _init(self, maxsize):
+        self._queue = SendPriorityLevels(SEND_PRIORITY_AGING)
+        self._pending: Dict[tuple, dict] = {}
+        self._sequence = 0
+        self.replaced_commands = 0
+        self.merged_requests = 0
+        self.wait = [Histogram() for _ in SEND_PRIORITY_NAMES]
+        self._turn = 0
+        # Target -> turns of the tasks taken and not sent yet, in order
+        self._turns: Dict[tuple, List[int]] = {}
+        self._turn_ended = asyncio.Event()
+
+    @property
+    def saved_frames(self) -> int:
+        return self.replaced_commands + self.merged_requests
+
+    def pending_before(self, priority: int) -> int:
+        return self._queue.pending_before(priority)
+
+    @property
+    def wait_stats(self) -> Dict[str, dict]:
+        return {_name: _wait.stats for _name, _wait in zip(SEND_PRIORITY_NAMES, self.wait)}
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "pending": self.qsize(),
+            "pending_by_priority": self._queue.depths,
+            "replaced_commands": self.replaced_commands,
+            "merged_requests": self.merged_requests,
+            "saved_frames": self.saved_frames,
+            "aged": self._queue.aged,
+            "wait": self.wait_stats,
+        }
+
+    def _coalescing_key(self, task):
+        if task is None or not isinstance(task["message"], OWNMessage):
+            return None
+        message = task["message"]
+        if task["is_status_request"] or message.is_request:
+            return ("request", str(message))
+        if message.who in self.COALESCED_WHO:
+            return ("command", message.unique_id, message.dimension)
+        return None
+
+    def put_nowait(self, item):
+        if item is not None:
+            if "priority" not in item:
+                item["priority"] = (
+                    SEND_PRIORITY_REFRESH if item["is_status_request"] else SEND_PRIORITY_INTERACTIVE
+                )
+            # A task put back after a failed send keeps its age
+            if "queued_at" not in item:
+                item["queued_at"] = time.monotonic()
+
+        key = self._coalescing_key(item)
+        if key is None:
+            return super().put_nowait(item)
+
+        if "sequence" not in item:
+            self._sequence += 1
+            item["sequence"] = self._sequence
+        pending = self._pending.get(key)
+        if pending is None:
+            self._pending[key] = item
+            return super().put_nowait(item)
+
+        if key[0] == "request":
+            self.merged_requests += 1
+            self._queue.promote(pending, item["priority"])
+            return None
+        self.replaced_commands += 1
+        # A retried command may come back after a newer one was queued
+        if item["sequence"] < pending["sequence"]:
+            self._queue.promote(pending, item["priority"])
+            return None
+        item["priority"] = min(item["priority"], pending["priority"])
+        self._pending[key] = item
+        self._queue.replace(pending, item)
+        return None
+
+    def _get(self):
+        item = super()._get()
+        key = self._coalescing_key(item)
+        if key is not None and self._pending.get(key) is item:
+            del self._pending[key]
+        if item is not None:
+            self.wait[item["priority"]].observe(time.monotonic() - item["queued_at"])
+            self._turn += 1
+            item["turn"] = self._turn
+            self._turns.setdefault(self._target(item), []).append(self._turn)
+        return item
+
+    @staticmethod
+    def _target(task) -> tuple:
+        message = task["message"]
+        if isinstance(message, OWNMessage):
+            return (message.who, message.where)
+        return (None, str(message))
+
+    def ready(self, tasks: list) -> int:
+        """How many of the first `tasks`, taken in that order, can be sent now"""
+        _turns = set()
+        for _count, task in enumerate(tasks):
+            if any(
+                _turn < task["turn"] and _turn not in _turns
+                for _turn in self._turns.get(self._target(task), ())
+            ):
+                return _count
+            _turns.add(task["turn"])
+        return len(tasks)
+
+    async def wait_turn(self, tasks: list) -> int:
+        """Wait until the first of `tasks` can be sent, how many of them can"""
+        while True:
+            _ready = self.ready(tasks)
+            if _ready:
+                return _ready
+            _turn_ended = self._turn_ended
+            await _turn_ended.wait()
+
+    def end_turn(self, task) -> None:
+        """The task was sent, or gave up on, let the next tasks for its target go"""
+        _target = self._target(task)
+        _turns = self._turns.get(_target)
+        if _turns is None or task.get("turn") not in _turns:
+            return
+        _turns.remove(task["turn"])
+        if not _turns:
+            del self._turns[_target]
+        self._turn_ended.set()
+        self._turn_ended = asyncio.Event()
+
+
+class EventQueue(asyncio.Queue):
+    """Bounded queue between the listening loop and the dispatching loop.
+
+    When it is full, the `overflow` policy decides whether the listener waits
+    for room (which in turn stops reading from the gateway), drops the oldest
+    queued message or drops the incoming one.
+    """
+
+    def __init__(self, maxsize: int, overflow: str = EVENT_QUEUE_OVERFLOW_BLOCK):
+        super().__init__(maxsize)
+        self.overflow = overflow
+        self.max_depth = 0
+        self.blocked = 0
+        self.dropped = 0
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "depth": self.qsize(),
+            "max_depth": self.max_depth,
+            "size": self.maxsize,
+            "overflow": self.overflow,
+            "blocked": self.blocked,
+            "dropped": self.dropped,
+        }
+
+    async def put(self, item):
+        if self.full():
+            if self.overflow == EVENT_QUEUE_OVERFLOW_DROP_NEWEST:
+                self.dropped += 1
+                return
+            if self.overflow == EVENT_QUEUE_OVERFLOW_DROP_OLDEST:
+                self.get_nowait()
+                self.task_done()
+                self.dropped += 1
+            else:
+                self.blocked += 1
+        await super().put(item)
+
+    def _put(self, item):
+        super()._put(item)
+        if self.qsize() > self.max_depth:
+            self.max_depth = self.qsize()
+
+
 class MyHOMEGatewayHandler:
     """Manages a single MyHOME Gateway."""
 
@@ -110,6 +437,12 @@ class MyHOMEGatewayHandler:
         config_entry,
         generate_events=False,
         discovery_by_activation=False,
+        message_cache_size=MESSAGE_CACHE_DEFAULT_SIZE,
+        command_pool_size=COMMAND_POOL_DEFAULT_SIZE,
+        event_queue_overflow=EVENT_QUEUE_OVERFLOW_BLOCK,
+        state_write_window=0,
+        collect_metrics=True,
+        shadow_state_ttl=SHADOW_STATE_DEFAULT_TTL,
     ):
         build_info = {
             "address": config_entry.data[CONF_HOST],
@@ -130,16 +463,62 @@ class MyHOMEGatewayHandler:
         self.config_entry = config_entry
         self.generate_events = generate_events
         self.gateway = OWNGateway(build_info)
+        # Shared by successive event sessions so hit/miss counters survive reconnections
+        self.message_cache = OWNMessageCache(message_cache_size) if message_cache_size > 0 else None
+        # Also handed to the OWNd sessions, which report to it
+        self.metrics = GatewayMetrics() if collect_metrics else None
+        # Command sessions are negotiated ahead of time and shared by the sending workers
+        self.command_pool = OWNCommandSessionPool(
+            self.gateway, logger=LOGGER, size=command_pool_size, observer=self.metrics
+        )
         self._terminate_listener = False
         self._terminate_sender = False
         self.is_connected = False
         self.listening_worker: asyncio.tasks.Task = None
+        self.dispatching_worker: asyncio.tasks.Task = None
         self.sending_workers: List[asyncio.tasks.Task] = []
-        self.send_buffer = asyncio.Queue()
+        self.send_buffer = CoalescingSendQueue()
+        # Messages read by the listening loop, handled by the dispatching loop
+        self.event_queue = EventQueue(EVENT_QUEUE_SIZE, overflow=event_queue_overflow)
+        # Entity state writes caused by a burst of messages are coalesced
+        self.state_writer = StateWriteCoalescer(hass, window=state_write_window)
+        # Event routing index: entity ID of a message -> handle_event of the entities it concerns.
+        # Kept up to date by the entities as they are added to and removed from hass.
+        self._event_routes: Dict[str, tuple] = {}
+        # Last message read for each endpoint, answers the status requests it is fresh enough for
+        self.shadow_state = ShadowStateTable(shadow_state_ttl)
+        # The shadow state is saved as the last known state, and restored at startup
+        self._state_store = state_snapshot_store(hass, self.mac)
+        self._state_snapshot_pending = False
+        # First refresh of the entities added during setup, see run_startup_refresh
+        self.startup_refresh = StartupRefresh()
+        self._startup_refresh_task: Optional[asyncio.Task] = None
+        # Status requests following general and area lighting events, merged over a scene
+        self.follow_up_refresh = FollowUpRefresh(
+            hass.loop,
+            self._send_follow_up_refresh,
+            window=FOLLOW_UP_REFRESH_WINDOW,
+            max_delay=FOLLOW_UP_REFRESH_MAX_DELAY,
+            general_areas=FOLLOW_UP_REFRESH_GENERAL_AREAS,
+        )
+        # Periodic refreshes of the entities whose state is not pushed by the bus
+        self.poll_scheduler = PollScheduler(
+            self.shadow_state,
+            frame_budget=POLL_FRAME_BUDGET,
+            fresh_fraction=POLL_FRESH_FRACTION,
+        )
+        self.polling_worker: Optional[asyncio.Task] = None
         # Rate limiting for repetitive messages
         self._message_count: Dict[str, int] = {}
         self._log_interval = 60  # Log every N occurrences
         self._discovery_in_progress = False
+        self._discovery_scanner: Optional[DiscoveryScanner] = None
+        # Progress of the running scan, and frame of its pending requests -> (family, where)
+        self._discovery_progress: Optional[DiscoveryProgress] = None
+        self._discovery_targets: Dict[str, tuple] = {}
+        self._discovery_saved = 0.0
+        # Scan started from the web panel, or resumed after a restart
+        self._discovery_job: Optional[asyncio.Task] = None
         self._discovery_results = {
             "light": set(),
             "cover": set(),
@@ -182,6 +561,27 @@ class MyHOMEGatewayHandler:
             "power": set(),
         }
 
+    def add_event_route(self, entity_id: str, handler) -> None:
+        _handlers = tuple(_handler for _handler in self._event_routes.get(entity_id, ()) if _handler != handler)
+        self._event_routes[entity_id] = _handlers + (handler,)
+
+    def remove_event_route(self, entity_id: str, handler) -> None:
+        _handlers = tuple(_handler for _handler in self._event_routes.get(entity_id, ()) if _handler != handler)
+        if _handlers:
+            self._event_routes[entity_id] = _handlers
+        else:
+            self._event_routes.pop(entity_id, None)
+
+    @property
+    def metrics_stats(self) -> Optional[dict]:
+        if self.metrics is None:
+            return None
+        _stats = self.metrics.stats
+        _stats["send_queue_depth"] = self.send_buffer.qsize()
+        _stats["event_queue_depth"] = self.event_queue.qsize()
+        _stats["send_queue_wait"] = self.send_buffer.wait_stats
+        return _stats
+
     @property
     def mac(self) -> str:
         return self.gateway.serial
@@ -237,10 +637,33 @@ class MyHOMEGatewayHandler:
             return f"{area}{point}"
         return f"{area:02d}{point:02d}"
 
+    @staticmethod
+    def _format_area_where(area: int) -> str:
+        """Format an area WHERE, areas 0 and 10 are written `00` and `100`."""
+        if area == 0:
+            return "00"
+        if area == 10:
+            return "100"
+        return str(area)
+
+    @staticmethod
+    def _area_of_point_to_point_where(where: str) -> int | None:
+        """Area of a point-to-point WHERE, None for any other address."""
+        where = str(where).split("#", 1)[0]
+        if not where.isdigit():
+            return None
+        if len(where) == 2:
+            return int(where[0])
+        if len(where) == 4:
+            return int(where[:2])
+        return None
+
     def _collect_discovery_result(self, message: OWNMessage):
         """Collect discovery candidates while a scan is running."""
         if not self._discovery_in_progress:
             return
+        if self._discovery_scanner is not None:
+            self._discovery_scanner.note_activity()
 
         if isinstance(message, OWNLightingEvent):
             if message.is_general or message.is_area or message.is_group:
@@ -336,8 +759,17 @@ class MyHOMEGatewayHandler:
         point_start: int = DISCOVERY_DEFAULT_POINT_START,
         point_end: int = DISCOVERY_DEFAULT_POINT_END,
         duration: int = DISCOVERY_DEFAULT_DURATION,
+        rescan: bool = False,
+        fast: bool = False,
     ) -> Dict[str, List[str]]:
-        """Discover devices by sending status requests on point-to-point addresses."""
+        """Discover devices by sending status requests on point-to-point addresses.
+        The requests go out on sessions of their own, see DiscoveryScanner, and
+        `duration` is the longest the scan waits for late replies.
+        Progress is persisted as the scan goes, see DiscoveryProgress: addresses
+        probed by earlier scans are skipped unless `rescan` is set, and the
+        results include the endpoints earlier scans found.
+        With `fast`, lights and covers are first asked for with area or general
+        status requests, see _discover_by_broadcast."""
         if self._discovery_in_progress:
             raise RuntimeError("A discovery scan is already in progress.")
 
@@ -352,6 +784,34 @@ class MyHOMEGatewayHandler:
         if point_start > point_end:
             point_start, point_end = point_end, point_start
 
+        # Scan parameters, as persisted to resume the scan after a restart
+        _scan = {
+            "scan_lights": scan_lights,
+            "scan_covers": scan_covers,
+            "scan_climate": scan_climate,
+            "scan_power": scan_power,
+            "area_start": area_start,
+            "area_end": area_end,
+            "point_start": point_start,
+            "point_end": point_end,
+            "duration": duration,
+            "fast": fast,
+        }
+        # (family, where) -> status request
+        _requests = {}
+        for area in range(area_start, area_end + 1):
+            for point in range(point_start, point_end + 1):
+                where = self._format_point_to_point_where(area, point)
+                if scan_lights:
+                    _requests[("light", where)] = OWNLightingCommand.status(where)
+                if scan_covers:
+                    _requests[("cover", where)] = OWNAutomationCommand.status(where)
+                if scan_climate:
+                    _requests[("climate", where)] = OWNHeatingCommand.status(where)
+        if scan_power:
+            for where in POWER_DISCOVERY_DEFAULT_ENDPOINTS:
+                _requests[("power", where)] = OWNEnergyCommand.get_total_consumption(where)
+
         self._discovery_in_progress = True
         self._discovery_results = {
             "light": set(),
@@ -359,33 +819,353 @@ class MyHOMEGatewayHandler:
             "climate": set(),
             "power": set(),
         }
-
         try:
-            for area in range(area_start, area_end + 1):
-                for point in range(point_start, point_end + 1):
-                    where = self._format_point_to_point_where(area, point)
-                    if scan_lights:
-                        await self.send_status_request(OWNLightingCommand.status(where))
-                    if scan_covers:
-                        await self.send_status_request(OWNAutomationCommand.status(where))
-                    if scan_climate:
-                        await self.send_status_request(OWNHeatingCommand.status(where))
-            if scan_power:
-                for where in POWER_DISCOVERY_DEFAULT_ENDPOINTS:
-                    await self.send_status_request(
-                        OWNEnergyCommand.get_total_consumption(where)
-                    )
-
-            await asyncio.sleep(duration)
-
-            return {
-                "light": sorted(self._discovery_results["light"]),
-                "cover": sorted(self._discovery_results["cover"]),
-                "climate": sorted(self._discovery_results["climate"]),
-                "power": sorted(self._discovery_results["power"]),
+            self._discovery_progress = DiscoveryProgress.from_dict(
+                await async_get_discovery_progress(self.hass, self.mac)
+            )
+            if rescan:
+                self._discovery_progress.forget(_requests)
+            _pending = self._discovery_progress.pending(_requests)
+            self._discovery_progress.job = {
+                "status": JOB_RUNNING,
+                "scan": _scan,
+                "total": len(_requests),
+                "probed": len(_requests) - len(_pending),
+                "started": dt_util.utcnow().isoformat(),
+                "finished": None,
+                "error": None,
             }
+            self._discovery_targets = {str(_requests[_target]): _target for _target in _pending}
+            await self._save_discovery_progress()
+            if len(_pending) < len(_requests):
+                LOGGER.info(
+                    "%s %d of %d discovery requests were sent by an earlier scan, skipping them.",
+                    self.log_id,
+                    len(_requests) - len(_pending),
+                    len(_requests),
+                )
+            try:
+                if fast:
+                    _pending = await self._discover_by_broadcast(_pending, duration)
+
+                # Status replies come back on the scanner sessions, and usually on the event session too
+                self._discovery_scanner = DiscoveryScanner(
+                    self.gateway,
+                    LOGGER,
+                    on_message=self._collect_discovery_result,
+                    busy=lambda: self.send_buffer.pending_before(SEND_PRIORITY_DISCOVERY) > 0,
+                    sessions=DISCOVERY_SESSION_COUNT,
+                    window=DISCOVERY_WINDOW,
+                    rate=DISCOVERY_RATE,
+                    on_batch=self._record_discovery_batch,
+                )
+                await self._discovery_scanner.scan(
+                    [_requests[_target] for _target in _pending], max_quiet=duration
+                )
+            except Exception as err:
+                self._discovery_progress.job["status"] = JOB_FAILED
+                self._discovery_progress.job["error"] = str(err)
+                raise
+            LOGGER.debug(
+                "%s Discovery scan statistics: %s",
+                self.log_id,
+                self._discovery_scanner.stats,
+            )
+
+            self._discovery_progress.job["status"] = JOB_COMPLETED
+            self._discovery_progress.job["finished"] = dt_util.utcnow().isoformat()
+            self._merge_discovery_results()
+            return self._discovery_progress.results()
         finally:
+            # A scan cancelled by an unload stays running, and is resumed at the next start
+            if self._discovery_progress is not None:
+                await self._save_discovery_progress()
             self._discovery_in_progress = False
+            self._discovery_scanner = None
+            self._discovery_progress = None
+            self._discovery_targets = {}
+
+    async def _discover_by_broadcast(self, pending: List[tuple], duration: int) -> List[tuple]:
+        """Ask the lights and covers of the scanned areas for their status with
+        one request per area, or a single general request when every area is
+        scanned. Each device answers with its own status frame.
+        An area where a device of the family replied is known: its points are
+        marked as probed. The (family, where) of the areas without any reply
+        are returned to be probed one by one."""
+        _areas = {"light": set(), "cover": set()}
+        for _family, _where in pending:
+            if _family in _areas:
+                _areas[_family].add(self._area_of_point_to_point_where(_where))
+        _areas = {_family: _family_areas - {None} for _family, _family_areas in _areas.items()}
+
+        _status = {"light": OWNLightingCommand.status, "cover": OWNAutomationCommand.status}
+        # (broadcast request, family, areas it covers)
+        _requests = []
+        for _family, _family_areas in _areas.items():
+            if not _family_areas:
+                continue
+            if _family_areas == set(range(11)):
+                _requests.append((_status[_family]("0"), _family, _family_areas))
+            else:
+                _requests.extend(
+                    (_status[_family](self._format_area_where(_area)), _family, {_area})
+                    for _area in sorted(_family_areas)
+                )
+        if not _requests:
+            return pending
+
+        self._discovery_scanner = DiscoveryScanner(
+            self.gateway,
+            LOGGER,
+            on_message=self._collect_discovery_result,
+            busy=lambda: self.send_buffer.pending_before(SEND_PRIORITY_DISCOVERY) > 0,
+            sessions=DISCOVERY_SESSION_COUNT,
+            window=DISCOVERY_WINDOW,
+            rate=DISCOVERY_RATE,
+        )
+        await self._discovery_scanner.scan(
+            [_request for _request, _, _ in _requests], max_quiet=duration
+        )
+
+        # Areas that did not answer, or whose requests the gateway did not relay, are probed one by one
+        _known = {
+            _family: {self._area_of_point_to_point_where(_where) for _where in self._discovery_results[_family]}
+            & _family_areas
+            for _family, _family_areas in _areas.items()
+        }
+        _remaining = []
+        for _family, _where in pending:
+            if _family in _known and self._area_of_point_to_point_where(_where) in _known[_family]:
+                self._discovery_progress.probed[_family].add(_where)
+                self._discovery_progress.job["probed"] += 1
+            else:
+                _remaining.append((_family, _where))
+        LOGGER.info(
+            "%s Fast discovery: %d broadcast status requests, areas known %s, %d addresses left to probe one by one.",
+            self.log_id,
+            len(_requests),
+            {_family: sorted(_family_areas) for _family, _family_areas in _known.items()},
+            len(_remaining),
+        )
+        await self._save_discovery_progress()
+        return _remaining
+
+    def _merge_discovery_results(self) -> None:
+        for family, wheres in self._discovery_results.items():
+            self._discovery_progress.found[family].update(wheres)
+
+    async def _save_discovery_progress(self) -> None:
+        self._merge_discovery_results()
+        await async_set_discovery_progress(self.hass, self.mac, self._discovery_progress.as_dict())
+        self._discovery_saved = time.monotonic()
+
+    async def _record_discovery_batch(self, answered: List[tuple]) -> None:
+        """Mark the answered requests as probed, the progress is saved at most
+        every DISCOVERY_SAVE_INTERVAL seconds."""
+        for _request, _ in answered:
+            _target = self._discovery_targets.get(str(_request))
+            if _target is None:
+                continue
+            _family, _where = _target
+            self._discovery_progress.probed[_family].add(_where)
+            self._discovery_progress.job["probed"] += 1
+        if time.monotonic() - self._discovery_saved >= DISCOVERY_SAVE_INTERVAL:
+            await self._save_discovery_progress()
+
+    @property
+    def discovery_job_running(self) -> bool:
+        return self._discovery_job is not None and not self._discovery_job.done()
+
+    def start_discovery_job(self, **scan) -> None:
+        """Run discover_devices in the background, its progress is read with
+        get_discovery_progress."""
+        if self._discovery_in_progress or self.discovery_job_running:
+            raise RuntimeError("A discovery scan is already in progress.")
+        self._discovery_job = self.hass.async_create_task(self._run_discovery_job(scan))
+
+    async def resume_discovery_job(self) -> None:
+        """Resume the discovery scan interrupted by a restart, if any."""
+        _job = (await async_get_discovery_progress(self.hass, self.mac))["job"]
+        if _job is None or _job.get("status") != JOB_RUNNING or self.discovery_job_running:
+            return
+        LOGGER.info(
+            "%s Resuming the interrupted discovery scan in %d seconds.",
+            self.log_id,
+            DISCOVERY_RESUME_DELAY,
+        )
+        self._discovery_job = self.hass.async_create_task(
+            self._run_discovery_job(_job.get("scan", {}), delay=DISCOVERY_RESUME_DELAY)
+        )
+
+    async def _run_discovery_job(self, scan: dict, delay: float = 0) -> None:
+        if delay > 0:
+            await asyncio.sleep(delay)
+        try:
+            await self.discover_devices(**scan)
+        except (RuntimeError, ConnectionError) as discovery_error:
+            LOGGER.warning("%s %s", self.log_id, discovery_error)
+        except Exception as err:  # pylint: disable=broad-except
+            LOGGER.exception("%s Discovery scan failed: %s", self.log_id, err)
+
+    async def get_discovery_progress(self) -> DiscoveryProgress:
+        """Progress of the running discovery scan, or of the last one."""
+        if self._discovery_in_progress and self._discovery_progress is not None:
+            self._merge_discovery_results()
+            return self._discovery_progress
+        _progress = DiscoveryProgress.from_dict(
+            await async_get_discovery_progress(self.hass, self.mac)
+        )
+        if self.discovery_job_running:
+            # Started, or to be resumed after a restart, but not scanning yet
+            _progress.job = {**(_progress.job or {}), "status": JOB_RUNNING, "error": None}
+        elif _progress.job is not None and _progress.job.get("status") == JOB_RUNNING:
+            _progress.job["status"] = JOB_INTERRUPTED
+        return _progress
+
+    async def forget_discovery_progress(self) -> None:
+        """Forget the addresses probed and the endpoints found by earlier scans."""
+        if self._discovery_in_progress or self.discovery_job_running:
+            raise RuntimeError("A discovery scan is already in progress.")
+        await async_clear_discovery_progress(self.hass, self.mac)
+
+    def _record_state(self, message: OWNMessage) -> None:
+        try:
+            # Lazily parsed, the message may not have been decoded by an entity yet
+            message.decode()
+        except OWNDecodeError:
+            # Neither answered from the shadow state nor saved
+            return
+        self.shadow_state.update(message)
+        if not self._state_snapshot_pending:
+            # Written STATE_SNAPSHOT_SAVE_DELAY seconds after the first change, or when hass stops
+            self._state_snapshot_pending = True
+            self._state_store.async_delay_save(self._state_snapshot_data, STATE_SNAPSHOT_SAVE_DELAY)
+
+    def _state_snapshot_data(self) -> dict:
+        self._state_snapshot_pending = False
+        return state_snapshot_payload(self.shadow_state.frames(skipped_who=STATE_SNAPSHOT_SKIPPED_WHO))
+
+    async def save_state_snapshot(self) -> None:
+        """Save the last known state of the endpoints now."""
+        await self._state_store.async_save(self._state_snapshot_data())
+
+    async def restore_state_snapshot(self) -> None:
+        """Hand the last known state saved by the previous run to the entities.
+        It is stale until the endpoints are read again, by the startup refresh."""
+        _messages = []
+        for _frame in await async_load_state_snapshot(self._state_store):
+            try:
+                _message = OWNMessage.parse(_frame)
+            except Exception:  # pylint: disable=broad-except
+                # Parsed eagerly, a malformed frame raises whatever its decoder does
+                LOGGER.warning("%s Skipping unreadable saved state `%s`.", self.log_id, _frame)
+                continue
+            if isinstance(_message, OWNMessage) and _message.who not in STATE_SNAPSHOT_SKIPPED_WHO:
+                _messages.append(_message)
+        _restored = self.shadow_state.restore(_messages)
+        for _message in _restored:
+            for _handle_event in self._event_routes.get(_message.entity, ()):
+                _handle_event(_message)
+        LOGGER.info("%s Restored %d states saved by the previous run.", self.log_id, len(_restored))
+
+    def start_startup_refresh(self) -> None:
+        """Restore the last known state of the entities added so far, then
+        refresh them, in the background."""
+        # Not tracked by hass, its startup would wait for the replies
+        self._startup_refresh_task = self.hass.loop.create_task(self._run_startup_refresh())
+
+    async def polling_loop(self) -> None:
+        """Poll the entities the poll scheduler finds due."""
+        while True:
+            await asyncio.sleep(self.poll_scheduler.tick)
+            with send_priority(SEND_PRIORITY_BACKGROUND):
+                for _entity in self.poll_scheduler.due():
+                    try:
+                        await _entity.async_update()
+                    except Exception as err:  # pylint: disable=broad-except
+                        LOGGER.exception("%s Poll of %s failed: %s", self.log_id, _entity.entity_id, err)
+
+    async def _run_startup_refresh(self) -> None:
+        try:
+            await self.restore_state_snapshot()
+        except Exception as err:  # pylint: disable=broad-except
+            # The entities are refreshed from the bus anyway
+            LOGGER.exception("%s Could not restore the saved state: %s", self.log_id, err)
+        try:
+            await self.run_startup_refresh()
+        except Exception as err:  # pylint: disable=broad-except
+            LOGGER.exception("%s Startup refresh failed: %s", self.log_id, err)
+
+    async def run_startup_refresh(self) -> None:
+        """Refresh the lights, switches and covers added during setup with as
+        few status requests as possible.
+
+        The endpoints of an area are asked for their status with one area
+        request, and a family spread over STARTUP_REFRESH_GENERAL_AREAS areas
+        or more with one general request, each device answering with its own
+        status frame. Areas with a single endpoint are refreshed one by one,
+        as are the endpoints left unanswered once the replies stopped coming."""
+        _refresh = self.startup_refresh
+        _endpoints = _refresh.start()
+        if not _endpoints:
+            return
+
+        _status = {"1": OWNLightingCommand.status, "2": OWNAutomationCommand.status}
+        # WHO -> area -> endpoints
+        _areas: Dict[str, Dict[int, list]] = {_who: {} for _who in _status}
+        _individual = []
+        for _endpoint in _endpoints:
+            _, _, _who, _where = _endpoint
+            _area = self._area_of_point_to_point_where(_where) if _who in _status else None
+            if _area is None:
+                _individual.append(_endpoint)
+            else:
+                _areas[_who].setdefault(_area, []).append(_endpoint)
+
+        _requests = []
+        _covered = []
+        for _who, _family_areas in _areas.items():
+            _shared = {_area: _members for _area, _members in _family_areas.items() if len(_members) > 1}
+            if len(_shared) >= STARTUP_REFRESH_GENERAL_AREAS:
+                _requests.append(_status[_who]("0"))
+                _covered.extend(_member for _members in _family_areas.values() for _member in _members)
+                continue
+            for _area, _members in sorted(_family_areas.items()):
+                if _area in _shared:
+                    _requests.append(_status[_who](self._format_area_where(_area)))
+                    _covered.extend(_members)
+                else:
+                    _individual.extend(_members)
+
+        # Broadcast requests go ahead of the background refreshes of the other entities
+        _refresh.expect(_covered)
+        _refresh.broadcast_requests = len(_requests)
+        for _request in _requests:
+            await self.send_status_request(_request)
+        await _refresh.wait(STARTUP_REFRESH_QUIET, STARTUP_REFRESH_TIMEOUT)
+        _fallback = _refresh.pending()
+        _refresh.answered_by_broadcast = len(_covered) - len(_fallback)
+
+        _individual.extend(_fallback)
+        _refresh.expect(_individual)
+        _refresh.individual_requests = len(_individual)
+        with send_priority(SEND_PRIORITY_BACKGROUND):
+            for _entity, _, _, _ in _individual:
+                await _entity.async_update()
+        await _refresh.wait(STARTUP_REFRESH_QUIET, STARTUP_REFRESH_TIMEOUT)
+        _refresh.finish()
+
+        LOGGER.info(
+            "%s Startup refresh of %d endpoints: %d broadcast status requests answered for %d, "
+            "%d individual requests, %d unanswered, synchronized in %s seconds.",
+            self.log_id,
+            _refresh.endpoints,
+            _refresh.broadcast_requests,
+            _refresh.answered_by_broadcast,
+            _refresh.individual_requests,
+            _refresh.unanswered,
+            _refresh.stats["synced_in"],
+        )
 
     def _handle_heating_dimension_20(self, message) -> bool:
         """Handle WHO=4 dimension #20 messages when OWNd cannot parse them yet."""
@@ -473,6 +1253,7 @@ class MyHOMEGatewayHandler:
         base_delay = 2  # seconds
 
         LOGGER.debug("%s Creating listening worker.", self.log_id)
+        _reconnecting = False
 
         # Outer loop: Retry connection on failure
         while not self._terminate_listener and retry_count < max_retries:
@@ -490,8 +1271,18 @@ class MyHOMEGatewayHandler:
                     )
                     await asyncio.sleep(delay)
 
-                _event_session = OWNEventSession(gateway=self.gateway, logger=LOGGER)
+                _event_session = OWNEventSession(
+                    gateway=self.gateway,
+                    logger=LOGGER,
+                    lazy=True,
+                    use_protocol=True,
+                    message_cache=self.message_cache,
+                    observer=self.metrics,
+                )
                 await _event_session.connect()
+                if _reconnecting and self.metrics is not None:
+                    self.metrics.reconnected("event")
+                _reconnecting = True
                 self.is_connected = True
                 retry_count = 0  # Reset retry count on successful connection
                 LOGGER.info("%s Successfully connected to gateway.", self.log_id)
@@ -519,259 +1310,12 @@ class MyHOMEGatewayHandler:
                 )
                 break
 
-            # Inner loop: Process messages
+            # Inner loop: Read messages, the dispatching loop handles them
             try:
                 while not self._terminate_listener:
-                    message = await _event_session.get_next()
-                    LOGGER.debug("%s Message received: `%s`", self.log_id, message)
-
-                    if self.generate_events:
-                        if isinstance(message, OWNMessage):
-                            _event_content = {"gateway": str(self.gateway.host)}
-                            _event_content.update(message.event_content)
-                            self.hass.bus.async_fire("bticino_myhome_message_event", _event_content)
-                        else:
-                            self.hass.bus.async_fire("bticino_myhome_message_event", {"gateway": str(self.gateway.host), "message": str(message)})
-
-                    if isinstance(message, OWNMessage):
-                        self._collect_discovery_result(message)
-                        self._collect_activation_discovery_result(message)
-
-                    if not isinstance(message, OWNMessage):
-                        LOGGER.warning(
-                            "%s Data received is not a message: `%s`",
-                            self.log_id,
-                            message,
-                        )
-                    elif isinstance(message, OWNEnergyEvent):
-                        if SENSOR in self.hass.data[DOMAIN][self.mac][CONF_PLATFORMS] and message.entity in self.hass.data[DOMAIN][self.mac][CONF_PLATFORMS][SENSOR]:
-                            for _entity in self.hass.data[DOMAIN][self.mac][CONF_PLATFORMS][SENSOR][message.entity][CONF_ENTITIES]:
-                                if isinstance(
-                                    self.hass.data[DOMAIN][self.mac][CONF_PLATFORMS][SENSOR][message.entity][CONF_ENTITIES][_entity],
-                                    MyHOMEEntity,
-                                ):
-                                    self.hass.data[DOMAIN][self.mac][CONF_PLATFORMS][SENSOR][message.entity][CONF_ENTITIES][_entity].handle_event(message)
-                        else:
-                            continue
-                    elif (
-                        isinstance(message, OWNLightingEvent)
-                        or isinstance(message, OWNAutomationEvent)
-                        or isinstance(message, OWNDryContactEvent)
-                        or isinstance(message, OWNAuxEvent)
-                        or isinstance(message, OWNHeatingEvent)
-                    ):
-                        if not message.is_translation:
-                            is_event = False
-                            if isinstance(message, OWNLightingEvent):
-                                if message.is_general:
-                                    is_event = True
-                                    event = "on" if message.is_on else "off"
-                                    self.hass.bus.async_fire(
-                                        "bticino_myhome_general_light_event",
-                                        {"message": str(message), "event": event},
-                                    )
-                                    await asyncio.sleep(0.1)
-                                    await self.send_status_request(OWNLightingCommand.status("0"))
-                                elif message.is_area:
-                                    is_event = True
-                                    event = "on" if message.is_on else "off"
-                                    self.hass.bus.async_fire(
-                                        "bticino_myhome_area_light_event",
-                                        {
-                                            "message": str(message),
-                                            "area": message.area,
-                                            "event": event,
-                                        },
-                                    )
-                                    await asyncio.sleep(0.1)
-                                    await self.send_status_request(OWNLightingCommand.status(message.area))
-                                elif message.is_group:
-                                    is_event = True
-                                    event = "on" if message.is_on else "off"
-                                    self.hass.bus.async_fire(
-                                        "bticino_myhome_group_light_event",
-                                        {
-                                            "message": str(message),
-                                            "group": message.group,
-                                            "event": event,
-                                        },
-                                    )
-                            elif isinstance(message, OWNAutomationEvent):
-                                if message.is_general:
-                                    is_event = True
-                                    if message.is_opening and not message.is_closing:
-                                        event = "open"
-                                    elif message.is_closing and not message.is_opening:
-                                        event = "close"
-                                    else:
-                                        event = "stop"
-                                    self.hass.bus.async_fire(
-                                        "bticino_myhome_general_automation_event",
-                                        {"message": str(message), "event": event},
-                                    )
-                                elif message.is_area:
-                                    is_event = True
-                                    if message.is_opening and not message.is_closing:
-                                        event = "open"
-                                    elif message.is_closing and not message.is_opening:
-                                        event = "close"
-                                    else:
-                                        event = "stop"
-                                    self.hass.bus.async_fire(
-                                        "bticino_myhome_area_automation_event",
-                                        {
-                                            "message": str(message),
-                                            "area": message.area,
-                                            "event": event,
-                                        },
-                                    )
-                                elif message.is_group:
-                                    is_event = True
-                                    if message.is_opening and not message.is_closing:
-                                        event = "open"
-                                    elif message.is_closing and not message.is_opening:
-                                        event = "close"
-                                    else:
-                                        event = "stop"
-                                    self.hass.bus.async_fire(
-                                        "bticino_myhome_group_automation_event",
-                                        {
-                                            "message": str(message),
-                                            "group": message.group,
-                                            "event": event,
-                                        },
-                                    )
-                            if not is_event:
-                                if isinstance(message, OWNLightingEvent) and message.brightness_preset:
-                                    if isinstance(
-                                        self.hass.data[DOMAIN][self.mac][CONF_PLATFORMS][LIGHT][message.entity][CONF_ENTITIES][LIGHT],
-                                        MyHOMEEntity,
-                                    ):
-                                        await self.hass.data[DOMAIN][self.mac][CONF_PLATFORMS][LIGHT][message.entity][CONF_ENTITIES][LIGHT].async_update()
-                                else:
-                                    for _platform in self.hass.data[DOMAIN][self.mac][CONF_PLATFORMS]:
-                                        if _platform != BUTTON and message.entity in self.hass.data[DOMAIN][self.mac][CONF_PLATFORMS][_platform]:
-                                            for _entity in self.hass.data[DOMAIN][self.mac][CONF_PLATFORMS][_platform][message.entity][CONF_ENTITIES]:
-                                                if (
-                                                    isinstance(
-                                                        self.hass.data[DOMAIN][self.mac][CONF_PLATFORMS][_platform][message.entity][CONF_ENTITIES][_entity],
-                                                        MyHOMEEntity,
-                                                    )
-                                                    and not isinstance(
-                                                        self.hass.data[DOMAIN][self.mac][CONF_PLATFORMS][_platform][message.entity][CONF_ENTITIES][_entity],
-                                                        DisableCommandButtonEntity,
-                                                    )
-                                                    and not isinstance(
-                                                        self.hass.data[DOMAIN][self.mac][CONF_PLATFORMS][_platform][message.entity][CONF_ENTITIES][_entity],
-                                                        EnableCommandButtonEntity,
-                                                    )
-                                                ):
-                                                    self.hass.data[DOMAIN][self.mac][CONF_PLATFORMS][_platform][message.entity][CONF_ENTITIES][_entity].handle_event(message)
-
-                        else:
-                            LOGGER.debug(
-                                "%s Ignoring translation message `%s`",
-                                self.log_id,
-                                message,
-                            )
-                    elif isinstance(message, OWNHeatingCommand) and message.dimension is not None and message.dimension == 14:
-                        where = message.where[1:] if message.where.startswith("#") else message.where
-                        LOGGER.debug(
-                            "%s Received heating command, sending query to zone %s",
-                            self.log_id,
-                            where,
-                        )
-                        await self.send_status_request(OWNHeatingCommand.status(where))
-                    elif isinstance(message, OWNCENPlusEvent):
-                        event = None
-                        if message.is_short_pressed:
-                            event = CONF_SHORT_PRESS
-                        elif message.is_held or message.is_still_held:
-                            event = CONF_LONG_PRESS
-                        elif message.is_released:
-                            event = CONF_LONG_RELEASE
-                        else:
-                            event = None
-                        self.hass.bus.async_fire(
-                            "bticino_myhome_cenplus_event",
-                            {
-                                "object": int(message.object),
-                                "pushbutton": int(message.push_button),
-                                "event": event,
-                            },
-                        )
-                        LOGGER.info(
-                            "%s %s",
-                            self.log_id,
-                            message.human_readable_log,
-                        )
-                    elif isinstance(message, OWNCENEvent):
-                        event = None
-                        if message.is_pressed:
-                            event = CONF_SHORT_PRESS
-                        elif message.is_released_after_short_press:
-                            event = CONF_SHORT_RELEASE
-                        elif message.is_held:
-                            event = CONF_LONG_PRESS
-                        elif message.is_released_after_long_press:
-                            event = CONF_LONG_RELEASE
-                        else:
-                            event = None
-                        self.hass.bus.async_fire(
-                            "bticino_myhome_cen_event",
-                            {
-                                "object": int(message.object),
-                                "pushbutton": int(message.push_button),
-                                "event": event,
-                            },
-                        )
-                        LOGGER.info(
-                            "%s %s",
-                            self.log_id,
-                            message.human_readable_log,
-                        )
-                    elif self._handle_heating_dimension_20(message):
-                        continue
-                    elif isinstance(message, OWNGatewayEvent) or isinstance(message, OWNGatewayCommand):
-                        # Rate limiting for repetitive gateway messages (date/time updates)
-                        msg_type = type(message).__name__
-                        self._message_count[msg_type] = self._message_count.get(msg_type, 0) + 1
-
-                        # Log first occurrence and then every N occurrences
-                        if self._message_count[msg_type] == 1:
-                            LOGGER.info(
-                                "%s %s (further messages will be logged every %s occurrences)",
-                                self.log_id,
-                                message.human_readable_log,
-                                self._log_interval,
-                            )
-                        elif self._message_count[msg_type] % self._log_interval == 0:
-                            LOGGER.debug(
-                                "%s %s (logged %s times)",
-                                self.log_id,
-                                message.human_readable_log,
-                                self._message_count[msg_type],
-                            )
-                    else:
-                        # Rate limiting for unsupported messages
-                        msg_key = self._unsupported_message_key(message)
-                        self._message_count[msg_key] = self._message_count.get(msg_key, 0) + 1
-
-                        # Log first occurrence and then every N occurrences
-                        if self._message_count[msg_key] == 1:
-                            LOGGER.warning(
-                                "%s Unsupported message type: `%s` (further occurrences will be logged every %s messages)",
-                                self.log_id,
-                                message,
-                                self._log_interval,
-                            )
-                        elif self._message_count[msg_key] % self._log_interval == 0:
-                            LOGGER.debug(
-                                "%s Unsupported message: `%s` (received %s times)",
-                                self.log_id,
-                                message,
-                                self._message_count[msg_key],
-                            )
+                    for message in await _event_session.get_batch():
+                        LOGGER.debug("%s Message received: `%s`", self.log_id, message)
+                        await self.event_queue.put(message)
 
             except (OSError, ConnectionError, asyncio.CancelledError) as e:
                 # Connection lost during message processing
@@ -786,16 +1330,8 @@ class MyHOMEGatewayHandler:
                         e,
                     )
                     # Will retry connection in outer loop
-            except KeyError as ke:
-                # Entity not found in hass.data - likely race condition during startup
-                LOGGER.warning(
-                    "%s Entity not found during message processing (startup race condition?): %s",
-                    self.log_id,
-                    ke,
-                )
-                await asyncio.sleep(1)  # Brief pause before retrying
             except Exception as e:
-                # Unexpected error during message processing
+                # Unexpected error while reading messages
                 LOGGER.exception(
                     "%s Unexpected error in message processing loop: %s",
                     self.log_id,
@@ -814,20 +1350,292 @@ class MyHOMEGatewayHandler:
                             e,
                         )
                 self.is_connected = False
+                # Events are missed until the next session is open
+                self.shadow_state.expire()
 
         LOGGER.info("%s Listening worker stopped.", self.log_id)
         LOGGER.debug("%s Destroying listening worker.", self.log_id)
         self.listening_worker.cancel()
 
+    async def dispatching_loop(self):
+        """Handle the messages queued by the listening loop."""
+        LOGGER.debug("%s Creating dispatching worker.", self.log_id)
+
+        while True:
+            message = await self.event_queue.get()
+            if self.metrics is not None:
+                _started = time.perf_counter()
+            try:
+                await self._handle_message(message)
+            except OWNDecodeError:
+                LOGGER.exception(
+                    "%s Received data could not be decoded into a message:",
+                    self.log_id,
+                )
+            except KeyError as ke:
+                # Entity not found in hass.data - likely race condition during startup
+                LOGGER.warning(
+                    "%s Entity not found during message processing (startup race condition?): %s",
+                    self.log_id,
+                    ke,
+                )
+            except Exception as e:  # pylint: disable=broad-except
+                LOGGER.exception(
+                    "%s Unexpected error while handling `%s`: %s",
+                    self.log_id,
+                    message,
+                    e,
+                )
+            finally:
+                self.event_queue.task_done()
+                if self.metrics is not None:
+                    self.metrics.frame_dispatched(
+                        message.who if isinstance(message, OWNMessage) else None,
+                        time.perf_counter() - _started,
+                    )
+
+    def _send_follow_up_refresh(self, where: str) -> None:
+        self.send_buffer.put_nowait(
+            {"message": OWNLightingCommand.status(where), "is_status_request": True}
+        )
+
+    async def _handle_message(self, message) -> None:
+        """Route a message read on the event session to the entities and events it concerns."""
+        if self.generate_events:
+            if isinstance(message, OWNMessage):
+                _event_content = {"gateway": str(self.gateway.host)}
+                _event_content.update(message.event_content)
+                self.hass.bus.async_fire("bticino_myhome_message_event", _event_content)
+            else:
+                self.hass.bus.async_fire("bticino_myhome_message_event", {"gateway": str(self.gateway.host), "message": str(message)})
+
+        if isinstance(message, OWNMessage):
+            self._collect_discovery_result(message)
+            self._collect_activation_discovery_result(message)
+            self.startup_refresh.note(message)
+
+        if not isinstance(message, OWNMessage):
+            LOGGER.warning(
+                "%s Data received is not a message: `%s`",
+                self.log_id,
+                message,
+            )
+        elif isinstance(message, OWNEnergyEvent):
+            self._record_state(message)
+            for _handle_event in self._event_routes.get(message.entity, ()):
+                _handle_event(message)
+        elif (
+            isinstance(message, OWNLightingEvent)
+            or isinstance(message, OWNAutomationEvent)
+            or isinstance(message, OWNDryContactEvent)
+            or isinstance(message, OWNAuxEvent)
+            or isinstance(message, OWNHeatingEvent)
+        ):
+            if not message.is_translation:
+                is_event = False
+                if isinstance(message, OWNLightingEvent):
+                    if message.is_general:
+                        is_event = True
+                        event = "on" if message.is_on else "off"
+                        self.hass.bus.async_fire(
+                            "bticino_myhome_general_light_event",
+                            {"message": str(message), "event": event},
+                        )
+                        self.follow_up_refresh.request("0")
+                    elif message.is_area:
+                        is_event = True
+                        event = "on" if message.is_on else "off"
+                        self.hass.bus.async_fire(
+                            "bticino_myhome_area_light_event",
+                            {
+                                "message": str(message),
+                                "area": message.area,
+                                "event": event,
+                            },
+                        )
+                        self.follow_up_refresh.request(self._format_area_where(message.area))
+                    elif message.is_group:
+                        is_event = True
+                        event = "on" if message.is_on else "off"
+                        self.hass.bus.async_fire(
+                            "bticino_myhome_group_light_event",
+                            {
+                                "message": str(message),
+                                "group": message.group,
+                                "event": event,
+                            },
+                        )
+                elif isinstance(message, OWNAutomationEvent):
+                    if message.is_general:
+                        is_event = True
+                        if message.is_opening and not message.is_closing:
+                            event = "open"
+                        elif message.is_closing and not message.is_opening:
+                            event = "close"
+                        else:
+                            event = "stop"
+                        self.hass.bus.async_fire(
+                            "bticino_myhome_general_automation_event",
+                            {"message": str(message), "event": event},
+                        )
+                    elif message.is_area:
+                        is_event = True
+                        if message.is_opening and not message.is_closing:
+                            event = "open"
+                        elif message.is_closing and not message.is_opening:
+                            event = "close"
+                        else:
+                            event = "stop"
+                        self.hass.bus.async_fire(
+                            "bticino_myhome_area_automation_event",
+                            {
+                                "message": str(message),
+                                "area": message.area,
+                                "event": event,
+                            },
+                        )
+                    elif message.is_group:
+                        is_event = True
+                        if message.is_opening and not message.is_closing:
+                            event = "open"
+                        elif message.is_closing and not message.is_opening:
+                            event = "close"
+                        else:
+                            event = "stop"
+                        self.hass.bus.async_fire(
+                            "bticino_myhome_group_automation_event",
+                            {
+                                "message": str(message),
+                                "group": message.group,
+                                "event": event,
+                            },
+                        )
+                if is_event:
+                    self.shadow_state.forget(message)
+                elif isinstance(message, OWNLightingEvent) and message.brightness_preset:
+                    # The brightness is read back from the bus, not from the shadow state
+                    self.shadow_state.forget(message)
+                    if isinstance(
+                        self.hass.data[DOMAIN][self.mac][CONF_PLATFORMS][LIGHT][message.entity][CONF_ENTITIES][LIGHT],
+                        MyHOMEEntity,
+                    ):
+                        self.hass.async_create_task(
+                            self.hass.data[DOMAIN][self.mac][CONF_PLATFORMS][LIGHT][message.entity][CONF_ENTITIES][LIGHT].async_update()
+                        )
+                else:
+                    self._record_state(message)
+                    for _handle_event in self._event_routes.get(message.entity, ()):
+                        _handle_event(message)
+
+            else:
+                LOGGER.debug(
+                    "%s Ignoring translation message `%s`",
+                    self.log_id,
+                    message,
+                )
+        elif isinstance(message, OWNHeatingCommand) and message.dimension is not None and message.dimension == 14:
+            where = message.where[1:] if message.where.startswith("#") else message.where
+            LOGGER.debug(
+                "%s Received heating command, sending query to zone %s",
+                self.log_id,
+                where,
+            )
+            await self.send_status_request(OWNHeatingCommand.status(where))
+        elif isinstance(message, OWNCENPlusEvent):
+            event = None
+            if message.is_short_pressed:
+                event = CONF_SHORT_PRESS
+            elif message.is_held or message.is_still_held:
+                event = CONF_LONG_PRESS
+            elif message.is_released:
+                event = CONF_LONG_RELEASE
+            else:
+                event = None
+            self.hass.bus.async_fire(
+                "bticino_myhome_cenplus_event",
+                {
+                    "object": int(message.object),
+                    "pushbutton": int(message.push_button),
+                    "event": event,
+                },
+            )
+            LOGGER.info(
+                "%s %s",
+                self.log_id,
+                message.human_readable_log,
+            )
+        elif isinstance(message, OWNCENEvent):
+            event = None
+            if message.is_pressed:
+                event = CONF_SHORT_PRESS
+            elif message.is_released_after_short_press:
+                event = CONF_SHORT_RELEASE
+            elif message.is_held:
+                event = CONF_LONG_PRESS
+            elif message.is_released_after_long_press:
+                event = CONF_LONG_RELEASE
+            else:
+                event = None
+            self.hass.bus.async_fire(
+                "bticino_myhome_cen_event",
+                {
+                    "object": int(message.object),
+                    "pushbutton": int(message.push_button),
+                    "event": event,
+                },
+            )
+            LOGGER.info(
+                "%s %s",
+                self.log_id,
+                message.human_readable_log,
+            )
+        elif self._handle_heating_dimension_20(message):
+            return
+        elif isinstance(message, OWNGatewayEvent) or isinstance(message, OWNGatewayCommand):
+            # Rate limiting for repetitive gateway messages (date/time updates)
+            msg_type = type(message).__name__
+            self._message_count[msg_type] = self._message_count.get(msg_type, 0) + 1
+
+            # Log first occurrence and then every N occurrences
+            if self._message_count[msg_type] == 1:
+                LOGGER.info(
+                    "%s %s (further messages will be logged every %s occurrences)",
+                    self.log_id,
+                    message.human_readable_log,
+                    self._log_interval,
+                )
+            elif self._message_count[msg_type] % self._log_interval == 0:
+                LOGGER.debug(
+                    "%s %s (logged %s times)",
+                    self.log_id,
+                    message.human_readable_log,
+                    self._message_count[msg_type],
+                )
+        else:
+            # Rate limiting for unsupported messages
+            msg_key = self._unsupported_message_key(message)
+            self._message_count[msg_key] = self._message_count.get(msg_key, 0) + 1
+
+            # Log first occurrence and then every N occurrences
+            if self._message_count[msg_key] == 1:
+                LOGGER.warning(
+                    "%s Unsupported message type: `%s` (further occurrences will be logged every %s messages)",
+                    self.log_id,
+                    message,
+                    self._log_interval,
+                )
+            elif self._message_count[msg_key] % self._log_interval == 0:
+                LOGGER.debug(
+                    "%s Unsupported message: `%s` (received %s times)",
+                    self.log_id,
+                    message,
+                    self._message_count[msg_key],
+                )
+
     async def sending_loop(self, worker_id: int):
-        """Send commands to the gateway with retry/reconnect logic."""
+        """Send commands to the gateway on sessions taken from the command pool."""
         self._terminate_sender = False
 
-        retry_count = 0
-        base_delay = 2  # seconds
-        max_backoff = 60  # seconds
-        command_session = None
-
         LOGGER.debug(
             "%s Creating sending worker %s",
             self.log_id,
@@ -835,49 +1643,6 @@ class MyHOMEGatewayHandler:
         )
 
         while not self._terminate_sender:
-            if command_session is None:
-                try:
-                    if retry_count > 0:
-                        delay = min(base_delay * (2 ** (retry_count - 1)), max_backoff)
-                        LOGGER.warning(
-                            "%s Sender worker %s disconnected, retrying in %s seconds.",
-                            self.log_id,
-                            worker_id,
-                            delay,
-                        )
-                        await asyncio.sleep(delay)
-
-                    command_session = OWNCommandSession(gateway=self.gateway, logger=LOGGER)
-                    await command_session.connect()
-                    if retry_count > 0:
-                        LOGGER.info(
-                            "%s Sender worker %s reconnected to gateway.",
-                            self.log_id,
-                            worker_id,
-                        )
-                    retry_count = 0
-                except asyncio.CancelledError:
-                    LOGGER.info("%s Sender worker %s cancelled.", self.log_id, worker_id)
-                    break
-                except (OSError, ConnectionError, TimeoutError) as conn_err:
-                    retry_count += 1
-                    LOGGER.error(
-                        "%s Sender worker %s failed to connect: %s",
-                        self.log_id,
-                        worker_id,
-                        conn_err,
-                    )
-                    continue
-                except Exception as err:  # pylint: disable=broad-except
-                    retry_count += 1
-                    LOGGER.exception(
-                        "%s Unexpected sender worker %s connection error: %s",
-                        self.log_id,
-                        worker_id,
-                        err,
-                    )
-                    continue
-
             try:
                 task = await asyncio.wait_for(self.send_buffer.get(), timeout=1)
             except asyncio.TimeoutError:
@@ -895,53 +1660,105 @@ class MyHOMEGatewayHandler:
                 )
                 break
 
+            # Pipeline whatever else is already queued, e.g. the rest of a scene
+            tasks = [task]
+            while len(tasks) < COMMAND_PIPELINE_DEPTH:
+                try:
+                    task = self.send_buffer.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if task is None:
+                    # Leave the shutdown signal for the next get()
+                    self.send_buffer.task_done()
+                    self.send_buffer.put_nowait(None)
+                    break
+                tasks.append(task)
+
+            command_session = None
             retry_task = False
+            # Tasks the session failed to send, whose result is None
+            failed_tasks = []
             cancel_requested = False
             try:
-                LOGGER.debug(
-                    "%s Message `%s` was successfully unqueued by worker %s.",
-                    self.log_id,
-                    task["message"],
-                    worker_id,
-                )
-                await command_session.send(
-                    message=task["message"],
-                    is_status_request=task["is_status_request"],
-                )
-                retry_count = 0
+                for task in tasks:
+                    LOGGER.debug(
+                        "%s Message `%s` was successfully unqueued by worker %s.",
+                        self.log_id,
+                        task["message"],
+                        worker_id,
+                    )
+                remaining = tasks
+                while remaining:
+                    # Tasks for a target another worker has yet to send wait for it
+                    ready = await self.send_buffer.wait_turn(remaining)
+                    batch, remaining = remaining[:ready], remaining[ready:]
+                    # Sessions are negotiated by the pool ahead of time
+                    command_session = await self.command_pool.acquire()
+                    results = await command_session.send_pipelined(
+                        [(task["message"], task["is_status_request"]) for task in batch],
+                        depth=COMMAND_PIPELINE_DEPTH,
+                    )
+                    for task, result in zip(batch, results):
+                        if result is False:
+                            LOGGER.warning(
+                                "%s Sender worker %s gave up on `%s`, the gateway refused it.",
+                                self.log_id,
+                                worker_id,
+                                task["message"],
+                            )
+                        elif result is None:
+                            failed_tasks.append(task)
+                    if failed_tasks:
+                        # The session failed, the rest goes out again with the failed tasks
+                        failed_tasks.extend(remaining)
+                        break
+                    for task in batch:
+                        self.send_buffer.end_turn(task)
+                    await self.command_pool.release(command_session)
+                    command_session = None
+                if failed_tasks:
+                    LOGGER.error(
+                        "%s Sender worker %s could not send %s, queuing again.",
+                        self.log_id,
+                        worker_id,
+                        ", ".join(f"`{task['message']}`" for task in failed_tasks),
+                    )
             except asyncio.CancelledError:
                 retry_task = not self._terminate_sender
                 cancel_requested = True
                 LOGGER.info("%s Sender worker %s cancelled.", self.log_id, worker_id)
             except (OSError, ConnectionError, TimeoutError) as send_err:
-                retry_count += 1
                 retry_task = True
-                LOGGER.error(
-                    "%s Sender worker %s lost connection while sending `%s`: %s",
-                    self.log_id,
-                    worker_id,
-                    task["message"],
-                    send_err,
-                )
+                if not self._terminate_sender:
+                    LOGGER.error(
+                        "%s Sender worker %s lost connection while sending %s: %s",
+                        self.log_id,
+                        worker_id,
+                        ", ".join(f"`{task['message']}`" for task in tasks),
+                        send_err,
+                    )
             except Exception as err:  # pylint: disable=broad-except
-                retry_count += 1
                 retry_task = True
                 LOGGER.exception(
-                    "%s Unexpected sender worker %s error while sending `%s`: %s",
+                    "%s Unexpected sender worker %s error while sending %s: %s",
                     self.log_id,
                     worker_id,
-                    task["message"],
+                    ", ".join(f"`{task['message']}`" for task in tasks),
                     err,
                 )
             finally:
-                self.send_buffer.task_done()
+                for task in tasks:
+                    self.send_buffer.task_done()
+                    self.send_buffer.end_turn(task)
 
-                if retry_task and not self._terminate_sender:
-                    await self.send_buffer.put(task)
+                    if (retry_task or task in failed_tasks) and not self._terminate_sender:
+                        await self.send_buffer.put(task)
 
-                if retry_task and command_session is not None:
+                if command_session is not None:
                     try:
-                        await command_session.close()
+                        await self.command_pool.release(
+                            command_session, healthy=not (retry_task or failed_tasks)
+                        )
                     except Exception as err:  # pylint: disable=broad-except
                         LOGGER.error(
                             "%s Sender worker %s failed to close command session: %s",
@@ -949,22 +1766,10 @@ class MyHOMEGatewayHandler:
                             worker_id,
                             err,
                         )
-                    command_session = None
 
             if cancel_requested:
                 break
 
-        if command_session is not None:
-            try:
-                await command_session.close()
-            except Exception as err:  # pylint: disable=broad-except
-                LOGGER.error(
-                    "%s Sender worker %s failed to close command session: %s",
-                    self.log_id,
-                    worker_id,
-                    err,
-                )
-
         LOGGER.debug(
             "%s Destroying sending worker %s",
             self.log_id,
@@ -980,14 +1785,35 @@ class MyHOMEGatewayHandler:
         # Wake sender workers blocked on queue.get().
         for _ in self.sending_workers:
             await self.send_buffer.put(None)
-
+        await self.command_pool.close()
+
+        if self.discovery_job_running:
+            self._discovery_job.cancel()
+        if self._startup_refresh_task is not None and not self._startup_refresh_task.done():
+            self._startup_refresh_task.cancel()
+        self.follow_up_refresh.cancel()
+        await self.save_state_snapshot()
         if self.listening_worker is not None and not self.listening_worker.done():
             self.listening_worker.cancel()
+        if self.dispatching_worker is not None and not self.dispatching_worker.done():
+            self.dispatching_worker.cancel()
+        if self.polling_worker is not None and not self.polling_worker.done():
+            self.polling_worker.cancel()
 
         return True
 
     async def send(self, message: OWNCommand):
-        await self.send_buffer.put({"message": message, "is_status_request": False})
+        # The state of the endpoints is about to change, some entities send raw frames
+        _sent = OWNMessage.parse(message) if isinstance(message, str) else message
+        if _sent is not None:
+            self.shadow_state.forget(_sent)
+        await self.send_buffer.put(
+            {
+                "message": message,
+                "is_status_request": False,
+                "priority": _priority_or(SEND_PRIORITY_INTERACTIVE),
+            }
+        )
         LOGGER.debug(
             "%s Message `%s` was successfully queued.",
             self.log_id,
@@ -995,7 +1821,24 @@ class MyHOMEGatewayHandler:
         )
 
     async def send_status_request(self, message: OWNCommand):
-        await self.send_buffer.put({"message": message, "is_status_request": True})
+        _known = self.shadow_state.lookup(message)
+        if _known is not None:
+            LOGGER.debug(
+                "%s Message `%s` was answered from the shadow state with `%s`.",
+                self.log_id,
+                message,
+                _known,
+            )
+            for _handle_event in self._event_routes.get(_known.entity, ()):
+                _handle_event(_known)
+            return
+        await self.send_buffer.put(
+            {
+                "message": message,
+                "is_status_request": True,
+                "priority": _priority_or(SEND_PRIORITY_REFRESH),
+            }
+        )
         LOGGER.debug(
             "%s Message `%s` was successfully queued.",
             self.log_id,
@@ -149,6 +149,10 @@ class MyHOMELight(MyHOMEEntity, LightEntity):
         self._attr_brightness = None
         self._attr_brightness_pct = None
 
+    @property
+    def _status_scope(self) -> tuple | None:
+        return (self._who, self._where) if self._interface is None else None
+
     async def async_update(self):
         """Update the entity.
 
@@ -225,4 +229,4 @@ class MyHOMELight(MyHOMEEntity, LightEntity):
         if self._off_icon is not None and self._on_icon is not None:
             self._attr_icon = self._on_icon if self._attr_is_on else self._off_icon
 
-        self.async_schedule_update_ha_state()
+        self.async_schedule_state_write()
@@ -0,0 +1,161 @@
+"""Runtime metrics of a MyHome gateway handler."""
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+from .OWNd.connection import OWNSessionObserver
+
+# Received frame rates are computed over windows of this many seconds
+RATE_WINDOW = 10
+
+# Metrics exposed as diagnostic sensors of the gateway device
+METRIC_SENSORS = (
+    "frames_per_second",
+    "parse_time",
+    "dispatch_time",
+    "command_rtt",
+    "send_queue_depth",
+    "nacks",
+    "retries",
+    "reconnects",
+)
+
+
+def metric_sensor_unique_id(mac: str, key: str) -> str:
+    return f"{mac}-metrics-{key}"
+
+
+class Histogram:
+    """Durations in power-of-two microsecond buckets.
+    Recording a value costs a multiplication, a bit_length() and an increment."""
+
+    BUCKETS = 32
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._buckets = [0] * self.BUCKETS
+
+    def observe(self, seconds: float, count: int = 1) -> None:
+        """Record `count` values whose mean duration is `seconds`"""
+        self.count += count
+        self.total += seconds * count
+        if seconds > self.max:
+            self.max = seconds
+        self._buckets[min(int(seconds * 1e6).bit_length(), self.BUCKETS - 1)] += count
+
+    def _quantile(self, quantile: float) -> Optional[float]:
+        """Upper bound of the bucket holding the quantile, in microseconds,
+        capped to the largest recorded value"""
+        if self.count == 0:
+            return None
+        _rank = quantile * self.count
+        _seen = 0
+        for _bucket, _count in enumerate(self._buckets):
+            _seen += _count
+            if _seen >= _rank:
+                break
+        return round(min(float(2**_bucket), self.max * 1e6), 1)
+
+    @property
+    def stats(self) -> dict:
+        """Summary in microseconds"""
+        return {
+            "count": self.count,
+            "mean_us": round(self.total / self.count * 1e6, 1) if self.count else None,
+            "p50_us": self._quantile(0.5),
+            "p95_us": self._quantile(0.95),
+            "max_us": round(self.max * 1e6, 1) if self.count else None,
+        }
+
+
+class GatewayMetrics(OWNSessionObserver):
+    """Counters and histograms kept by MyHOMEGatewayHandler.
+
+    The OWNd sessions report parsing, command round trips, retries and
+    reconnections through the OWNSessionObserver interface. The gateway
+    handler reports received frames and dispatch times itself.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.frames = 0
+        self.frames_by_who: Counter = Counter()
+        self.parse_time = Histogram()
+        self.dispatch_time = Histogram()
+        self.command_rtt = Histogram()
+        self.acks = 0
+        self.nacks = 0
+        self.retries = 0
+        self.reconnects: Counter = Counter()
+        self._window_started = self.started
+        self._window_frames = 0
+        self._window_frames_by_who: Counter = Counter()
+        self._rates: Dict[str, float] = {}
+        self._rate = 0.0
+
+    def frame_dispatched(self, who, seconds: float) -> None:
+        self.frames += 1
+        self.frames_by_who[who] += 1
+        self._window_frames += 1
+        self._window_frames_by_who[who] += 1
+        self.dispatch_time.observe(seconds)
+
+    def frames_parsed(self, count: int, seconds: float) -> None:
+        if count:
+            self.parse_time.observe(seconds / count, count)
+
+    def command_replied(self, seconds: float, acknowledged: bool) -> None:
+        self.command_rtt.observe(seconds)
+        if acknowledged:
+            self.acks += 1
+        else:
+            self.nacks += 1
+
+    def command_retried(self) -> None:
+        self.retries += 1
+
+    def reconnected(self, connection_type: str) -> None:
+        self.reconnects[connection_type] += 1
+
+    def _update_rates(self) -> None:
+        _now = time.monotonic()
+        _elapsed = _now - self._window_started
+        if _elapsed < RATE_WINDOW:
+            return
+        self._rate = self._window_frames / _elapsed
+        self._rates = {
+            str(_who): round(_frames / _elapsed, 2)
+            for _who, _frames in self._window_frames_by_who.items()
+        }
+        self._window_started = _now
+        self._window_frames = 0
+        self._window_frames_by_who = Counter()
+
+    @property
+    def frames_per_second(self) -> float:
+        self._update_rates()
+        return round(self._rate, 2)
+
+    @property
+    def frames_per_second_by_who(self) -> Dict[str, float]:
+        self._update_rates()
+        return dict(self._rates)
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "uptime": round(time.monotonic() - self.started),
+            "frames": self.frames,
+            "frames_by_who": {str(_who): _frames for _who, _frames in self.frames_by_who.items()},
+            "frames_per_second": self.frames_per_second,
+            "frames_per_second_by_who": self.frames_per_second_by_who,
+            "parse_time": self.parse_time.stats,
+            "dispatch_time": self.dispatch_time.stats,
+            "command_rtt": self.command_rtt.stats,
+            "acks": self.acks,
+            "nacks": self.nacks,
+            "retries": self.retries,
+            "reconnects": dict(self.reconnects),
+        }
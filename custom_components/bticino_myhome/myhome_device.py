@@ -1,7 +1,9 @@
 """Support for common values for MyHome devices."""
 
 from __future__ import annotations
-from typing import TYPE_CHECKING
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Dict, Optional
 
 if TYPE_CHECKING:
     from .gateway import MyHOMEGatewayHandler
@@ -10,10 +12,80 @@ from homeassistant.helpers.entity import Entity
 from homeassistant.const import CONF_ENTITIES
 
 
-from .const import DOMAIN, CONF_PLATFORMS, CONF_ENTITIES
+from .const import DOMAIN, CONF_PLATFORMS, CONF_ENTITIES, LOGGER, SEND_PRIORITY_BACKGROUND
+
+# Priority class of the commands queued by the current task, see send_priority
+_SEND_PRIORITY: ContextVar[Optional[int]] = ContextVar("send_priority", default=None)
+
+
+@contextmanager
+def send_priority(priority: int):
+    """Queue the commands sent within the block with `priority`, a SEND_PRIORITY_* class."""
+    token = _SEND_PRIORITY.set(priority)
+    try:
+        yield
+    finally:
+        _SEND_PRIORITY.reset(token)
+
+
+def current_send_priority() -> Optional[int]:
+    """Priority class set by send_priority, None outside of it."""
+    return _SEND_PRIORITY.get()
+
+
+class StateWriteCoalescer:
+    """Writes the state of the entities updated by a burst of messages once,
+    at the end of the event loop tick or after a short window."""
+
+    def __init__(self, hass, window: float = 0):
+        self._hass = hass
+        self.window = window
+        # Dict rather than set, so entities are written in the order they changed
+        self._dirty: Dict[MyHOMEEntity, None] = {}
+        self._handle = None
+        self.requested = 0
+        self.coalesced = 0
+        self.written = 0
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "window": self.window,
+            "requested": self.requested,
+            "written": self.written,
+            "coalesced": self.coalesced,
+        }
+
+    def schedule(self, entity: MyHOMEEntity) -> None:
+        self.requested += 1
+        if entity in self._dirty:
+            self.coalesced += 1
+            return
+        self._dirty[entity] = None
+        if self._handle is None:
+            if self.window > 0:
+                self._handle = self._hass.loop.call_later(self.window, self._flush)
+            else:
+                self._handle = self._hass.loop.call_soon(self._flush)
+
+    def _flush(self) -> None:
+        self._handle = None
+        _dirty, self._dirty = self._dirty, {}
+        for _entity in _dirty:
+            # The entity may have been removed since it changed
+            if _entity.hass is None or _entity.entity_id is None:
+                continue
+            try:
+                _entity.async_write_ha_state()
+                self.written += 1
+            except Exception:  # pylint: disable=broad-except
+                LOGGER.exception("Could not write the state of %s", _entity.entity_id)
 
 
 class MyHOMEEntity(Entity):
+    # Seconds between two polls by the gateway poll scheduler, None when bus events keep the entity up to date
+    _poll_interval: Optional[float] = None
+
     def __init__(
         self,
         hass,
@@ -48,12 +120,48 @@ class MyHOMEEntity(Entity):
             "via_device": (DOMAIN, self._gateway_handler.unique_id),
         }
 
+    @property
+    def _entity_key(self) -> str:
+        """Key of this entity among the entities of its device"""
+        return self._platform
+
+    @property
+    def _status_scope(self) -> Optional[tuple]:
+        """(WHO, WHERE) of the entity when area and general status requests
+        of its family refresh it too, None when only its own does"""
+        return None
+
+    def _poll_requests(self) -> list:
+        """Status requests sent by async_update, a poll is skipped when the shadow state read all their answers recently"""
+        return []
+
+    def _register_entity(self) -> None:
+        """Make the entity reachable from its device and from the gateway event routing and polls."""
+        self._hass.data[DOMAIN][self._gateway_handler.mac][CONF_PLATFORMS][self._platform][self._device_id][CONF_ENTITIES][self._entity_key] = self
+        self._gateway_handler.add_event_route(self._device_id, self.handle_event)
+        if self._poll_interval is not None:
+            self._gateway_handler.poll_scheduler.add(self, self._poll_interval, self._poll_requests())
+
+    def _unregister_entity(self) -> None:
+        self._gateway_handler.poll_scheduler.remove(self)
+        self._gateway_handler.remove_event_route(self._device_id, self.handle_event)
+        if self._entity_key in self._hass.data[DOMAIN][self._gateway_handler.mac][CONF_PLATFORMS][self._platform][self._device_id][CONF_ENTITIES]:
+            del self._hass.data[DOMAIN][self._gateway_handler.mac][CONF_PLATFORMS][self._platform][self._device_id][CONF_ENTITIES][self._entity_key]
+
+    def async_schedule_state_write(self) -> None:
+        """Write the state once the current burst of messages has been handled."""
+        self._gateway_handler.state_writer.schedule(self)
+
     async def async_added_to_hass(self):
         """When entity is added to hass."""
-        self._hass.data[DOMAIN][self._gateway_handler.mac][CONF_PLATFORMS][self._platform][self._device_id][CONF_ENTITIES][self._platform] = self
-        await self.async_update()
+        self._register_entity()
+        _scope = self._status_scope
+        if _scope is not None and self._gateway_handler.startup_refresh.add(self, self._device_id, *_scope):
+            return
+        # Startup refreshes queue behind user commands
+        with send_priority(SEND_PRIORITY_BACKGROUND):
+            await self.async_update()
 
     async def async_will_remove_from_hass(self):
         """When entity is removed from hass."""
-        if self._platform in self._hass.data[DOMAIN][self._gateway_handler.mac][CONF_PLATFORMS][self._platform][self._device_id][CONF_ENTITIES]:
-            del self._hass.data[DOMAIN][self._gateway_handler.mac][CONF_PLATFORMS][self._platform][self._device_id][CONF_ENTITIES][self._platform]
+        self._unregister_entity()
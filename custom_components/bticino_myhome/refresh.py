@@ -0,0 +1,303 @@
+"""Refreshes of the entity states: at startup, after lighting scenes and periodic polls."""
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from .OWNd.message import OWNCommand, OWNMessage
+from .shadow import ShadowStateTable
+
+
+class StartupRefresh:
+    """Entities waiting for their first state since the gateway handler started.
+
+    Until start() is called, the lights, switches and covers being added are
+    collected with add() instead of sending a status request each, so that
+    the gateway handler can plan their refresh. Then expect() lists the
+    endpoints a batch of status requests should answer, note() is given every
+    message read from the bus, and wait() returns once they all answered,
+    or when answers stopped coming.
+    """
+
+    def __init__(self):
+        self.collecting = True
+        # (entity, device ID, WHO, WHERE) collected by add()
+        self._entities: List[Tuple[object, str, str, str]] = []
+        # Device ID -> endpoints of that device still waiting for a message
+        self._waiting: Dict[str, list] = {}
+        self._progress = asyncio.Event()
+        self._started_at: Optional[float] = None
+        self._last_answer: Optional[float] = None
+        self.endpoints = 0
+        self.broadcast_requests = 0
+        self.individual_requests = 0
+        self.answered_by_broadcast = 0
+        self.unanswered: Optional[int] = None
+        self.synced_in: Optional[float] = None
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "endpoints": self.endpoints,
+            "broadcast_requests": self.broadcast_requests,
+            "individual_requests": self.individual_requests,
+            "answered_by_broadcast": self.answered_by_broadcast,
+            "waiting": sum(len(_endpoints) for _endpoints in self._waiting.values()),
+            "unanswered": self.unanswered,
+            "synced_in": round(self.synced_in, 2) if self.synced_in is not None else None,
+        }
+
+    def add(self, entity, device_id: str, who: str, where: str) -> bool:
+        """Leave the first refresh of `entity` to the planner, False once it started"""
+        if not self.collecting:
+            return False
+        self._entities.append((entity, device_id, str(who), where))
+        return True
+
+    def start(self) -> List[Tuple[object, str, str, str]]:
+        """Stop collecting, the (entity, device ID, WHO, WHERE) collected so far"""
+        self.collecting = False
+        self._started_at = time.monotonic()
+        _entities, self._entities = self._entities, []
+        self.endpoints = len(_entities)
+        return _entities
+
+    def expect(self, endpoints: list) -> None:
+        """Wait for a message for each of the (entity, device ID, WHO, WHERE) `endpoints`"""
+        for _endpoint in endpoints:
+            self._waiting.setdefault(_endpoint[1], []).append(_endpoint)
+
+    def pending(self) -> list:
+        """Endpoints still waiting for a message, they are no longer expected"""
+        _waiting, self._waiting = self._waiting, {}
+        return [_endpoint for _endpoints in _waiting.values() for _endpoint in _endpoints]
+
+    def note(self, message: OWNMessage) -> None:
+        """A message was read from the bus"""
+        if self._waiting and self._waiting.pop(message.entity, None) is not None:
+            self._last_answer = time.monotonic()
+            self._progress.set()
+
+    async def wait(self, quiet: float, timeout: float) -> None:
+        """Until every expected entity answered, no answer came for `quiet` seconds, or `timeout`"""
+        _deadline = time.monotonic() + timeout
+        while self._waiting:
+            _left = _deadline - time.monotonic()
+            if _left <= 0:
+                return
+            self._progress.clear()
+            try:
+                await asyncio.wait_for(self._progress.wait(), min(quiet, _left))
+            except asyncio.TimeoutError:
+                return
+
+    def finish(self) -> None:
+        """Count the entities that never answered, and the time the others took"""
+        self.unanswered = len(self.pending())
+        if self._last_answer is not None:
+            self.synced_in = self._last_answer - self._started_at
+
+
+class FollowUpRefresh:
+    """Status requests following the general and area lighting events.
+
+    A scene switching several areas sends an event for each of them, and
+    every status request sent in response is answered by a frame for each
+    light of its scope. Requests are held until none came for `window`
+    seconds, at most `max_delay` seconds after the first one. They are
+    then merged: a single general request when one was asked for or when
+    `general_areas` areas or more were, one request per area otherwise.
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        send: Callable[[str], None],
+        window: float,
+        max_delay: float,
+        general_areas: int,
+    ):
+        self._loop = loop
+        self._send = send
+        self.window = window
+        self.max_delay = max_delay
+        self.general_areas = general_areas
+        # WHERE of the requests held, "0" for the general one
+        self._scopes: Set[str] = set()
+        self._first: Optional[float] = None
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self.requested = 0
+        self.sent = 0
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "window": self.window,
+            "requested": self.requested,
+            "sent": self.sent,
+            "pending": len(self._scopes),
+        }
+
+    def request(self, where: str) -> None:
+        """Ask for the status of the lights of an area WHERE, or of every light with "0" """
+        self.requested += 1
+        self._scopes.add(where)
+        _now = self._loop.time()
+        if self._first is None:
+            self._first = _now
+        if self._handle is not None:
+            self._handle.cancel()
+        self._handle = self._loop.call_at(min(_now + self.window, self._first + self.max_delay), self._flush)
+
+    def cancel(self) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+        self._handle = None
+        self._scopes.clear()
+        self._first = None
+
+    def _flush(self) -> None:
+        _scopes, self._scopes = self._scopes, set()
+        self._handle = None
+        self._first = None
+        if "0" in _scopes or len(_scopes) >= self.general_areas:
+            _scopes = {"0"}
+        for _where in sorted(_scopes):
+            self._send(_where)
+            self.sent += 1
+
+
+class PollScheduler:
+    """Periodic refreshes of the entities whose state is not pushed by the bus.
+
+    Each entity is polled every `interval` seconds, at a phase of its own:
+    a new entity goes in the middle of the largest gap between the phases of
+    the entities polled at the same interval, give or take a quarter of that
+    gap, so that polls are spread evenly instead of all happening at once.
+
+    A poll is skipped when the shadow state read every answer to its status
+    requests less than `fresh_fraction` of its interval ago. Status requests
+    are limited to `frame_budget` per second overall, a poll that does not
+    fit waits for the next tick.
+    """
+
+    def __init__(
+        self,
+        shadow_state: ShadowStateTable,
+        frame_budget: float,
+        fresh_fraction: float,
+        tick: float = 1.0,
+    ):
+        self._shadow_state = shadow_state
+        self.frame_budget = frame_budget
+        self.fresh_fraction = fresh_fraction
+        self.tick = tick
+        self._epoch = time.monotonic()
+        # Phases of the entities, by interval
+        self._phases: Dict[float, Dict[object, float]] = {}
+        # (due time, sequence, entity) heap, entries whose sequence is not the
+        # one of their entity (removed or added again since) are dropped when due
+        self._due: List[Tuple[float, int, object]] = []
+        self._sequence = itertools.count()
+        # Entity -> (interval, status requests of a poll, sequence of its heap entry)
+        self._entities: Dict[object, Tuple[float, List[OWNCommand], int]] = {}
+        self._tokens = 0.0
+        self._refilled = time.monotonic()
+        self.polls = 0
+        self.frames = 0
+        self.skipped = 0
+        self.deferred = 0
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "entities": len(self._entities),
+            "frame_budget": self.frame_budget,
+            "polls": self.polls,
+            "frames": self.frames,
+            "skipped_fresh": self.skipped,
+            "deferred": self.deferred,
+        }
+
+    def add(self, entity, interval: float, requests: List[OWNCommand]) -> None:
+        """Poll `entity` with its async_update, which sends `requests`"""
+        self.remove(entity)
+        _phases = self._phases.setdefault(interval, {})
+        _phase = self._free_phase(sorted(_phases.values()), interval)
+        _phases[entity] = _phase
+        _sequence = next(self._sequence)
+        self._entities[entity] = (interval, list(requests), _sequence)
+        heapq.heappush(self._due, (self._next_due(_phase, interval, time.monotonic()), _sequence, entity))
+
+    def remove(self, entity) -> None:
+        _polled = self._entities.pop(entity, None)
+        if _polled is not None:
+            self._phases[_polled[0]].pop(entity, None)
+
+    @staticmethod
+    def _free_phase(phases: List[float], interval: float) -> float:
+        if not phases:
+            return random.uniform(0, interval)
+        # Gap after each phase, the last one wraps around the interval
+        _gaps = [
+            (_next - _phase, _phase)
+            for _phase, _next in zip(phases, phases[1:] + [phases[0] + interval])
+        ]
+        _gap, _start = max(_gaps)
+        return (_start + _gap / 2 + random.uniform(-_gap / 4, _gap / 4)) % interval
+
+    def _next_due(self, phase: float, interval: float, now: float) -> float:
+        _rounds = max(0, int((now - self._epoch - phase) // interval) + 1)
+        _due = self._epoch + phase + _rounds * interval
+        # Rounding may put the next poll at the time of the one just done
+        return _due if _due > now else _due + interval
+
+    def _fresh(self, interval: float, requests: List[OWNCommand]) -> bool:
+        if not requests:
+            return False
+        for _request in requests:
+            _age = self._shadow_state.age(_request)
+            if _age is None or _age >= interval * self.fresh_fraction:
+                return False
+        return True
+
+    def _refill(self, now: float) -> None:
+        # A poll sending more frames than the budget still goes out once the bucket is full
+        _largest = max((len(_polled[1]) for _polled in self._entities.values()), default=0)
+        self._tokens = min(
+            max(self.frame_budget, _largest),
+            self._tokens + (now - self._refilled) * self.frame_budget,
+        )
+        self._refilled = now
+
+    def due(self) -> list:
+        """Entities to poll now, their next poll is scheduled"""
+        _now = time.monotonic()
+        self._refill(_now)
+        _polled = []
+        while self._due and self._due[0][0] <= _now:
+            _, _sequence, _entity = self._due[0]
+            if _entity not in self._entities or self._entities[_entity][2] != _sequence:
+                heapq.heappop(self._due)
+                continue
+            _interval, _requests, _ = self._entities[_entity]
+            _fresh = self._fresh(_interval, _requests)
+            if not _fresh:
+                if len(_requests) > self._tokens:
+                    self.deferred += 1
+                    break
+                self._tokens -= len(_requests)
+                self.polls += 1
+                self.frames += len(_requests)
+                _polled.append(_entity)
+            else:
+                self.skipped += 1
+            _sequence = next(self._sequence)
+            self._entities[_entity] = (_interval, _requests, _sequence)
+            heapq.heapreplace(
+                self._due,
+                (self._next_due(self._phases[_interval][_entity], _interval, _now), _sequence, _entity),
+            )
+        return _polled
@@ -20,9 +20,11 @@ from homeassistant.const import (
     CONF_NAME,
     CONF_MAC,
     LIGHT_LUX,
+    EntityCategory,
     UnitOfPower,
     UnitOfEnergy,
     UnitOfTemperature,
+    UnitOfTime,
 )
 from homeassistant.helpers import entity_platform
 from homeassistant.helpers import entity_registry as er
@@ -54,6 +56,7 @@ from .const import (
     LOGGER,
 )
 from .gateway import MyHOMEGatewayHandler
+from .metrics import METRIC_SENSORS, metric_sensor_unique_id
 from .myhome_device import MyHOMEEntity
 
 SCAN_INTERVAL = timedelta(seconds=60)
@@ -65,12 +68,31 @@ ATTR_DATE = "date"
 ATTR_MONTH = "month"
 ATTR_DAY = "day"
 
+# Name, unit, device class and state class of each gateway metric sensor
+METRIC_SENSOR_DEFINITIONS = {
+    "frames_per_second": ("Received frames", "frames/s", None, SensorStateClass.MEASUREMENT),
+    "parse_time": ("Frame parse time", UnitOfTime.MICROSECONDS, SensorDeviceClass.DURATION, SensorStateClass.MEASUREMENT),
+    "dispatch_time": ("Frame dispatch time", UnitOfTime.MICROSECONDS, SensorDeviceClass.DURATION, SensorStateClass.MEASUREMENT),
+    "command_rtt": ("Command round trip time", UnitOfTime.MILLISECONDS, SensorDeviceClass.DURATION, SensorStateClass.MEASUREMENT),
+    "send_queue_depth": ("Send queue depth", None, None, SensorStateClass.MEASUREMENT),
+    "nacks": ("Refused commands", None, None, SensorStateClass.TOTAL_INCREASING),
+    "retries": ("Command retries", None, None, SensorStateClass.TOTAL_INCREASING),
+    "reconnects": ("Reconnections", None, None, SensorStateClass.TOTAL_INCREASING),
+}
+
 
 async def async_setup_entry(hass, config_entry, async_add_entities):
     if PLATFORM not in hass.data[DOMAIN][config_entry.data[CONF_MAC]][CONF_PLATFORMS]:
         return True
 
     _sensors = []
+    _gateway_handler = hass.data[DOMAIN][config_entry.data[CONF_MAC]][CONF_ENTITY]
+    if _gateway_handler.metrics is not None:
+        _sensors.extend(
+            MyHOMEGatewayMetricSensor(gateway=_gateway_handler, key=_key)
+            for _key in METRIC_SENSORS
+        )
+
     _configured_sensors = hass.data[DOMAIN][config_entry.data[CONF_MAC]][
         CONF_PLATFORMS
     ][PLATFORM]
@@ -246,24 +268,9 @@ class MyHOMEPowerSensor(MyHOMEEntity, SensorEntity):
             "Sensor": f"({self._where[0]}){self._where[1:]}"
         }
 
-    async def async_added_to_hass(self):
-        """When entity is added to hass."""
-        self._hass.data[DOMAIN][self._gateway_handler.mac][CONF_PLATFORMS][
-            self._platform
-        ][self._device_id][CONF_ENTITIES][self._attr_device_class] = self
-        await self.async_update()
-
-    async def async_will_remove_from_hass(self):
-        """When entity is removed from hass."""
-        if (
-            self._attr_device_class
-            in self._hass.data[DOMAIN][self._gateway_handler.mac][CONF_PLATFORMS][
-                self._platform
-            ][self._device_id][CONF_ENTITIES]
-        ):
-            del self._hass.data[DOMAIN][self._gateway_handler.mac][CONF_PLATFORMS][
-                self._platform
-            ][self._device_id][CONF_ENTITIES][self._attr_device_class]
+    @property
+    def _entity_key(self) -> str:
+        return self._attr_device_class
 
     async def async_update(self):
         """Update the entity.
@@ -283,7 +290,7 @@ class MyHOMEPowerSensor(MyHOMEEntity, SensorEntity):
             message.human_readable_log,
         )
         self._attr_native_value = message.active_power
-        self.async_schedule_update_ha_state()
+        self.async_schedule_state_write()
 
     async def start_sending_instant_power(self, duration):
         """Request automatic instant power."""
@@ -293,6 +300,8 @@ class MyHOMEPowerSensor(MyHOMEEntity, SensorEntity):
 
 
 class MyHOMEEnergySensor(MyHOMEEntity, SensorEntity):
+    _poll_interval = SCAN_INTERVAL.total_seconds()
+
     def __init__(
         self,
         hass,
@@ -336,48 +345,31 @@ class MyHOMEEnergySensor(MyHOMEEntity, SensorEntity):
         self._attr_device_class = device_class
         self._attr_native_unit_of_measurement = UnitOfEnergy.WATT_HOUR
         self._attr_state_class = SensorStateClass.TOTAL_INCREASING
-        self._attr_should_poll = True
         self._attr_native_value = None
         self._attr_extra_state_attributes = {
             "Sensor": f"({self._where[0]}){self._where[1:]}"
         }
 
-    async def async_added_to_hass(self):
-        """When entity is added to hass."""
-        self._hass.data[DOMAIN][self._gateway_handler.mac][CONF_PLATFORMS][
-            self._platform
-        ][self._device_id][CONF_ENTITIES][self._entity_specific_id] = self
-        await self.async_update()
+    @property
+    def _entity_key(self) -> str:
+        return self._entity_specific_id
 
-    async def async_will_remove_from_hass(self):
-        """When entity is removed from hass."""
-        if (
-            self._entity_specific_id
-            in self._hass.data[DOMAIN][self._gateway_handler.mac][CONF_PLATFORMS][
-                self._platform
-            ][self._device_id][CONF_ENTITIES]
-        ):
-            del self._hass.data[DOMAIN][self._gateway_handler.mac][CONF_PLATFORMS][
-                self._platform
-            ][self._device_id][CONF_ENTITIES][self._entity_specific_id]
+    def _poll_requests(self) -> list:
+        if self._entity_specific_id == "total-energy":
+            return [OWNEnergyCommand.get_total_consumption(self._where)]
+        elif self._entity_specific_id == "monthly-energy":
+            return [OWNEnergyCommand.get_partial_monthly_consumption(self._where)]
+        elif self._entity_specific_id == "daily-energy":
+            return [OWNEnergyCommand.get_partial_daily_consumption(self._where)]
+        return []
 
     async def async_update(self):
         """Update the entity.
 
-        Only used by the generic entity update service.
+        Called by the gateway poll scheduler and the generic entity update service.
         """
-        if self._entity_specific_id == "total-energy":
-            await self._gateway_handler.send_status_request(
-                OWNEnergyCommand.get_total_consumption(self._where)
-            )
-        elif self._entity_specific_id == "monthly-energy":
-            await self._gateway_handler.send_status_request(
-                OWNEnergyCommand.get_partial_monthly_consumption(self._where)
-            )
-        elif self._entity_specific_id == "daily-energy":
-            await self._gateway_handler.send_status_request(
-                OWNEnergyCommand.get_partial_daily_consumption(self._where)
-            )
+        for _request in self._poll_requests():
+            await self._gateway_handler.send_status_request(_request)
 
     def handle_event(self, message: OWNEnergyEvent):
         """Handle an event message."""
@@ -418,10 +410,12 @@ class MyHOMEEnergySensor(MyHOMEEntity, SensorEntity):
                 message.human_readable_log,
             )
             self._attr_native_value = message.current_day_partial_consumption
-        self.async_schedule_update_ha_state()
+        self.async_schedule_state_write()
 
 
 class MyHOMETemperatureSensor(MyHOMEEntity, SensorEntity):
+    _poll_interval = SCAN_INTERVAL.total_seconds()
+
     def __init__(
         self,
         hass,
@@ -455,39 +449,25 @@ class MyHOMETemperatureSensor(MyHOMEEntity, SensorEntity):
         )
         self._attr_native_unit_of_measurement = UnitOfTemperature.CELSIUS
         self._attr_state_class = SensorStateClass.MEASUREMENT
-        self._attr_should_poll = True
         self._attr_native_value = None
         self._attr_extra_state_attributes = {
             "Sensor": f"({self._where[0]}){self._where[1:]}"
         }
 
-    async def async_added_to_hass(self):
-        """When entity is added to hass."""
-        self._hass.data[DOMAIN][self._gateway_handler.mac][CONF_PLATFORMS][
-            self._platform
-        ][self._device_id][CONF_ENTITIES][self._attr_device_class] = self
-        await self.async_update()
+    @property
+    def _entity_key(self) -> str:
+        return self._attr_device_class
 
-    async def async_will_remove_from_hass(self):
-        """When entity is removed from hass."""
-        if (
-            self._attr_device_class
-            in self._hass.data[DOMAIN][self._gateway_handler.mac][CONF_PLATFORMS][
-                self._platform
-            ][self._device_id][CONF_ENTITIES]
-        ):
-            del self._hass.data[DOMAIN][self._gateway_handler.mac][CONF_PLATFORMS][
-                self._platform
-            ][self._device_id][CONF_ENTITIES][self._attr_device_class]
+    def _poll_requests(self) -> list:
+        return [OWNHeatingCommand.get_temperature(self._where)]
 
     async def async_update(self):
         """Update the entity.
 
-        Only used by the generic entity update service.
+        Called by the gateway poll scheduler and the generic entity update service.
         """
-        await self._gateway_handler.send_status_request(
-            OWNHeatingCommand.get_temperature(self._where)
-        )
+        for _request in self._poll_requests():
+            await self._gateway_handler.send_status_request(_request)
 
     def handle_event(self, message: OWNHeatingEvent):
         """Handle an event message."""
@@ -504,7 +484,7 @@ class MyHOMETemperatureSensor(MyHOMEEntity, SensorEntity):
                 message.human_readable_log,
             )
             self._attr_native_value = message.main_temperature
-            self.async_schedule_update_ha_state()
+            self.async_schedule_state_write()
         elif message.message_type == MESSAGE_TYPE_SECONDARY_TEMPERATURE:
             LOGGER.debug(
                 "%s %s",
@@ -512,7 +492,7 @@ class MyHOMETemperatureSensor(MyHOMEEntity, SensorEntity):
                 message.human_readable_log,
             )
             self._attr_native_value = message.secondary_temperature[1]
-            self.async_schedule_update_ha_state()
+            self.async_schedule_state_write()
 
 
 class MyHOMEIlluminanceSensor(MyHOMEEntity, SensorEntity):
@@ -555,24 +535,9 @@ class MyHOMEIlluminanceSensor(MyHOMEEntity, SensorEntity):
             "PL": where[len(where) // 2 :],
         }
 
-    async def async_added_to_hass(self):
-        """When entity is added to hass."""
-        self._hass.data[DOMAIN][self._gateway_handler.mac][CONF_PLATFORMS][
-            self._platform
-        ][self._device_id][CONF_ENTITIES][self._attr_device_class] = self
-        await self.async_update()
-
-    async def async_will_remove_from_hass(self):
-        """When entity is removed from hass."""
-        if (
-            self._attr_device_class
-            in self._hass.data[DOMAIN][self._gateway_handler.mac][CONF_PLATFORMS][
-                self._platform
-            ][self._device_id][CONF_ENTITIES]
-        ):
-            del self._hass.data[DOMAIN][self._gateway_handler.mac][CONF_PLATFORMS][
-                self._platform
-            ][self._device_id][CONF_ENTITIES][self._attr_device_class]
+    @property
+    def _entity_key(self) -> str:
+        return self._attr_device_class
 
     async def async_update(self):
         """Update the entity.
@@ -594,4 +559,51 @@ class MyHOMEIlluminanceSensor(MyHOMEEntity, SensorEntity):
             message.human_readable_log,
         )
         self._attr_native_value = message.illuminance
-        self.async_schedule_update_ha_state()
+        self.async_schedule_state_write()
+
+
+class MyHOMEGatewayMetricSensor(SensorEntity):
+    """Diagnostic sensor reading one of the gateway handler metrics."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_should_poll = True
+
+    def __init__(self, gateway: MyHOMEGatewayHandler, key: str) -> None:
+        self._gateway_handler = gateway
+        self._key = key
+
+        _name, _unit, _device_class, _state_class = METRIC_SENSOR_DEFINITIONS[key]
+        self._attr_name = f"{gateway.name} {_name}"
+        self._attr_unique_id = metric_sensor_unique_id(gateway.mac, key)
+        self._attr_native_unit_of_measurement = _unit
+        self._attr_device_class = _device_class
+        self._attr_state_class = _state_class
+        self._attr_device_info = {
+            "identifiers": {(DOMAIN, gateway.unique_id)},
+        }
+
+        self._attr_native_value = None
+        self._attr_extra_state_attributes = {}
+
+    async def async_update(self):
+        """Read the metric from the gateway handler."""
+        _stats = self._gateway_handler.metrics_stats
+
+        if self._key == "frames_per_second":
+            self._attr_native_value = _stats["frames_per_second"]
+            self._attr_extra_state_attributes = {
+                f"WHO {_who}": _rate
+                for _who, _rate in sorted(_stats["frames_per_second_by_who"].items())
+            }
+        elif self._key in ("parse_time", "dispatch_time"):
+            self._attr_native_value = _stats[self._key]["mean_us"]
+            self._attr_extra_state_attributes = dict(_stats[self._key])
+        elif self._key == "command_rtt":
+            _mean = _stats["command_rtt"]["mean_us"]
+            self._attr_native_value = round(_mean / 1000, 1) if _mean is not None else None
+            self._attr_extra_state_attributes = dict(_stats["command_rtt"])
+        elif self._key == "reconnects":
+            self._attr_native_value = sum(_stats["reconnects"].values())
+            self._attr_extra_state_attributes = dict(_stats["reconnects"])
+        else:
+            self._attr_native_value = _stats[self._key]
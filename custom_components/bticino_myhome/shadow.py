@@ -0,0 +1,159 @@
+"""Last known state of the endpoints of a MyHome bus."""
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .OWNd.message import OWNCommand, OWNMessage
+
+
+class ShadowStateTable:
+    """Last message read for each (WHO, WHERE, interface, dimension).
+
+    The table is updated from the events of the event session, which sees
+    every frame of the bus. A status request whose answer is younger than
+    `ttl` seconds is answered from the table instead of the bus, 0 disables
+    the answers but the table is still kept for snapshot().
+
+    Only requests answered by a single frame of their own key are answered:
+    dimension requests, and the status requests of lights and covers. The
+    status request of an advanced cover is answered by its position frame
+    (dimension 10), once one was read, since the state frame has no position. A
+    command sent to an endpoint, or an event for a whole family, area or group,
+    makes what the table knows of the endpoints it concerns stale: it no longer
+    answers requests, but remains the last known state until read again.
+    """
+
+    # Families whose status request is answered by one state frame of the endpoint
+    STATE_WHO = frozenset({1, 2})
+    # WHO -> dimension answering its status requests instead, for the endpoints reporting it
+    STATE_DIMENSION = {2: 10}
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        # key -> (message, time.monotonic() it was read)
+        self._entries: Dict[tuple, Tuple[OWNMessage, float]] = {}
+        # Keys of the entries that no longer answer requests
+        self._stale: Set[tuple] = set()
+        self.updates = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(message: OWNMessage) -> tuple:
+        return (message.who, message.where, message.interface, message.dimension)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "ttl": self.ttl,
+            "entries": len(self._entries),
+            "stale": len(self._stale),
+            "updates": self.updates,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def update(self, message: OWNMessage) -> None:
+        """Record an event read for a single endpoint"""
+        if message.dimension is None:
+            # A new state makes what was known of the dimensions of the endpoint stale,
+            # the brightness of a light that was switched on for example
+            self._expire(message, dimensions_only=True)
+        _key = self.key(message)
+        # Moved to the end, entries are kept in the order they were read
+        self._entries.pop(_key, None)
+        self._entries[_key] = (message, time.monotonic())
+        self._stale.discard(_key)
+        self.updates += 1
+
+    def forget(self, message: OWNMessage) -> None:
+        """Make the entries of the endpoints a command or an event is for stale"""
+        if message.is_general or message.is_area or message.is_group:
+            # Areas and groups are not tracked, every endpoint of the family may have changed
+            self._stale.update(_key for _key in self._entries if _key[0] == message.who)
+        else:
+            self._expire(message)
+
+    def _expire(self, message: OWNMessage, dimensions_only: bool = False) -> None:
+        _who, _where, _interface = message.who, message.where, message.interface
+        self._stale.update(
+            _key
+            for _key in self._entries
+            if _key[0] == _who
+            and _key[1] == _where
+            and _key[2] == _interface
+            and (_key[3] is not None or not dimensions_only)
+        )
+
+    def expire(self) -> None:
+        """Make every entry stale, events may have been missed"""
+        self._stale.update(self._entries)
+
+    def restore(self, messages: Iterable[OWNMessage]) -> List[OWNMessage]:
+        """Add stale entries, the last known state saved by an earlier run.
+        Endpoints read since the start are left alone, the messages restored are returned."""
+        _read = {_key[:3] for _key in self._entries}
+        _restored = []
+        for _message in messages:
+            _key = self.key(_message)
+            if _key[:3] in _read:
+                continue
+            self._entries.pop(_key, None)
+            self._entries[_key] = (_message, time.monotonic())
+            self._stale.add(_key)
+            _restored.append(_message)
+        return _restored
+
+    def frames(self, skipped_who: Iterable[int] = ()) -> List[str]:
+        """Raw frame of every entry, in the order they were read"""
+        return [str(_message) for _key, (_message, _) in self._entries.items() if _key[0] not in skipped_who]
+
+    def _answer_key(self, request: OWNCommand) -> tuple:
+        _key = self.key(request)
+        if _key[3] is None and _key[0] in self.STATE_DIMENSION:
+            _dimension_key = _key[:3] + (self.STATE_DIMENSION[_key[0]],)
+            if _dimension_key in self._entries:
+                return _dimension_key
+        return _key
+
+    def lookup(self, request: OWNCommand) -> Optional[OWNMessage]:
+        """Fresh message answering the status request `request`, None if the bus has to be asked"""
+        if self.ttl <= 0:
+            return None
+        if request.dimension is None and request.who not in self.STATE_WHO:
+            return None
+        _key = self._answer_key(request)
+        _entry = self._entries.get(_key)
+        if _entry is None or _key in self._stale or time.monotonic() - _entry[1] > self.ttl:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return _entry[0]
+
+    def age(self, request: OWNCommand) -> Optional[float]:
+        """Seconds since the message answering `request` was read, None if it is unknown or stale"""
+        _key = self._answer_key(request)
+        _entry = self._entries.get(_key)
+        if _entry is None or _key in self._stale:
+            return None
+        return time.monotonic() - _entry[1]
+
+    def snapshot(self) -> List[dict]:
+        """Every entry with the frame it holds and its age in seconds"""
+        _now = time.monotonic()
+        return [
+            {
+                "who": _key[0],
+                "where": _key[1],
+                "interface": _key[2],
+                "dimension": _key[3],
+                "frame": str(_message),
+                "age": round(_now - _read_at, 1),
+                "stale": _key in self._stale,
+            }
+            for _key, (_message, _read_at) in sorted(
+                self._entries.items(), key=lambda _item: (_item[0][0], str(_item[0][1]), str(_item[0][2]), _item[0][3] or 0)
+            )
+        ]
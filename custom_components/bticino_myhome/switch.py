@@ -122,6 +122,10 @@ class MyHOMESwitch(MyHOMEEntity, SwitchEntity):
 
         self._attr_is_on = None
 
+    @property
+    def _status_scope(self) -> tuple | None:
+        return (self._who, self._where) if self._interface is None else None
+
     async def async_update(self):
         """Update the entity.
 
@@ -160,4 +164,4 @@ class MyHOMESwitch(MyHOMEEntity, SwitchEntity):
         self._attr_is_on = message.is_on
         if self._off_icon is not None and self._on_icon is not None:
             self._attr_icon = self._on_icon if self._attr_is_on else self._off_icon
-        self.async_schedule_update_ha_state()
+        self.async_schedule_state_write()
@@ -319,6 +319,69 @@ def _build_discovery_snippet(
     return "\n".join(snippet_lines)
 
 
+def _discovery_results_payload(hass, gateway: str, results: dict[str, list[str]]) -> dict[str, Any]:
+    """Build the panel payload of discovery results, split between configured and new endpoints."""
+    light_results = [str(item) for item in results.get("light", [])]
+    cover_results = [str(item) for item in results.get("cover", [])]
+    climate_results = [str(item) for item in results.get("climate", [])]
+    power_results = [str(item) for item in results.get("power", [])]
+    configured = _configured_discovery_endpoints(hass, gateway)
+    mapped_light, new_light = _mapped_results(light_results, configured["light"])
+    mapped_cover, new_cover = _mapped_results(cover_results, configured["cover"])
+    mapped_climate, new_climate = _mapped_results(
+        climate_results,
+        configured["climate"],
+    )
+    mapped_power, new_power = _mapped_results(power_results, configured["power"])
+    return {
+        "light": light_results,
+        "cover": cover_results,
+        "climate": climate_results,
+        "power": power_results,
+        "mapped_light": mapped_light,
+        "mapped_cover": mapped_cover,
+        "mapped_climate": mapped_climate,
+        "mapped_power": mapped_power,
+        "new_light": new_light,
+        "new_cover": new_cover,
+        "new_climate": new_climate,
+        "new_power": new_power,
+        "total_light": len(light_results),
+        "total_cover": len(cover_results),
+        "total_climate": len(climate_results),
+        "total_power": len(power_results),
+        "snippet": _build_discovery_snippet(
+            light_results,
+            cover_results,
+            climate_results,
+            power_results,
+            {
+                "light": set(mapped_light),
+                "cover": set(mapped_cover),
+                "climate": set(mapped_climate),
+                "power": set(mapped_power),
+            },
+        ),
+    }
+
+
+async def _discovery_job_payload(hass, gateway: str, gateway_handler) -> dict[str, Any]:
+    """Build the panel payload of the running, or last, active discovery scan."""
+    progress = await gateway_handler.get_discovery_progress()
+    results = progress.results()
+    results["climate"] = [
+        str(item)
+        for item in results.get("climate", [])
+        if _is_valid_discovery_climate(str(item))
+    ]
+    return {
+        "kind": "active_discovery",
+        "gateway": gateway,
+        "job": progress.job,
+        **_discovery_results_payload(hass, gateway, results),
+    }
+
+
 class MyHOMEGatewaysView(HomeAssistantView):
     """Return configured gateways for panel UI."""
 
@@ -342,6 +405,19 @@ class MyHOMEGatewaysView(HomeAssistantView):
                     "name": gateway_handler.name,
                     "host": gateway_handler.gateway.host,
                     "discovery_by_activation": gateway_handler.discovery_by_activation,
+                    "message_cache": (
+                        gateway_handler.message_cache.stats
+                        if gateway_handler.message_cache is not None
+                        else None
+                    ),
+                    "command_pool": gateway_handler.command_pool.stats,
+                    "send_queue": gateway_handler.send_buffer.stats,
+                    "event_queue": gateway_handler.event_queue.stats,
+                    "state_writes": gateway_handler.state_writer.stats,
+                    "shadow_state": gateway_handler.shadow_state.stats,
+                    "startup_refresh": gateway_handler.startup_refresh.stats,
+                    "follow_up_refresh": gateway_handler.follow_up_refresh.stats,
+                    "polls": gateway_handler.poll_scheduler.stats,
                 }
             )
 
@@ -349,6 +425,71 @@ class MyHOMEGatewaysView(HomeAssistantView):
         return self.json({"gateways": gateways})
 
 
+class MyHOMEMetricsView(HomeAssistantView):
+    """Return the runtime metrics of a gateway handler."""
+
+    url = "/api/bticino_myhome/metrics"
+    name = "api:bticino_myhome:metrics"
+    requires_auth = True
+
+    async def get(self, request):
+        hass = request.app["hass"]
+        configured_gateways = hass.data.get(DOMAIN, {})
+        gateway, error, status = _resolve_gateway_from_payload(
+            configured_gateways,
+            request.query.get("gateway"),
+        )
+        if gateway is None:
+            return self.json_message(error, status_code=status)
+
+        gateway_handler = configured_gateways[gateway].get(CONF_ENTITY)
+        if gateway_handler is None or gateway_handler.metrics is None:
+            return self.json_message(
+                f"Metrics are not collected for gateway `{gateway}`.",
+                status_code=HTTPStatus.NOT_FOUND,
+            )
+
+        return self.json(
+            {
+                "gateway": gateway,
+                "metrics": gateway_handler.metrics_stats,
+            }
+        )
+
+
+class MyHOMEShadowStateView(HomeAssistantView):
+    """Return the last state read from the bus for each endpoint of a gateway."""
+
+    url = "/api/bticino_myhome/shadow_state"
+    name = "api:bticino_myhome:shadow_state"
+    requires_auth = True
+
+    async def get(self, request):
+        hass = request.app["hass"]
+        configured_gateways = hass.data.get(DOMAIN, {})
+        gateway, error, status = _resolve_gateway_from_payload(
+            configured_gateways,
+            request.query.get("gateway"),
+        )
+        if gateway is None:
+            return self.json_message(error, status_code=status)
+
+        gateway_handler = configured_gateways[gateway].get(CONF_ENTITY)
+        if gateway_handler is None:
+            return self.json_message(
+                f"Gateway `{gateway}` is not running.",
+                status_code=HTTPStatus.NOT_FOUND,
+            )
+
+        return self.json(
+            {
+                "gateway": gateway,
+                "stats": gateway_handler.shadow_state.stats,
+                "entries": gateway_handler.shadow_state.snapshot(),
+            }
+        )
+
+
 class MyHOMEConfigurationView(HomeAssistantView):
     """Read/write configured devices from panel UI."""
 
@@ -591,14 +732,32 @@ class MyHOMEConfigurationImportDiscoveryView(HomeAssistantView):
 
 
 class MyHOMEDiscoveryView(HomeAssistantView):
-    """Run MyHOME discovery from the web panel."""
+    """Run MyHOME discovery scans from the web panel.
+
+    A scan runs in the background: POST starts it and GET returns its
+    progress and the endpoints found so far, for the panel to poll.
+    """
 
     url = "/api/bticino_myhome/discovery"
     name = "api:bticino_myhome:discovery"
     requires_auth = True
 
+    async def get(self, request):
+        """Return the progress of the running, or last, discovery scan."""
+        hass = request.app["hass"]
+        configured_gateways = hass.data.get(DOMAIN, {})
+        gateway, error, status = _resolve_gateway_from_payload(
+            configured_gateways,
+            request.query.get("gateway"),
+        )
+        if gateway is None:
+            return self.json_message(error, status_code=status)
+
+        gateway_handler = configured_gateways[gateway][CONF_ENTITY]
+        return self.json(await _discovery_job_payload(hass, gateway, gateway_handler))
+
     async def post(self, request):
-        """Handle discovery requests."""
+        """Start a discovery scan."""
         hass = request.app["hass"]
         try:
             payload = await request.json()
@@ -606,32 +765,14 @@ class MyHOMEDiscoveryView(HomeAssistantView):
             payload = {}
 
         configured_gateways = hass.data.get(DOMAIN, {})
-        if not configured_gateways:
-            return self.json_message(
-                "No MyHOME gateways are configured.",
-                status_code=HTTPStatus.NOT_FOUND,
-            )
-
-        requested_gateway = payload.get("gateway")
-        if requested_gateway is None:
-            gateway = next(iter(configured_gateways.keys()))
-        else:
-            formatted_gateway = format_mac(requested_gateway)
-            if formatted_gateway is None:
-                return self.json_message(
-                    f"Invalid gateway `{requested_gateway}`.",
-                    status_code=HTTPStatus.BAD_REQUEST,
-                )
-            gateway = formatted_gateway
-
-        gateway_data = configured_gateways.get(gateway)
-        if gateway_data is None:
-            return self.json_message(
-                f"Gateway `{gateway}` was not found.",
-                status_code=HTTPStatus.NOT_FOUND,
-            )
+        gateway, error, status = _resolve_gateway_from_payload(
+            configured_gateways,
+            payload.get("gateway"),
+        )
+        if gateway is None:
+            return self.json_message(error, status_code=status)
 
-        gateway_handler = gateway_data[CONF_ENTITY]
+        gateway_handler = configured_gateways[gateway][CONF_ENTITY]
         scan_lights = _to_bool(payload.get("scan_lights"), True)
         scan_covers = _to_bool(payload.get("scan_covers"), True)
         scan_climate = _to_bool(payload.get("scan_climate"), True)
@@ -641,9 +782,11 @@ class MyHOMEDiscoveryView(HomeAssistantView):
         point_start = _to_int(payload.get("point_start"), DISCOVERY_DEFAULT_POINT_START)
         point_end = _to_int(payload.get("point_end"), DISCOVERY_DEFAULT_POINT_END)
         duration = _to_int(payload.get("duration"), DISCOVERY_DEFAULT_DURATION)
+        rescan = _to_bool(payload.get("rescan"), False)
+        fast = _to_bool(payload.get("fast"), False)
 
         LOGGER.info(
-            "%s Discovery requested via web panel (lights=%s, covers=%s, climate=%s, power=%s, area=%s-%s, point=%s-%s, duration=%ss).",
+            "%s Discovery requested via web panel (lights=%s, covers=%s, climate=%s, power=%s, area=%s-%s, point=%s-%s, duration=%ss, rescan=%s, fast=%s).",
             gateway_handler.log_id,
             scan_lights,
             scan_covers,
@@ -654,10 +797,12 @@ class MyHOMEDiscoveryView(HomeAssistantView):
             point_start,
             point_end,
             duration,
+            rescan,
+            fast,
         )
 
         try:
-            results = await gateway_handler.discover_devices(
+            gateway_handler.start_discovery_job(
                 scan_lights=scan_lights,
                 scan_covers=scan_covers,
                 scan_climate=scan_climate,
@@ -667,74 +812,42 @@ class MyHOMEDiscoveryView(HomeAssistantView):
                 point_start=point_start,
                 point_end=point_end,
                 duration=duration,
+                rescan=rescan,
+                fast=fast,
             )
         except RuntimeError as runtime_error:
             return self.json_message(
                 str(runtime_error),
                 status_code=HTTPStatus.CONFLICT,
             )
-        except Exception as err:  # pylint: disable=broad-except
-            LOGGER.exception(
-                "%s Discovery failed from web panel: %s",
-                gateway_handler.log_id,
-                err,
-            )
-            return self.json_message(
-                "Unexpected discovery failure.",
-                status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
-            )
 
-        light_results = results.get("light", [])
-        cover_results = results.get("cover", [])
-        climate_results = [
-            str(item)
-            for item in results.get("climate", [])
-            if _is_valid_discovery_climate(str(item))
-        ]
-        power_results = results.get("power", [])
-        configured = _configured_discovery_endpoints(hass, gateway)
-        mapped_light, new_light = _mapped_results(light_results, configured["light"])
-        mapped_cover, new_cover = _mapped_results(cover_results, configured["cover"])
-        mapped_climate, new_climate = _mapped_results(
-            climate_results,
-            configured["climate"],
-        )
-        mapped_power, new_power = _mapped_results(power_results, configured["power"])
         return self.json(
-            {
-                "kind": "active_discovery",
-                "gateway": gateway,
-                "light": [str(item) for item in light_results],
-                "cover": [str(item) for item in cover_results],
-                "climate": climate_results,
-                "power": [str(item) for item in power_results],
-                "mapped_light": mapped_light,
-                "mapped_cover": mapped_cover,
-                "mapped_climate": mapped_climate,
-                "mapped_power": mapped_power,
-                "new_light": new_light,
-                "new_cover": new_cover,
-                "new_climate": new_climate,
-                "new_power": new_power,
-                "total_light": len(light_results),
-                "total_cover": len(cover_results),
-                "total_climate": len(climate_results),
-                "total_power": len(power_results),
-                "snippet": _build_discovery_snippet(
-                    [str(item) for item in light_results],
-                    [str(item) for item in cover_results],
-                    [str(item) for item in climate_results],
-                    [str(item) for item in power_results],
-                    {
-                        "light": set(mapped_light),
-                        "cover": set(mapped_cover),
-                        "climate": set(mapped_climate),
-                        "power": set(mapped_power),
-                    },
-                ),
-            }
+            await _discovery_job_payload(hass, gateway, gateway_handler),
+            status_code=HTTPStatus.ACCEPTED,
         )
 
+    async def delete(self, request):
+        """Forget the addresses probed and the endpoints found by earlier scans."""
+        hass = request.app["hass"]
+        configured_gateways = hass.data.get(DOMAIN, {})
+        gateway, error, status = _resolve_gateway_from_payload(
+            configured_gateways,
+            request.query.get("gateway"),
+        )
+        if gateway is None:
+            return self.json_message(error, status_code=status)
+
+        gateway_handler = configured_gateways[gateway][CONF_ENTITY]
+        try:
+            await gateway_handler.forget_discovery_progress()
+        except RuntimeError as runtime_error:
+            return self.json_message(
+                str(runtime_error),
+                status_code=HTTPStatus.CONFLICT,
+            )
+
+        return self.json(await _discovery_job_payload(hass, gateway, gateway_handler))
+
 
 class MyHOMEDiscoveryByActivationView(HomeAssistantView):
     """Keep discovery-by-activation enabled from panel UI."""
@@ -845,52 +958,12 @@ class MyHOMEActivationDiscoveryResultsView(HomeAssistantView):
         else:
             await async_set_activation_discovery_results(hass, gateway, results)
 
-        light_results = results.get("light", [])
-        cover_results = results.get("cover", [])
-        climate_results = results.get("climate", [])
-        power_results = results.get("power", [])
-        configured = _configured_discovery_endpoints(hass, gateway)
-        mapped_light, new_light = _mapped_results(light_results, configured["light"])
-        mapped_cover, new_cover = _mapped_results(cover_results, configured["cover"])
-        mapped_climate, new_climate = _mapped_results(
-            climate_results,
-            configured["climate"],
-        )
-        mapped_power, new_power = _mapped_results(power_results, configured["power"])
-
         return self.json(
             {
                 "kind": "activation_discovery",
                 "gateway": gateway,
                 "enabled": gateway_handler.discovery_by_activation,
-                "light": [str(item) for item in light_results],
-                "cover": [str(item) for item in cover_results],
-                "climate": [str(item) for item in climate_results],
-                "power": [str(item) for item in power_results],
-                "mapped_light": mapped_light,
-                "mapped_cover": mapped_cover,
-                "mapped_climate": mapped_climate,
-                "mapped_power": mapped_power,
-                "new_light": new_light,
-                "new_cover": new_cover,
-                "new_climate": new_climate,
-                "new_power": new_power,
-                "total_light": len(light_results),
-                "total_cover": len(cover_results),
-                "total_climate": len(climate_results),
-                "total_power": len(power_results),
-                "snippet": _build_discovery_snippet(
-                    [str(item) for item in light_results],
-                    [str(item) for item in cover_results],
-                    [str(item) for item in climate_results],
-                    [str(item) for item in power_results],
-                    {
-                        "light": set(mapped_light),
-                        "cover": set(mapped_cover),
-                        "climate": set(mapped_climate),
-                        "power": set(mapped_power),
-                    },
-                ),
+                **_discovery_results_payload(hass, gateway, results),
                 "cleared": clear,
             }
         )
@@ -906,6 +979,8 @@ async def async_setup_web(hass) -> None:
             [StaticPathConfig(PANEL_STATIC_URL_PATH, str(panel_directory), False)]
         )
         hass.http.register_view(MyHOMEGatewaysView)
+        hass.http.register_view(MyHOMEMetricsView)
+        hass.http.register_view(MyHOMEShadowStateView)
         hass.http.register_view(MyHOMEConfigurationView)
         hass.http.register_view(MyHOMEConfigurationDeviceView)
         hass.http.register_view(MyHOMEConfigurationDeleteView)
@@ -0,0 +1,63 @@
+"""Load the integration as the `bticino_myhome` package, without a Home Assistant instance."""
+import asyncio
+import os
+import sys
+import types
+
+import pytest
+
+PACKAGE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "custom_components", "bticino_myhome"
+)
+
+if "bticino_myhome" not in sys.modules:
+    # Imported first, the integration modules import it while being loaded
+    import homeassistant.core  # noqa: F401
+
+    _package = types.ModuleType("bticino_myhome")
+    _package.__path__ = [PACKAGE_DIR]
+    sys.modules["bticino_myhome"] = _package
+
+
+class FakeBus:
+    def __init__(self):
+        self.events = []
+
+    def async_fire(self, event_type, event_data=None):
+        self.events.append((event_type, event_data))
+
+
+class FakeHass:
+    def __init__(self, loop):
+        self.loop = loop
+        self.bus = FakeBus()
+        self.data = {}
+
+
+class FakeGateway:
+    host = "192.168.1.35"
+    serial = "00:03:50:00:00:01"
+    log_id = "[test]"
+
+
+@pytest.fixture
+def handler():
+    """Factory of gateway handlers with the attributes the send and dispatch paths use,
+    to call from a running event loop"""
+    from bticino_myhome import gateway
+    from bticino_myhome.shadow import ShadowStateTable
+
+    def _make():
+        _handler = gateway.MyHOMEGatewayHandler.__new__(gateway.MyHOMEGatewayHandler)
+        _handler.hass = FakeHass(asyncio.get_running_loop())
+        _handler.gateway = FakeGateway()
+        _handler.send_buffer = gateway.CoalescingSendQueue()
+        _handler.shadow_state = ShadowStateTable(5)
+        _handler._event_routes = {}
+        _handler.generate_events = False
+        _handler._discovery_in_progress = False
+        _handler._discovery_by_activation = False
+        _handler._discovery_scanner = None
+        return _handler
+
+    return _make
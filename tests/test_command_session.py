@@ -0,0 +1,238 @@
+import asyncio
+import logging
+
+from bticino_myhome.OWNd.connection import OWNCommandSession, OWNCommandSessionPool
+from bticino_myhome.OWNd.message import OWNLightingCommand
+
+from conftest import FakeGateway
+
+ACK = b"*#*1##"
+NACK = b"*#*0##"
+
+
+class FakeStreams:
+    """Reader and writer of a command session, `reply` gives the answer to each frame written"""
+
+    def __init__(self, reply):
+        self._reply = reply
+        self._replies = asyncio.Queue()
+        self.written = []
+
+    def write(self, data):
+        self.written.append(data.decode())
+        self._replies.put_nowait(self._reply(data.decode()))
+
+    async def drain(self):
+        pass
+
+    def is_closing(self):
+        return False
+
+    def at_eof(self):
+        return False
+
+    async def readuntil(self, separator):
+        _reply = await self._replies.get()
+        if isinstance(_reply, Exception):
+            raise _reply
+        return _reply
+
+
+def _open_session(reply):
+    _session = OWNCommandSession(gateway=FakeGateway(), logger=logging.getLogger(__name__))
+    _streams = FakeStreams(reply)
+    _session._stream_reader = _session._stream_writer = _streams
+    return _session, _streams
+
+
+def test_retry_goes_out_before_later_command_to_same_target():
+    _refused = set()
+
+    def _reply(frame):
+        if frame.startswith("*1*1*") and frame not in _refused:
+            _refused.add(frame)
+            return NACK
+        return ACK
+
+    async def _test():
+        _session, _streams = _open_session(_reply)
+        _results = await _session.send_pipelined(
+            [
+                (OWNLightingCommand.switch_on("11"), False),
+                (OWNLightingCommand.switch_off("11"), False),
+                (OWNLightingCommand.switch_off("12"), False),
+            ],
+            depth=3,
+        )
+        assert _results == [True, True, True]
+        assert _streams.written == ["*1*1*11##", "*1*1*11##", "*1*0*11##", "*1*0*12##"]
+
+    asyncio.run(_test())
+
+
+def test_crashed_session_is_broken():
+    async def _test():
+        _session, _streams = _open_session(lambda frame: RuntimeError("garbled"))
+        _results = await _session.send_pipelined(
+            [(OWNLightingCommand.switch_on("11"), False), (OWNLightingCommand.switch_on("12"), False)],
+            depth=2,
+        )
+        assert _results == [None, None]
+        assert _session.broken
+        assert not OWNCommandSessionPool._is_alive(_session)
+
+    asyncio.run(_test())
+
+
+def test_sending_loop_queues_failed_commands_again(handler):
+    class FakeSession:
+        def __init__(self, send_buffer):
+            self._send_buffer = send_buffer
+            self.sent = []
+
+        async def send_pipelined(self, commands, depth):
+            self.sent.append([str(_message) for _message, _ in commands])
+            if len(self.sent) == 1:
+                return [True, None]
+            self._send_buffer.put_nowait(None)
+            return [True] * len(commands)
+
+    class FakePool:
+        def __init__(self, session):
+            self.session = session
+            self.released = []
+
+        async def acquire(self):
+            return self.session
+
+        async def release(self, session, healthy=True):
+            self.released.append(healthy)
+
+    async def _test():
+        _handler = handler()
+        _session = FakeSession(_handler.send_buffer)
+        _handler.command_pool = FakePool(_session)
+        await _handler.send(OWNLightingCommand.switch_on("11"))
+        await _handler.send(OWNLightingCommand.switch_on("12"))
+        await asyncio.wait_for(_handler.sending_loop(0), 5)
+        assert _session.sent == [["*1*1*11##", "*1*1*12##"], ["*1*1*12##"]]
+        assert _handler.command_pool.released == [False, True]
+
+    asyncio.run(_test())
+
+
+def test_pool_started_again_after_close(monkeypatch):
+    async def _connect(session):
+        session._stream_reader = session._stream_writer = FakeStreams(lambda frame: ACK)
+        return {"Success": True}
+
+    monkeypatch.setattr(OWNCommandSession, "connect", _connect)
+
+    async def _test():
+        _pool = OWNCommandSessionPool(FakeGateway(), logger=logging.getLogger(__name__), size=1)
+        _pool.start()
+        await _pool.release(await asyncio.wait_for(_pool.acquire(), 1))
+        await _pool.close()
+        _pool.start()
+        _session = await asyncio.wait_for(_pool.acquire(), 1)
+        assert await _session.send_pipelined([(OWNLightingCommand.switch_on("11"), False)]) == [True]
+        await _pool.release(_session)
+        await _pool.close()
+
+    asyncio.run(_test())
+
+
+def test_nack_belongs_to_oldest_command_in_flight():
+    def _reply(frame):
+        return NACK if frame == "*1*1*12##" else ACK
+
+    async def _test():
+        _session, _streams = _open_session(_reply)
+        _results = await _session.send_pipelined(
+            [
+                (OWNLightingCommand.switch_on("11"), False),
+                (OWNLightingCommand.switch_on("12"), False),
+                (OWNLightingCommand.switch_on("13"), False),
+            ],
+            depth=3,
+            retries=1,
+        )
+        assert _results == [True, False, True]
+        assert _streams.written == ["*1*1*11##", "*1*1*12##", "*1*1*13##", "*1*1*12##"]
+
+    asyncio.run(_test())
+
+
+def test_refused_command_retried_until_acknowledged():
+    _refusals = [NACK, NACK]
+
+    def _reply(frame):
+        return _refusals.pop() if _refusals else ACK
+
+    async def _test():
+        _session, _streams = _open_session(_reply)
+        assert await _session.send_pipelined([(OWNLightingCommand.switch_on("11"), False)], retries=2) == [True]
+        assert _streams.written == ["*1*1*11##"] * 3
+
+    asyncio.run(_test())
+
+
+def test_same_target_in_order_across_pooled_sessions(handler):
+    _log = []
+
+    class SlowSession:
+        def __init__(self):
+            self.gate = asyncio.Event()
+
+        async def send_pipelined(self, commands, depth):
+            for _message, _ in commands:
+                _log.append(("start", str(_message)))
+            await self.gate.wait()
+            for _message, _ in commands:
+                _log.append(("end", str(_message)))
+            return [True] * len(commands)
+
+    class TwoSessionPool:
+        def __init__(self):
+            self.sessions = [SlowSession(), SlowSession()]
+            self._idle = list(self.sessions)
+
+        async def acquire(self):
+            return self._idle.pop(0)
+
+        async def release(self, session, healthy=True):
+            self._idle.append(session)
+
+    async def _settle():
+        for _ in range(10):
+            await asyncio.sleep(0)
+
+    async def _test():
+        _handler = handler()
+        _pool = _handler.command_pool = TwoSessionPool()
+        _workers = [asyncio.ensure_future(_handler.sending_loop(_worker)) for _worker in range(2)]
+        await _settle()
+        await _handler.send(OWNLightingCommand.switch_on("11"))
+        await _settle()
+        # The first worker is sending, the second one takes these
+        await _handler.send(OWNLightingCommand.switch_off("11"))
+        await _handler.send(OWNLightingCommand.switch_on("12"))
+        await _settle()
+        assert _log == [("start", "*1*1*11##")]
+
+        _pool.sessions[0].gate.set()
+        _pool.sessions[1].gate.set()
+        await _settle()
+        assert _log == [
+            ("start", "*1*1*11##"),
+            ("end", "*1*1*11##"),
+            ("start", "*1*0*11##"),
+            ("start", "*1*1*12##"),
+            ("end", "*1*0*11##"),
+            ("end", "*1*1*12##"),
+        ]
+        for _ in _workers:
+            await _handler.send_buffer.put(None)
+        await asyncio.wait_for(asyncio.gather(*_workers), 5)
+
+    asyncio.run(_test())
@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+
+from bticino_myhome import gateway
+from bticino_myhome.discovery import JOB_COMPLETED, JOB_FAILED, DiscoveryProgress
+from bticino_myhome.OWNd.message import OWNMessage
+
+
+def _stored_progress(monkeypatch):
+    """Discovery progress store of the gateways, by MAC address"""
+    _stored = {}
+
+    async def _get_progress(hass, mac):
+        return _stored.get(mac, {})
+
+    async def _set_progress(hass, mac, progress):
+        _stored[mac] = progress
+
+    monkeypatch.setattr(gateway, "async_get_discovery_progress", _get_progress)
+    monkeypatch.setattr(gateway, "async_set_discovery_progress", _set_progress)
+    return _stored
+
+
+def _discovery_handler(handler):
+    _handler = handler()
+    _handler._discovery_progress = None
+    _handler._discovery_targets = {}
+    _handler._discovery_saved = 0.0
+    return _handler
+
+
+class FakeScanner:
+    """Answers the requests of a scan one by one, the light at WHERE 11 replies.
+    Fails before sending request `fail_at` when it is set."""
+
+    fail_at = None
+    scans = []
+
+    def __init__(self, gateway, logger, on_message, on_batch=None, **kwargs):
+        self._on_message = on_message
+        self._on_batch = on_batch
+        self.stats = {}
+
+    def note_activity(self):
+        pass
+
+    async def scan(self, requests, max_quiet):
+        self.scans.append([str(_request) for _request in requests])
+        for _index, _request in enumerate(requests):
+            if _index == self.fail_at:
+                raise ConnectionError("Gateway unreachable")
+            if str(_request) == "*#1*11##":
+                self._on_message(OWNMessage.parse("*1*1*11##"))
+            await self._on_batch([(_request, True)])
+
+
+def test_progress_round_trip_and_pending_targets():
+    _progress = DiscoveryProgress(probed={"light": ["11", "12"]}, found={"light": ["11"]}, job={"status": JOB_FAILED})
+    _progress = DiscoveryProgress.from_dict(_progress.as_dict())
+    _targets = [("light", "11"), ("light", "12"), ("light", "13"), ("cover", "11")]
+    assert _progress.pending(_targets) == [("light", "13"), ("cover", "11")]
+
+    _progress.forget([("light", "11")])
+    assert _progress.pending(_targets) == [("light", "11"), ("light", "13"), ("cover", "11")]
+    assert _progress.results() == {"light": [], "cover": [], "climate": [], "power": []}
+    assert _progress.job == {"status": JOB_FAILED}
+
+
+def test_interrupted_discovery_resumed_with_addresses_not_probed(handler, monkeypatch):
+    _stored = _stored_progress(monkeypatch)
+    monkeypatch.setattr(gateway, "DiscoveryScanner", FakeScanner)
+    monkeypatch.setattr(FakeScanner, "scans", [])
+    # Lights 11 to 13
+    _scan = {
+        "scan_covers": False,
+        "scan_climate": False,
+        "scan_power": False,
+        "area_start": 1,
+        "area_end": 1,
+        "point_start": 1,
+        "point_end": 3,
+    }
+
+    async def _test():
+        _handler = _discovery_handler(handler)
+        # Interrupted after the first two addresses
+        monkeypatch.setattr(FakeScanner, "fail_at", 2)
+        with pytest.raises(ConnectionError):
+            await _handler.discover_devices(**_scan)
+        assert _stored[_handler.mac]["probed"]["light"] == ["11", "12"]
+        assert _stored[_handler.mac]["found"]["light"] == ["11"]
+
+        monkeypatch.setattr(FakeScanner, "fail_at", None)
+        _results = await _handler.discover_devices(**_scan)
+        # What the first scan found is part of the results
+        assert _results["light"] == ["11"]
+        assert _stored[_handler.mac]["job"]["status"] == JOB_COMPLETED
+        assert _stored[_handler.mac]["job"]["probed"] == 3
+
+        await _handler.discover_devices(rescan=True, **_scan)
+        return FakeScanner.scans
+
+    assert asyncio.run(_test()) == [
+        ["*#1*11##", "*#1*12##", "*#1*13##"],
+        ["*#1*13##"],
+        ["*#1*11##", "*#1*12##", "*#1*13##"],
+    ]
+
+
+def test_failed_fast_discovery_marks_job_failed(handler, monkeypatch):
+    _stored = _stored_progress(monkeypatch)
+
+    async def _broadcast_fails(pending, duration):
+        raise ConnectionError("Gateway unreachable")
+
+    async def _test():
+        _handler = _discovery_handler(handler)
+        _handler._discover_by_broadcast = _broadcast_fails
+        with pytest.raises(ConnectionError):
+            await _handler.discover_devices(area_start=1, area_end=1, fast=True)
+        assert _stored[_handler.mac]["job"]["status"] == JOB_FAILED
+        assert not _handler._discovery_in_progress
+
+    asyncio.run(_test())
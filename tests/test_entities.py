@@ -0,0 +1,30 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from bticino_myhome.binary_sensor import MyHOMEMotionSensor
+
+
+class FakeStateWriter:
+    def __init__(self):
+        self.scheduled = []
+
+    def schedule(self, entity):
+        self.scheduled.append(entity)
+
+
+class FakeHandler:
+    def __init__(self):
+        self.state_writer = FakeStateWriter()
+
+
+def test_motion_sensor_timeout_written_through_state_writer():
+    _sensor = MyHOMEMotionSensor.__new__(MyHOMEMotionSensor)
+    _sensor._gateway_handler = FakeHandler()
+    _sensor._attr_is_on = True
+    _sensor._timeout = timedelta(seconds=315)
+    _sensor._last_updated = datetime.now(timezone.utc) - timedelta(seconds=400)
+
+    asyncio.run(_sensor.async_update())
+
+    assert _sensor._attr_is_on is False
+    assert _sensor._gateway_handler.state_writer.scheduled == [_sensor]
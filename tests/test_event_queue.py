@@ -0,0 +1,60 @@
+import asyncio
+
+from bticino_myhome.const import (
+    EVENT_QUEUE_OVERFLOW_BLOCK,
+    EVENT_QUEUE_OVERFLOW_DROP_NEWEST,
+    EVENT_QUEUE_OVERFLOW_DROP_OLDEST,
+)
+from bticino_myhome.gateway import EventQueue
+
+
+def _drain(queue):
+    _items = []
+    while not queue.empty():
+        _items.append(queue.get_nowait())
+        queue.task_done()
+    return _items
+
+
+def test_drop_newest_keeps_queued_messages():
+    async def _test():
+        _queue = EventQueue(2, EVENT_QUEUE_OVERFLOW_DROP_NEWEST)
+        for _item in ("a", "b", "c"):
+            await _queue.put(_item)
+        assert _drain(_queue) == ["a", "b"]
+        assert _queue.stats["dropped"] == 1
+        await asyncio.wait_for(_queue.join(), 1)
+
+    asyncio.run(_test())
+
+
+def test_drop_oldest_makes_room_for_incoming_message():
+    async def _test():
+        _queue = EventQueue(2, EVENT_QUEUE_OVERFLOW_DROP_OLDEST)
+        for _item in ("a", "b", "c"):
+            await _queue.put(_item)
+        assert _drain(_queue) == ["b", "c"]
+        assert _queue.stats["dropped"] == 1
+        # The dropped message does not count as unfinished work
+        await asyncio.wait_for(_queue.join(), 1)
+
+    asyncio.run(_test())
+
+
+def test_block_waits_for_room():
+    async def _test():
+        _queue = EventQueue(2, EVENT_QUEUE_OVERFLOW_BLOCK)
+        await _queue.put("a")
+        await _queue.put("b")
+        _put = asyncio.create_task(_queue.put("c"))
+        await asyncio.sleep(0)
+        assert not _put.done()
+        assert _queue.get_nowait() == "a"
+        _queue.task_done()
+        await asyncio.wait_for(_put, 1)
+        assert _drain(_queue) == ["b", "c"]
+        assert _queue.stats["blocked"] == 1
+        assert _queue.stats["dropped"] == 0
+        assert _queue.stats["max_depth"] == 2
+
+    asyncio.run(_test())
@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from bticino_myhome.OWNd.message import OWNMessage
+from bticino_myhome.refresh import StartupRefresh
+
+
+class FakeFollowUpRefresh:
+    def __init__(self):
+        self.requested = []
+
+    def request(self, where):
+        self.requested.append(where)
+
+
+def _routed_handler(handler):
+    _handler = handler()
+    _handler.startup_refresh = StartupRefresh()
+    _handler.follow_up_refresh = FakeFollowUpRefresh()
+    # No state snapshot store
+    _handler._state_snapshot_pending = True
+    return _handler
+
+
+def test_point_event_routed_to_handlers_of_its_entity(handler):
+    async def _test():
+        _handler = _routed_handler(handler)
+        _received = []
+        _first = lambda _message: _received.append(("first", str(_message)))  # noqa: E731
+        _second = lambda _message: _received.append(("second", str(_message)))  # noqa: E731
+        _other = lambda _message: _received.append(("other", str(_message)))  # noqa: E731
+        _handler.add_event_route("1-11", _first)
+        _handler.add_event_route("1-11", _second)
+        _handler.add_event_route("1-11", _first)
+        _handler.add_event_route("1-12", _other)
+
+        await _handler._handle_message(OWNMessage.parse("*1*1*11##"))
+        # Added again, the first handler moved after the second one
+        assert _received == [("second", "*1*1*11##"), ("first", "*1*1*11##")]
+
+        _handler.remove_event_route("1-11", _second)
+        _handler.remove_event_route("1-11", _first)
+        assert "1-11" not in _handler._event_routes
+        await _handler._handle_message(OWNMessage.parse("*1*0*11##"))
+        assert len(_received) == 2
+
+    asyncio.run(_test())
+
+
+@pytest.mark.parametrize(
+    "frame, event_type",
+    [
+        ("*1*1*0##", "bticino_myhome_general_light_event"),
+        ("*1*1*3##", "bticino_myhome_area_light_event"),
+        ("*1*1*#5##", "bticino_myhome_group_light_event"),
+        ("*2*1*0##", "bticino_myhome_general_automation_event"),
+        ("*2*1*3##", "bticino_myhome_area_automation_event"),
+        ("*2*1*#5##", "bticino_myhome_group_automation_event"),
+    ],
+)
+def test_area_group_and_general_events_not_routed_to_entities(handler, frame, event_type):
+    async def _test():
+        _handler = _routed_handler(handler)
+        _message = OWNMessage.parse(frame)
+        _received = []
+        _handler.add_event_route(f"{_message.who}-31", _received.append)
+        _handler.add_event_route(_message.entity, _received.append)
+        _status_request = OWNMessage.parse(f"*#{_message.who}*31##")
+        _handler.shadow_state.update(OWNMessage.parse(f"*{_message.who}*0*31##"))
+        assert _handler.shadow_state.age(_status_request) is not None
+
+        await _handler._handle_message(_message)
+        assert _received == []
+        assert [_event[0] for _event in _handler.hass.bus.events] == [event_type]
+        # The entities of the family may have changed, their state is asked for again
+        assert _handler.shadow_state.age(_status_request) is None
+
+    asyncio.run(_test())
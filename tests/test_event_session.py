@@ -0,0 +1,128 @@
+import asyncio
+import logging
+
+import pytest
+
+from bticino_myhome.OWNd.connection import OWNEventSession, OWNMessageCache, _OWNEventProtocol
+
+from conftest import FakeGateway
+
+
+class FakeReader:
+    """Stream reader handing out `chunks` of bytes, one per read"""
+
+    def __init__(self, chunks):
+        self._chunks = list(chunks)
+
+    async def read(self, size):
+        return self._chunks.pop(0) if self._chunks else b""
+
+
+def _reading_session(*chunks):
+    _session = OWNEventSession(gateway=FakeGateway(), logger=logging.getLogger(__name__))
+    _session._stream_reader = FakeReader(chunks)
+    return _session
+
+
+def test_repeated_frames_parsed_once_unless_they_depend_on_date():
+    _cache = OWNMessageCache()
+    _session = OWNEventSession(gateway=FakeGateway(), logger=logging.getLogger(__name__), message_cache=_cache)
+    _power = _session._parse_frame(b"*#18*51*113*250##")
+    assert _session._parse_frame(b"*#18*51*113*250##") is _power
+
+    # The year of an hourly consumption is taken from today's date, it may
+    # not be the same when the frame is read again
+    for _frame in (b"*#18*51*511#12#31*3*250##", b"*#18*51*513#12*31*250##", b"*#18*51*514#12*31*250##"):
+        _consumption = _session._parse_frame(_frame)
+        assert _consumption.depends_on_date
+        assert _session._parse_frame(_frame) is not _consumption
+    assert len(_cache) == 1
+
+
+class FakeTransport:
+    def __init__(self):
+        self.reading = True
+        self.closed = False
+
+    def pause_reading(self):
+        self.reading = False
+
+    def resume_reading(self):
+        self.reading = True
+
+    def close(self):
+        self.closed = True
+
+
+def _connected_protocol():
+    _session = OWNEventSession(gateway=FakeGateway(), logger=logging.getLogger(__name__))
+    _protocol = _OWNEventProtocol(_session)
+    _transport = FakeTransport()
+    _protocol.connection_made(_transport)
+    return _protocol, _transport
+
+
+def test_frames_split_across_reads_returned_in_batches():
+    async def _test():
+        _session = _reading_session(b"*1*1*11##*1*0", b"*12##*1*1*13##")
+        assert [str(_message) for _message in await _session.get_batch()] == ["*1*1*11##"]
+        assert [str(_message) for _message in await _session.get_batch()] == ["*1*0*12##", "*1*1*13##"]
+
+    asyncio.run(_test())
+
+
+def test_get_next_serves_frames_of_last_batch():
+    async def _test():
+        _session = _reading_session(b"*1*1*11##*1*0*12##")
+        assert str(await _session.get_next()) == "*1*1*11##"
+        assert str(await _session.get_next()) == "*1*0*12##"
+
+    asyncio.run(_test())
+
+
+def test_frame_not_parsed_skipped_without_losing_batch():
+    async def _test():
+        _session = _reading_session(b"*1*1*11##\xff\xfe##*1*0*12##")
+        assert [str(_message) for _message in await _session.get_batch()] == ["*1*1*11##", "*1*0*12##"]
+
+    asyncio.run(_test())
+
+
+def test_protocol_wakes_up_listener_with_frames_received():
+    async def _test():
+        _protocol, _ = _connected_protocol()
+        _batch = asyncio.create_task(_protocol.get_batch())
+        await asyncio.sleep(0)
+        _protocol.data_received(b"*1*1*11##*1*0")
+        assert [str(_message) for _message in await asyncio.wait_for(_batch, 1)] == ["*1*1*11##"]
+        _protocol.data_received(b"*12##")
+        assert [str(_message) for _message in await _protocol.get_batch()] == ["*1*0*12##"]
+
+    asyncio.run(_test())
+
+
+def test_protocol_pauses_reading_while_listener_is_behind(monkeypatch):
+    async def _test():
+        _protocol, _transport = _connected_protocol()
+        _protocol.data_received(b"*1*1*11##*1*1*12##")
+        assert _transport.reading
+        _protocol.data_received(b"*1*1*13##")
+        assert not _transport.reading
+        assert len(await _protocol.get_batch()) == 3
+        assert _transport.reading
+
+    monkeypatch.setattr(_OWNEventProtocol, "MAX_QUEUED_MESSAGES", 2)
+    asyncio.run(_test())
+
+
+def test_protocol_connection_lost_after_last_frames():
+    async def _test():
+        _protocol, _ = _connected_protocol()
+        _protocol.data_received(b"*1*1*11##*1*0")
+        _protocol.connection_lost(None)
+        assert [str(_message) for _message in await _protocol.get_batch()] == ["*1*1*11##"]
+        with pytest.raises(asyncio.IncompleteReadError) as _error:
+            await _protocol.get_batch()
+        assert _error.value.partial == b"*1*0"
+
+    asyncio.run(_test())
@@ -0,0 +1,53 @@
+import json
+import os
+import sys
+
+import pytest
+
+from bticino_myhome.OWNd import message
+from bticino_myhome.OWNd.message import OWNCENPlusEvent, OWNDecodeError, OWNDryContactEvent, OWNMessage
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+import message_parsing  # noqa: E402  pylint: disable=wrong-import-position
+
+
+def test_lazy_message_decoded_on_first_read():
+    _eager = OWNMessage.parse("*#4*1*0*0225##")
+    _lazy = OWNMessage.parse("*#4*1*0*0225##", lazy=True)
+    # Only the addressing fields are set until another one is read
+    assert _lazy._decode_pending
+    assert (_lazy.who, _lazy.where, _lazy.dimension) == (4, "1", 0)
+    assert _lazy._decode_pending
+    assert _lazy.main_temperature == _eager.main_temperature == 22.5
+    assert not _lazy._decode_pending
+    assert _lazy.human_readable_log == _eager.human_readable_log
+
+
+def test_lazy_message_not_decodable_raises_on_every_read():
+    _message = OWNMessage.parse("*#18*51*52#24#5*30000##", lazy=True)
+    for _ in range(2):
+        with pytest.raises(OWNDecodeError):
+            _message.human_readable_log
+    with pytest.raises(OWNDecodeError):
+        _message.decode()
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+@pytest.mark.parametrize("frame", ["*#25*3101*0*1##", "*#25*2101*0*1##"])
+def test_malformed_who_25_frame_not_parsed(frame, lazy):
+    assert OWNMessage.parse(frame, lazy=lazy) is None
+
+
+def test_who_25_frames_by_where():
+    assert isinstance(OWNMessage.parse("*25*21#1*212##"), OWNCENPlusEvent)
+    assert isinstance(OWNMessage.parse("*25*31#1*3101##"), OWNDryContactEvent)
+
+
+def test_corpus_parses_as_snapshot():
+    """Every frame of the golden corpus of benchmarks/message_parsing.py parses,
+    eagerly and lazily, to the fields recorded in its snapshot"""
+    _corpus = message_parsing.load_corpus(os.path.join(message_parsing.CORPUS_DIR, "frames.txt"))
+    with open(os.path.join(message_parsing.CORPUS_DIR, "snapshot.json"), encoding="utf-8") as _file:
+        _snapshot = json.load(_file)
+    with message_parsing.frozen_today(message):
+        assert message_parsing.check_snapshot(message.OWNMessage.parse, _corpus, _snapshot, has_lazy=True) == []
@@ -0,0 +1,64 @@
+from bticino_myhome import metrics
+from bticino_myhome.metrics import RATE_WINDOW, GatewayMetrics, Histogram
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+def test_histogram_quantiles_are_bucket_upper_bounds():
+    _histogram = Histogram()
+    assert _histogram.stats == {"count": 0, "mean_us": None, "p50_us": None, "p95_us": None, "max_us": None}
+
+    for _ in range(90):
+        _histogram.observe(100e-6)
+    _histogram.observe(3e-3, count=10)
+    assert _histogram.stats == {
+        "count": 100,
+        "mean_us": 390.0,
+        # 100 us is in the 64-128 us bucket
+        "p50_us": 128.0,
+        # Capped to the largest value recorded, instead of 4096 us
+        "p95_us": 3000.0,
+        "max_us": 3000.0,
+    }
+
+
+def test_frames_parsed_recorded_at_their_mean_duration():
+    _metrics = GatewayMetrics()
+    _metrics.frames_parsed(4, 20e-6)
+    _metrics.frames_parsed(0, 0)
+    assert _metrics.parse_time.stats["count"] == 4
+    assert _metrics.parse_time.stats["mean_us"] == 5.0
+
+
+def test_frame_rates_computed_over_windows(monkeypatch):
+    _clock = FakeClock()
+    monkeypatch.setattr(metrics, "time", _clock)
+    _metrics = GatewayMetrics()
+    for _ in range(30):
+        _metrics.frame_dispatched(1, 10e-6)
+    for _ in range(20):
+        _metrics.frame_dispatched(2, 10e-6)
+
+    # Nothing until a whole window has passed
+    _clock.now += RATE_WINDOW / 2
+    assert _metrics.frames_per_second == 0
+    _clock.now += RATE_WINDOW / 2
+    assert _metrics.frames_per_second == 50 / RATE_WINDOW
+    assert _metrics.frames_per_second_by_who == {"1": 30 / RATE_WINDOW, "2": 20 / RATE_WINDOW}
+
+    # The rates of the last window are kept until the next one is over,
+    # a window read late is as long as the time that passed
+    _metrics.frame_dispatched(1, 10e-6)
+    _clock.now += RATE_WINDOW / 2
+    assert _metrics.frames_per_second == 50 / RATE_WINDOW
+    _clock.now += RATE_WINDOW * 1.5
+    assert _metrics.frames_per_second == round(1 / (RATE_WINDOW * 2), 2)
+    assert _metrics.frames_per_second_by_who == {"1": round(1 / (RATE_WINDOW * 2), 2)}
+    assert _metrics.stats["frames"] == 51
+    assert _metrics.stats["frames_by_who"] == {"1": 31, "2": 20}
@@ -0,0 +1,186 @@
+import asyncio
+
+from bticino_myhome import refresh, shadow
+from bticino_myhome.OWNd.message import OWNEnergyCommand, OWNMessage
+from bticino_myhome.refresh import FollowUpRefresh, PollScheduler, StartupRefresh
+from bticino_myhome.shadow import ShadowStateTable
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+def test_entity_added_again_polled_once_per_interval(monkeypatch):
+    _clock = FakeClock()
+    monkeypatch.setattr(refresh, "time", _clock)
+    _scheduler = PollScheduler(ShadowStateTable(5), frame_budget=10, fresh_fraction=0.5)
+    _requests = [OWNEnergyCommand.get_total_consumption("51")]
+    _scheduler.add("meter", 60, _requests)
+    _scheduler.add("meter", 60, _requests)
+
+    _polls = 0
+    for _ in range(600):
+        _clock.now += 1
+        _polls += _scheduler.due().count("meter")
+    assert _polls == 10
+    assert len(_scheduler._due) == 1
+
+
+def test_entities_polled_in_due_order(monkeypatch):
+    _clock = FakeClock()
+    monkeypatch.setattr(refresh, "time", _clock)
+    _scheduler = PollScheduler(ShadowStateTable(5), frame_budget=10, fresh_fraction=0.5)
+    for _where in ("51", "52", "53", "54"):
+        _scheduler.add(_where, 60, [OWNEnergyCommand.get_total_consumption(_where)])
+
+    _polled = []
+    for _ in range(120):
+        _clock.now += 1
+        _polled.extend(_scheduler.due())
+    _phases = _scheduler._phases[60]
+    _order = sorted(_phases, key=_phases.get)
+    # Once per interval, in the order of the phases
+    assert _polled == _order + _order
+    # Spread over the interval, each phase at least a quarter of the largest gap from the others
+    _sorted = sorted(_phases.values())
+    assert min(_next - _phase for _phase, _next in zip(_sorted, _sorted[1:])) > 4
+
+
+def test_polls_over_frame_budget_deferred(monkeypatch):
+    _clock = FakeClock()
+    monkeypatch.setattr(refresh, "time", _clock)
+    # Phases 300, 0 and 450
+    monkeypatch.setattr(refresh.random, "uniform", lambda _low, _high: (_low + _high) / 2)
+    _scheduler = PollScheduler(ShadowStateTable(5), frame_budget=1, fresh_fraction=0.5)
+    for _where in ("51", "52", "53"):
+        _scheduler.add(_where, 600, [OWNEnergyCommand.get_total_consumption(_where)])
+
+    # All three are due at once, one frame per second is sent
+    _clock.now += 600
+    assert len(_scheduler.due()) == 1
+    assert _scheduler.due() == []
+    _clock.now += 1
+    assert len(_scheduler.due()) == 1
+    _clock.now += 1
+    assert len(_scheduler.due()) == 1
+    _clock.now += 1
+    assert _scheduler.due() == []
+    assert _scheduler.stats["polls"] == 3
+    assert _scheduler.stats["frames"] == 3
+    assert _scheduler.stats["deferred"] == 3
+
+
+def test_poll_skipped_when_shadow_state_fresh(monkeypatch):
+    _clock = FakeClock()
+    monkeypatch.setattr(refresh, "time", _clock)
+    monkeypatch.setattr(shadow, "time", _clock)
+    _shadow_state = ShadowStateTable(5)
+    _scheduler = PollScheduler(_shadow_state, frame_budget=10, fresh_fraction=0.5)
+    _scheduler.add("meter", 60, [OWNEnergyCommand.get_total_consumption("51")])
+    _due = _scheduler._due[0][0]
+
+    # Read 10 seconds before the poll, less than half the interval
+    _clock.now = _due - 10
+    _shadow_state.update(OWNMessage.parse("*#18*51*51*1234##"))
+    _clock.now = _due
+    assert _scheduler.due() == []
+    assert _scheduler.stats["skipped_fresh"] == 1
+
+    # 70 seconds old at the next poll
+    _clock.now = _due + 60
+    assert _scheduler.due() == ["meter"]
+    assert _scheduler.stats["polls"] == 1
+
+
+class FakeTimer:
+    def __init__(self, when, callback):
+        self.when = when
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class FakeLoop:
+    def __init__(self):
+        self.now = 100.0
+        self.timers = []
+
+    def time(self):
+        return self.now
+
+    def call_at(self, when, callback):
+        self.timers.append(FakeTimer(when, callback))
+        return self.timers[-1]
+
+    def run_due(self):
+        for _timer in list(self.timers):
+            if not _timer.cancelled and _timer.when <= self.now:
+                self.timers.remove(_timer)
+                _timer.callback()
+
+
+def _follow_up():
+    _loop = FakeLoop()
+    _sent = []
+    _refresh = FollowUpRefresh(_loop, _sent.append, window=0.5, max_delay=2, general_areas=3)
+    return _loop, _refresh, _sent
+
+
+def test_follow_up_requests_merged_per_area():
+    _loop, _refresh, _sent = _follow_up()
+    for _where in ("1", "2", "1", "2"):
+        _refresh.request(_where)
+    _loop.now += 0.5
+    _loop.run_due()
+    assert _sent == ["1", "2"]
+    assert _refresh.stats == {"window": 0.5, "requested": 4, "sent": 2, "pending": 0}
+
+
+def test_follow_up_general_request_from_area_count():
+    _loop, _refresh, _sent = _follow_up()
+    for _where in ("1", "2", "3"):
+        _refresh.request(_where)
+    _loop.now += 0.5
+    _loop.run_due()
+    assert _sent == ["0"]
+
+
+def test_follow_up_general_request_asked_for():
+    _loop, _refresh, _sent = _follow_up()
+    _refresh.request("1")
+    _refresh.request("0")
+    _loop.now += 0.5
+    _loop.run_due()
+    assert _sent == ["0"]
+
+
+def test_follow_up_held_at_most_max_delay():
+    _loop, _refresh, _sent = _follow_up()
+    for _ in range(10):
+        _refresh.request("1")
+        _loop.now += 0.4
+        _loop.run_due()
+    # Requests kept coming within the window, sent once max_delay passed
+    assert _sent == ["1", "1"]
+
+
+def test_area_10_follow_up_refresh_sent_to_where_100(handler):
+    async def _test():
+        _handler = handler()
+        _handler.startup_refresh = StartupRefresh()
+        _loop = FakeLoop()
+        _handler.follow_up_refresh = FollowUpRefresh(
+            _loop, _handler._send_follow_up_refresh, window=0.5, max_delay=2, general_areas=3
+        )
+        await _handler._handle_message(OWNMessage.parse("*1*1*100##"))
+        _loop.now += 0.5
+        _loop.run_due()
+        return [str(_handler.send_buffer.get_nowait()["message"]) for _ in range(_handler.send_buffer.qsize())]
+
+    assert asyncio.run(_test()) == ["*#1*100##"]
@@ -0,0 +1,113 @@
+from bticino_myhome import gateway
+from bticino_myhome.const import (
+    SEND_PRIORITY_AGING,
+    SEND_PRIORITY_BACKGROUND,
+    SEND_PRIORITY_DISCOVERY,
+    SEND_PRIORITY_REFRESH,
+)
+from bticino_myhome.gateway import CoalescingSendQueue
+from bticino_myhome.OWNd.message import OWNAutomationCommand, OWNLightingCommand
+
+
+def _command(message):
+    return {"message": message, "is_status_request": False}
+
+
+def _drain(queue):
+    _sent = []
+    while not queue.empty():
+        _sent.append(str(queue.get_nowait()["message"]))
+    return _sent
+
+
+def test_replaced_command_sent_after_other_dimensions():
+    _queue = CoalescingSendQueue()
+    _queue.put_nowait(_command(OWNLightingCommand.set_brightness("11", 40)))
+    _queue.put_nowait(_command(OWNLightingCommand.switch_off("11")))
+    _queue.put_nowait(_command(OWNLightingCommand.set_brightness("11", 60)))
+    assert _drain(_queue) == [
+        str(OWNLightingCommand.switch_off("11")),
+        str(OWNLightingCommand.set_brightness("11", 60)),
+    ]
+    assert _queue.replaced_commands == 1
+
+
+def test_replaced_command_keeps_last():
+    _queue = CoalescingSendQueue()
+    _queue.put_nowait(_command(OWNAutomationCommand.raise_shutter("21")))
+    _queue.put_nowait(_command(OWNAutomationCommand.stop_shutter("21")))
+    _queue.put_nowait(_command(OWNAutomationCommand.lower_shutter("21")))
+    assert _drain(_queue) == [str(OWNAutomationCommand.lower_shutter("21"))]
+
+
+def test_retried_command_does_not_replace_newer():
+    _queue = CoalescingSendQueue()
+    _queue.put_nowait(_command(OWNLightingCommand.switch_on("11")))
+    _retried = _queue.get_nowait()
+    _queue.put_nowait(_command(OWNLightingCommand.switch_off("11")))
+    _queue.put_nowait(_retried)
+    assert _drain(_queue) == [str(OWNLightingCommand.switch_off("11"))]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+def _request(where, priority):
+    return {"message": OWNLightingCommand.status(where), "is_status_request": True, "priority": priority}
+
+
+def test_tasks_taken_by_priority_then_fifo(monkeypatch):
+    monkeypatch.setattr(gateway, "time", FakeClock())
+    _queue = CoalescingSendQueue()
+    _queue.put_nowait(_request("31", SEND_PRIORITY_DISCOVERY))
+    _queue.put_nowait(_request("21", SEND_PRIORITY_BACKGROUND))
+    _queue.put_nowait(_request("11", SEND_PRIORITY_REFRESH))
+    _queue.put_nowait(_command(OWNLightingCommand.switch_on("41")))
+    _queue.put_nowait(_request("12", SEND_PRIORITY_REFRESH))
+    _queue.put_nowait(_command(OWNLightingCommand.switch_on("42")))
+    assert _drain(_queue) == [
+        "*1*1*41##",
+        "*1*1*42##",
+        "*#1*11##",
+        "*#1*12##",
+        "*#1*21##",
+        "*#1*31##",
+    ]
+    assert _queue.stats["aged"] == 0
+
+
+def test_waiting_discovery_overtakes_fresh_refresh(monkeypatch):
+    _clock = FakeClock()
+    monkeypatch.setattr(gateway, "time", _clock)
+    _queue = CoalescingSendQueue()
+    _queue.put_nowait(_request("31", SEND_PRIORITY_DISCOVERY))
+    _clock.now += 3 * SEND_PRIORITY_AGING + 0.1
+    _queue.put_nowait(_request("11", SEND_PRIORITY_REFRESH))
+    assert _drain(_queue) == ["*#1*31##", "*#1*11##"]
+    assert _queue.stats["aged"] == 1
+
+
+def test_aged_to_a_tie_keeps_class_order(monkeypatch):
+    _clock = FakeClock()
+    monkeypatch.setattr(gateway, "time", _clock)
+    _queue = CoalescingSendQueue()
+    _queue.put_nowait(_request("31", SEND_PRIORITY_DISCOVERY))
+    # Moved up two classes, level with the refresh class
+    _clock.now += 2 * SEND_PRIORITY_AGING + 0.1
+    _queue.put_nowait(_request("11", SEND_PRIORITY_REFRESH))
+    assert _drain(_queue) == ["*#1*11##", "*#1*31##"]
+
+
+def test_merged_request_moves_to_more_urgent_class(monkeypatch):
+    monkeypatch.setattr(gateway, "time", FakeClock())
+    _queue = CoalescingSendQueue()
+    _queue.put_nowait(_request("31", SEND_PRIORITY_DISCOVERY))
+    _queue.put_nowait(_request("21", SEND_PRIORITY_BACKGROUND))
+    _queue.put_nowait(_request("31", SEND_PRIORITY_REFRESH))
+    assert _drain(_queue) == ["*#1*31##", "*#1*21##"]
+    assert _queue.merged_requests == 1
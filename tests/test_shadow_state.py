@@ -0,0 +1,59 @@
+import asyncio
+
+from bticino_myhome.OWNd.message import OWNAutomationCommand, OWNLightingCommand, OWNMessage
+from bticino_myhome.shadow import ShadowStateTable
+
+
+def test_send_raw_frame(handler):
+    async def _test():
+        _handler = handler()
+        await _handler.send("*14*0*11##")
+        assert _handler.send_buffer.get_nowait()["message"] == "*14*0*11##"
+
+    asyncio.run(_test())
+
+
+def test_send_raw_frame_makes_state_stale(handler):
+    async def _test():
+        _handler = handler()
+        _handler.shadow_state.update(OWNMessage.parse("*1*1*11##"))
+        assert _handler.shadow_state.lookup(OWNLightingCommand.status("11")) is not None
+        await _handler.send("*1*0*11##")
+        assert _handler.shadow_state.lookup(OWNLightingCommand.status("11")) is None
+
+    asyncio.run(_test())
+
+
+def test_advanced_cover_status_answered_with_position():
+    _shadow_state = ShadowStateTable(5)
+    _shadow_state.update(OWNMessage.parse("*#2*21*10*10*65*0*0##"))
+    _answer = _shadow_state.lookup(OWNAutomationCommand.status("21"))
+    assert _answer is not None and _answer.current_position == 65
+
+
+def test_advanced_cover_status_not_answered_without_position():
+    _shadow_state = ShadowStateTable(5)
+    _shadow_state.update(OWNMessage.parse("*#2*21*10*10*65*0*0##"))
+    # A movement makes the position stale, the bus is asked for it again
+    _shadow_state.update(OWNMessage.parse("*2*1*21##"))
+    assert _shadow_state.lookup(OWNAutomationCommand.status("21")) is None
+
+
+def test_basic_cover_status_answered_with_state():
+    _shadow_state = ShadowStateTable(5)
+    _shadow_state.update(OWNMessage.parse("*2*0*22##"))
+    assert str(_shadow_state.lookup(OWNAutomationCommand.status("22"))) == "*2*0*22##"
+
+
+def test_undecodable_message_not_recorded(handler):
+    async def _test():
+        _handler = handler()
+        _handler._state_snapshot_pending = True
+        _handler._record_state(OWNMessage.parse("*#2*21*10*10##", lazy=True))
+        assert len(_handler.shadow_state) == 0
+        assert _handler.shadow_state.lookup(OWNAutomationCommand.status("21")) is None
+
+        _handler._record_state(OWNMessage.parse("*#2*21*10*10*65*0*0##", lazy=True))
+        assert _handler.shadow_state.lookup(OWNAutomationCommand.status("21")).current_position == 65
+
+    asyncio.run(_test())
@@ -0,0 +1,46 @@
+import asyncio
+
+from bticino_myhome import gateway
+from bticino_myhome.OWNd.message import OWNLightingCommand
+from bticino_myhome.refresh import StartupRefresh
+
+
+class FakeStore:
+    def __init__(self, frames):
+        self._frames = frames
+
+    async def async_load(self):
+        return {"frames": self._frames}
+
+
+class FakeLight:
+    def __init__(self):
+        self.updates = 0
+        self.events = []
+
+    async def async_update(self):
+        self.updates += 1
+
+    def handle_event(self, message):
+        self.events.append(str(message))
+
+
+def test_corrupt_snapshot_does_not_skip_startup_refresh(handler, monkeypatch):
+    monkeypatch.setattr(gateway, "STARTUP_REFRESH_QUIET", 0.01)
+
+    async def _test():
+        _handler = handler()
+        _handler._state_store = FakeStore(["*#2*21*10*10##", "*#2*21*10*##", "not a frame", "*1*1*12##"])
+        _handler.startup_refresh = StartupRefresh()
+        _light = FakeLight()
+        _handler._event_routes = {"1-12": (_light.handle_event,)}
+        assert _handler.startup_refresh.add(_light, "1-12", "1", "12")
+
+        await _handler._run_startup_refresh()
+
+        assert _light.events == ["*1*1*12##"]
+        assert _light.updates == 1
+        # Restored, but stale until read again
+        assert _handler.shadow_state.lookup(OWNLightingCommand.status("12")) is None
+
+    asyncio.run(_test())